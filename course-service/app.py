@@ -1,12 +1,16 @@
 # Importing.
 import os
-import json
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, g
+from flask import Flask, request, jsonify, g, stream_with_context
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, PyMongoError
 from bson import ObjectId
-import pika
 from mongo import get_mongo_client
+from catalog import MAX_PAGE_SIZE, bump_catalog_version, catalog_version, listing_etag, parse_fields
+from snapshot import CatalogSnapshot
+from search import FACETS, SearchIndex
+from publisher import EventPublisher
+from bulk import MAX_REPORTED_ERRORS, export_lines, read_chunks
 
 # load variable in .env
 load_dotenv()
@@ -20,6 +24,15 @@ def get_db():
             g.db = client[os.getenv("DATABASE_NAME", "LearnHubDB")]["courses"]
     return g.db
 
+def get_meta():
+    if "meta" not in g:
+        client = get_mongo_client()
+        if client is None:
+            g.meta = None
+        else:
+            g.meta = client[os.getenv("DATABASE_NAME", "LearnHubDB")]["catalog_meta"]
+    return g.meta
+
 # Course Service.
 def create_app():
     app = Flask(__name__)
@@ -42,6 +55,13 @@ def create_app():
     # RabbitMQ configuration (optional)
     app.config["RABBITMQ_URL"] = os.getenv("RABBITMQ_URL")
     app.config["EVENT_EXCHANGE"] = os.getenv("EVENT_EXCHANGE", "learning_events")
+    # Events that could not be published yet; mount a volume to keep them across restarts
+    app.config["EVENT_SPOOL_PATH"] = os.getenv("EVENT_SPOOL_PATH", "course_events.spool")
+
+    # Serve reads from an in-memory catalog snapshot, kept current from the
+    # change stream (needs a replica set, e.g. Atlas) when watching is on.
+    app.config["COURSE_SNAPSHOT_ENABLED"] = os.getenv("COURSE_SNAPSHOT_ENABLED", "true").lower() == "true"
+    app.config["COURSE_SNAPSHOT_WATCH"] = os.getenv("COURSE_SNAPSHOT_WATCH", "true").lower() == "true"
 
     # MongoDB client and collection.
     # try:
@@ -58,37 +78,33 @@ def create_app():
     #     print(f"[Course Service] Failed to connect to MongoDB: {e}")
     #     raise
 
-    # Event publisher.
+    # Event publisher: one long-lived, confirmed publisher per process.
+    # While RabbitMQ is down events wait in a spool file, in order.
+    publisher = None
+    if app.config["RABBITMQ_URL"]:
+        publisher = EventPublisher(
+            app.config["RABBITMQ_URL"],
+            app.config["EVENT_EXCHANGE"],
+            app.config["EVENT_SPOOL_PATH"],
+            pool_size=int(os.getenv("PUBLISHER_POOL_SIZE", "4"))
+        )
+        publisher.start()
+    app.publisher = publisher
+
     def publish_event(event_type, payload):
         """
         Publishes a JSON event to RabbitMQ.
-        If RabbitMQ is unreachable, log the error but do not break the API.
+        If RabbitMQ is unreachable the event is spooled and sent later;
+        the API never breaks.
         """
-        try:
-            connection = pika.BlockingConnection(
-                pika.URLParameters(app.config["RABBITMQ_URL"])
-            )
-            channel = connection.channel()
-
-            channel.exchange_declare(
-                exchange=app.config["EVENT_EXCHANGE"],
-                exchange_type="topic",
-                durable=True
-            )
-
-            event = {"event_type": event_type, "payload": payload}
-
-            channel.basic_publish(
-                exchange=app.config["EVENT_EXCHANGE"],
-                routing_key=f"course.{event_type}",
-                body=json.dumps(event).encode("utf-8"),
-            )
-
-            connection.close()
-            app.logger.info(f"Event published: {event_type}")
+        if publisher is None:
+            app.logger.warning(f"RABBITMQ_URL is not set, event not published: {event_type}")
+            return
 
-        except Exception as e:
-            app.logger.error(f"Event publish failed: {e}")
+        if publisher.publish(event_type, payload):
+            app.logger.info(f"Event published: {event_type}")
+        else:
+            app.logger.warning(f"Event spooled until RabbitMQ is reachable: {event_type}")
 
     # Convert MongoDB document to a JSON safe dict.
     def to_json(doc):
@@ -100,6 +116,37 @@ def create_app():
                 result[k] = v
         return result
 
+    snapshot = CatalogSnapshot(to_json) if app.config["COURSE_SNAPSHOT_ENABLED"] else None
+    app.snapshot = snapshot
+
+    # Search index; with the snapshot on it also sees other replicas' writes.
+    search_index = SearchIndex()
+    app.search_index = search_index
+    if snapshot is not None:
+        snapshot.subscribe(search_index)
+
+    # Keep the in-memory views in step with a write made here.
+    def refresh_views(course_id, course=None):
+        views = snapshot if snapshot is not None else search_index
+        if course is None:
+            views.remove(course_id)
+        else:
+            views.upsert(course)
+
+    # Response for a pre-encoded body, compressed if the client accepts it.
+    def encoded_response(encoded):
+        body, encoding, etag = encoded.variant(request.accept_encodings)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype="application/json")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
     # Health check used by Docker/K8s.
     @app.get("/health")
     def health():
@@ -113,15 +160,98 @@ def create_app():
             app.logger.error(f"Health check DB error: {e}")
             return {"status": "error", "db": "unreachable"}, 500
 
-    # Get all courses.
+    # Get all courses, or one page of them.
+    # ?fields=title,description returns only those fields (plus id).
+    # ?limit=N returns {"courses": [...], "next_after": id}; pass next_after
+    # back as ?after= for the following page.
     @app.get("/courses")
     def get_courses():
+        db = get_db()
+        meta = get_meta()
+        if db is None or meta is None:
+            return jsonify({"error": "Database unavailable"}), 503
+
+        try:
+            projection = parse_fields(request.args.get("fields"))
+            limit = request.args.get("limit", type=int)
+            after = request.args.get("after")
+            query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        except Exception:
+            return {"error": "Invalid fields or after"}, 400
+
+        # From memory: no query and no encoding.
+        if snapshot is not None:
+            snapshot.ensure_loaded(db, watch=app.config["COURSE_SNAPSHOT_WATCH"])
+            if limit is None and not after:
+                return encoded_response(snapshot.listing(projection))
+            limit = min(max(limit or MAX_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+            return encoded_response(snapshot.page(projection, str(ObjectId(after)) if after else None, limit))
+
+        # Unchanged catalog: answer from the version alone, without listing.
+        etag = listing_etag(catalog_version(meta), request.args)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        cursor = db.find(query, projection).sort("_id", 1)
+        if limit is None and not after:
+            response = jsonify([to_json(d) for d in cursor])
+        else:
+            limit = min(max(limit or MAX_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+            # One extra document tells us whether another page exists.
+            docs = list(cursor.limit(limit + 1))
+            courses = [to_json(d) for d in docs[:limit]]
+            response = jsonify({
+                "courses": courses,
+                "next_after": courses[-1]["id"] if len(docs) > limit else None
+            })
+
+        response.set_etag(etag)
+        # Clients may keep the body but must revalidate it.
+        response.headers["Cache-Control"] = "no-cache"
+        return response, 200
+
+    # Search courses by title and description.
+    # ?q= words, the last one also matched as a prefix for type-ahead;
+    # ?category= and ?difficulty= narrow the results.
+    @app.get("/courses/search")
+    def search_courses():
         db = get_db()
         if db is None:
             return jsonify({"error": "Database unavailable"}), 503
-        
-        docs = list(db.find())
-        return jsonify([to_json(d) for d in docs]), 200
+
+        if snapshot is not None:
+            # Loading the snapshot builds the index
+            snapshot.ensure_loaded(db, watch=app.config["COURSE_SNAPSHOT_WATCH"])
+        else:
+            search_index.ensure_loaded(db, to_json)
+
+        query = request.args.get("q", "")
+        limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+        filters = {facet: request.args[facet] for facet in FACETS if request.args.get(facet)}
+        result = search_index.search(query, limit, filters)
+        return jsonify(dict(result, query=query)), 200
+
+    # Stream the whole catalog as NDJSON, one course per line, in _id order.
+    # ?fields= works as for GET /courses. Memory use does not grow with the
+    # catalog: documents go straight from the cursor to the client.
+    @app.get("/courses/export")
+    def export_courses():
+        db = get_db()
+        if db is None:
+            return jsonify({"error": "Database unavailable"}), 503
+        try:
+            projection = parse_fields(request.args.get("fields"))
+        except ValueError:
+            return {"error": "Invalid fields"}, 400
+
+        cursor = db.find({}, projection).sort("_id", 1).batch_size(1000)
+        return app.response_class(
+            stream_with_context(export_lines(cursor, to_json)),
+            mimetype="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=courses.ndjson"}
+        )
 
     # Get a single course by ID.
     @app.get("/courses/<course_id>")
@@ -133,11 +263,20 @@ def create_app():
             oid = ObjectId(course_id)
         except Exception:
             return {"error": "Invalid ID"}, 400
+
+        if snapshot is not None:
+            snapshot.ensure_loaded(db, watch=app.config["COURSE_SNAPSHOT_WATCH"])
+            encoded = snapshot.course(str(oid))
+            if encoded is not None:
+                return encoded_response(encoded)
         
         doc = db.find_one({"_id": oid})
         if not doc:
             return {"error": "Course not found"}, 404
 
+        # Created on another replica and not streamed to us yet.
+        if snapshot is not None:
+            snapshot.upsert(to_json(doc))
         return jsonify(to_json(doc)), 200
 
     # Create a new course.
@@ -161,12 +300,76 @@ def create_app():
 
         created = db.find_one({"_id": result.inserted_id})
         course_json = to_json(created)
+        bump_catalog_version(get_meta())
+        refresh_views(course_json["id"], course_json)
 
         # This is where the service becomes event driven.
         publish_event("course_created", course_json)
 
         return jsonify(course_json), 201
 
+    # Create many courses from an NDJSON body, one {"title", "description"}
+    # per line. The body is read as it arrives and written in chunks with
+    # insert_many; each chunk is announced by one courses_imported event.
+    # Invalid lines are skipped and reported with their line numbers.
+    # If a write fails the import stops there: the response (207) says how
+    # many courses were imported and the line to resume from, stopped_at_line.
+    @app.post("/courses/bulk")
+    def import_courses():
+        db = get_db()
+        if db is None:
+            return jsonify({"error": "Database unavailable"}), 503
+
+        imported = 0
+        failed = 0
+        errors = []
+        stopped_at_line = None
+        for numbered, chunk_errors in read_chunks(request.stream):
+            failed += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+            if not numbered:
+                continue
+
+            # insert_many fills in each _id, so nothing needs re-reading.
+            docs = [doc for _, doc in numbered]
+            try:
+                db.insert_many(docs)
+                stored = len(docs)
+            except BulkWriteError as e:
+                # Ordered insert: everything before the failing course landed
+                stored = e.details.get("nInserted", 0)
+                stopped_at_line = numbered[stored][0]
+                write_errors = e.details.get("writeErrors") or [{"errmsg": str(e)}]
+                errors.append({"line": stopped_at_line, "error": f"Not imported: {write_errors[0]['errmsg']}"})
+            except PyMongoError as e:
+                # Whether part of the chunk landed is unknown
+                stored = 0
+                stopped_at_line = numbered[0][0]
+                errors.append({
+                    "line": stopped_at_line,
+                    "error": f"Import stopped, courses from this line on may be partly imported: {e}"
+                })
+            app.logger.info(f"Bulk import chunk: {stored} of {len(docs)} courses inserted")
+
+            if stored:
+                courses = [to_json(doc) for doc in docs[:stored]]
+                bump_catalog_version(get_meta())
+                for course in courses:
+                    refresh_views(course["id"], course)
+                imported += len(courses)
+                publish_event("courses_imported", {"courses": courses})
+
+            if stopped_at_line is not None:
+                app.logger.error(f"Bulk import stopped at line {stopped_at_line} after {imported} courses")
+                break
+
+        if not imported and not failed and stopped_at_line is None:
+            return {"error": "No courses in request body"}, 400
+        result = {"imported": imported, "failed": failed, "errors": errors, "stopped_at_line": stopped_at_line}
+        if stopped_at_line is not None:
+            return result, 207
+        return result, 201 if imported else 400
+
     # Update an existing course.
     @app.put("/courses/<course_id>")
     def update_course(course_id):
@@ -201,6 +404,8 @@ def create_app():
         # Fetch updated record.
         updated = db.find_one({"_id": oid})
         updated_json = to_json(updated)
+        bump_catalog_version(get_meta())
+        refresh_views(updated_json["id"], updated_json)
 
         # Notify other services.
         publish_event("course_updated", updated_json)
@@ -227,6 +432,8 @@ def create_app():
 
         # Delete the course.
         db.delete_one({"_id": oid})
+        bump_catalog_version(get_meta())
+        refresh_views(str(oid))
 
         deleted_json = to_json(doc)
 
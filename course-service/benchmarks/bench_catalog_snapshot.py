@@ -0,0 +1,67 @@
+"""
+Requests per second for GET /courses and GET /courses/<id> with the
+in-memory catalog snapshot on and off (identity and gzip responses).
+
+Runs the Flask app in-process against in-memory stand-ins for the courses
+and catalog_meta collections, with a simulated round trip per query.
+
+Usage: python benchmarks/bench_catalog_snapshot.py [courses] [round_trip_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_app  # noqa: E402
+from benchmarks.bench_course_listing import seed  # noqa: E402
+from benchmarks.standins import CourseCollection, MetaCollection  # noqa: E402
+
+
+def client_for(snapshot):
+    os.environ["COURSE_SNAPSHOT_ENABLED"] = "true" if snapshot else "false"
+    # The stand-in has no change stream
+    os.environ["COURSE_SNAPSHOT_WATCH"] = "false"
+    return course_app.create_app().test_client()
+
+
+def rps(client, urls, headers=None, seconds=2.0):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        response = client.get(urls[count % len(urls)], headers=headers or {})
+        assert response.status_code == 200, response.status_code
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    round_trip = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.002
+
+    docs = seed(count)
+    courses = CourseCollection(docs, round_trip)
+    meta = MetaCollection(round_trip)
+    course_app.get_db = lambda: courses
+    course_app.get_meta = lambda: meta
+
+    detail_urls = [f"/courses/{doc['_id']}" for doc in docs[:1000]]
+    cases = (
+        ("/courses", ["/courses"], None),
+        ("/courses (gzip)", ["/courses"], {"Accept-Encoding": "gzip"}),
+        ("/courses?fields=title", ["/courses?fields=title"], None),
+        ("/courses/<id>", detail_urls, None),
+    )
+
+    off = client_for(False)
+    on = client_for(True)
+    on.get("/courses")  # load the snapshot
+
+    print(f"{count} courses, {round_trip * 1000:.0f} ms round trip")
+    print(f"{'request':>24} {'off req/s':>10} {'on req/s':>10}")
+    for label, urls, headers in cases:
+        print(f"{label:>24} {rps(off, urls, headers):>10.0f} {rps(on, urls, headers):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
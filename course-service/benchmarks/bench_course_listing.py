@@ -0,0 +1,71 @@
+"""
+GET /courses at 100k courses: payload size and latency of the full listing,
+a projected listing (?fields=title), the first page (?limit=50), and a
+repeat fetch revalidated with If-None-Match (304).
+
+Runs the Flask app in-process against in-memory stand-ins for the courses
+and catalog_meta collections, with a simulated round trip per query.
+
+Usage: python benchmarks/bench_course_listing.py [courses] [round_trip_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+import app as course_app  # noqa: E402
+from benchmarks.standins import CourseCollection, MetaCollection  # noqa: E402
+
+
+def seed(count):
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Course {i}",
+            "description": "An introduction to the topic, with exercises and a final quiz. " * 4,
+            "duration_weeks": i % 12 + 1,
+            "category": ["Programming", "Data", "Design"][i % 3],
+            "difficulty": ["Beginner", "Intermediate", "Advanced"][i % 3],
+            "learning_outcomes": [f"Outcome {n}" for n in range(5)],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(client, url, headers=None, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url, headers=headers or {})
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return response, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    round_trip = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.002
+
+    courses = CourseCollection(seed(count), round_trip)
+    meta = MetaCollection(round_trip)
+    meta.find_one_and_update({"_id": "courses"}, {"$inc": {"version": 1}}, upsert=True)
+    course_app.get_db = lambda: courses
+    course_app.get_meta = lambda: meta
+    client = course_app.create_app().test_client()
+
+    print(f"{count} courses, {round_trip * 1000:.0f} ms round trip")
+    print(f"{'request':>32} {'status':>6} {'bytes':>11} {'ms':>9}")
+    for label, url in (("full listing", "/courses"),
+                       ("?fields=title", "/courses?fields=title"),
+                       ("?limit=50", "/courses?limit=50")):
+        response, elapsed = measure(client, url)
+        print(f"{label:>32} {response.status_code:>6} {len(response.data):>11} {elapsed:>9.2f}")
+
+        etag = response.headers["ETag"]
+        response, elapsed = measure(client, url, {"If-None-Match": etag}, repeat=50)
+        print(f"{label + ' (If-None-Match)':>32} {response.status_code:>6} {len(response.data):>11} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
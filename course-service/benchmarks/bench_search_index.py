@@ -0,0 +1,80 @@
+"""
+Search index build time and query latency at 100k courses: whole-word,
+multi-word, type-ahead prefix and filtered queries, plus the cost of
+re-indexing one course on update.
+
+Pure Python; no database needed.
+
+Usage: python benchmarks/bench_search_index.py [courses] [queries]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex  # noqa: E402
+
+SYLLABLES = ["py", "tho", "da", "ta", "sci", "en", "ce", "ma", "chi", "ne", "lea", "rn",
+             "de", "sign", "web", "net", "work", "clo", "ud", "se", "cu", "ri", "ty"]
+
+
+def vocabulary(rng, size):
+    return list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)})
+
+
+def courses(count, words, rng):
+    for i in range(count):
+        yield {
+            "id": f"{i:024x}",
+            "title": " ".join(rng.choices(words, k=rng.randint(2, 5))),
+            "description": " ".join(rng.choices(words, k=rng.randint(30, 80))),
+            "category": ["Programming", "Data", "Design"][i % 3],
+            "difficulty": ["Beginner", "Intermediate", "Advanced"][i % 3],
+        }
+
+
+def latency(index, queries, filters=None):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, 10, filters)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.99) - 1] * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(3)
+    words = vocabulary(rng, 20_000)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.load(courses(count, words, rng))
+    build = time.perf_counter() - start
+    print(f"{count} courses: built in {build:.1f} s, {index.stats()['terms']} terms")
+
+    cases = (
+        ("one word", [rng.choice(words) for _ in range(queries)], None),
+        ("two words", [" ".join(rng.sample(words, 2)) + " " for _ in range(queries)], None),
+        ("prefix (3 chars)", [rng.choice(words)[:3] for _ in range(queries)], None),
+        ("word + prefix", [f"{rng.choice(words)} {rng.choice(words)[:4]}" for _ in range(queries)], None),
+        ("one word, filtered", [rng.choice(words) for _ in range(queries)], {"category": "Data"}),
+    )
+    print(f"{'query':>20} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, texts, filters in cases:
+        p50, p99 = latency(index, texts, filters)
+        print(f"{label:>20} {p50:>8.2f} {p99:>8.2f}")
+
+    updates = list(courses(1000, words, rng))
+    start = time.perf_counter()
+    for course in updates:
+        index.upsert(course)
+    print(f"re-index one course: {(time.perf_counter() - start) / len(updates) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-ins for MongoDB and RabbitMQ. Documents live in memory sorted by _id; every
+query costs one simulated round trip, so benchmarks measure our own overhead.
+"""
+import bisect
+import threading
+import time
+from itertools import islice
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pika.exceptions import AMQPConnectionError
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    return {f: doc[f] for f in ("_id", *projection) if f in doc}
+
+
+class Cursor:
+
+    def __init__(self, docs, projection, round_trip):
+        self.docs = docs
+        self.projection = projection
+        self.round_trip = round_trip
+        self._limit = None
+        self._batch_size = None
+
+    def sort(self, key, direction=1):
+        # Documents are already in _id order
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        # One simulated round trip per batch
+        self._batch_size = n
+        return self
+
+    def __iter__(self):
+        time.sleep(self.round_trip)
+        docs = self.docs if self._limit is None else islice(self.docs, self._limit)
+        for i, doc in enumerate(docs, 1):
+            yield _project(doc, self.projection)
+            if self._batch_size and i % self._batch_size == 0:
+                time.sleep(self.round_trip)
+
+
+class CourseCollection:
+    """courses collection: find with an optional {"_id": {"$gt": ...}} filter, insert_one/insert_many, find_one by _id."""
+
+    def __init__(self, docs, round_trip):
+        self.docs = sorted(docs, key=lambda d: d["_id"])
+        self.ids = [d["_id"] for d in self.docs]
+        self.round_trip = round_trip
+
+    def find(self, query=None, projection=None):
+        start = 0
+        if query and "_id" in query:
+            start = bisect.bisect_right(self.ids, query["_id"]["$gt"])
+        return Cursor(islice(self.docs, start, None), projection, self.round_trip)
+
+    def insert_one(self, doc):
+        time.sleep(self.round_trip)
+        self._append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs, ordered=True):
+        time.sleep(self.round_trip)
+        for doc in docs:
+            self._append(doc)
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    def _append(self, doc):
+        # Like pymongo, set the _id on the caller's dict. New ObjectIds are
+        # the largest, so appending keeps the order.
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        self.ids.append(doc["_id"])
+
+    def find_one(self, query, projection=None):
+        time.sleep(self.round_trip)
+        i = bisect.bisect_left(self.ids, query["_id"])
+        if i < len(self.ids) and self.ids[i] == query["_id"]:
+            return _project(self.docs[i], projection)
+        return None
+
+
+class MetaCollection:
+    """catalog_meta collection holding the version counter."""
+
+    def __init__(self, round_trip):
+        self.docs = {}
+        self.round_trip = round_trip
+
+    def find_one(self, query):
+        time.sleep(self.round_trip)
+        return self.docs.get(query["_id"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        time.sleep(self.round_trip)
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        doc["version"] += update["$inc"]["version"]
+        return doc
+
+
+class FakeBroker:
+    """
+    In-memory RabbitMQ stand-in.
+
+    connect_latency: seconds spent on TCP + AMQP handshake per connection
+    publish_latency: seconds until the broker confirms a publish
+    reachable: when False, connecting fails after connect_timeout seconds
+    """
+
+    def __init__(self, connect_latency=0.02, publish_latency=0.001, connect_timeout=0.5):
+        self.connect_latency = connect_latency
+        self.publish_latency = publish_latency
+        self.connect_timeout = connect_timeout
+        self.reachable = True
+        self.connections = 0
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def connection_factory(self):
+        broker = self
+
+        class FakeBlockingConnection:
+            def __init__(self, parameters=None):
+                if not broker.reachable:
+                    time.sleep(broker.connect_timeout)
+                    raise AMQPConnectionError("broker unreachable")
+                time.sleep(broker.connect_latency)
+                with broker._lock:
+                    broker.connections += 1
+                self.is_closed = False
+
+            def channel(self):
+                return FakeChannel(broker)
+
+            def process_data_events(self, time_limit=0):
+                pass
+
+            def close(self):
+                self.is_closed = True
+
+        return FakeBlockingConnection
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_closed = False
+
+    def exchange_declare(self, **kwargs):
+        time.sleep(self.broker.publish_latency)
+
+    def confirm_delivery(self):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if not self.broker.reachable:
+            self.is_closed = True
+            raise AMQPConnectionError("connection lost")
+        time.sleep(self.broker.publish_latency)
+        with self.broker._lock:
+            self.broker.messages.append((exchange, routing_key, body))
+
+    def close(self):
+        self.is_closed = True
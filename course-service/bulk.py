@@ -0,0 +1,71 @@
+# bulk.py
+import json
+
+# Courses written (and announced) per insert_many.
+BULK_CHUNK_SIZE = 1000
+
+# Invalid lines reported back in detail; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
+
+# Documents fetched per cursor round trip during an export.
+EXPORT_BATCH_SIZE = 1000
+
+
+def parse_course(line):
+    """
+    One NDJSON line -> course document to insert.
+    Raises ValueError when the line is not a course.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    title = data.get("title")
+    if not title:
+        raise ValueError("title is required")
+    if not isinstance(title, str):
+        raise ValueError("title must be a string")
+    description = data.get("description", "")
+    if not isinstance(description, str):
+        raise ValueError("description must be a string")
+    return {"title": title, "description": description}
+
+
+def read_chunks(lines, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Group the valid courses of an NDJSON stream into chunks.
+    Blank lines are skipped; invalid ones are yielded as errors, with their
+    1-based line numbers, alongside the chunk they would have joined.
+
+    Yields:
+        (docs, errors): a list of (line number, document) and a list of
+        {"line", "error"}
+    """
+    docs, errors = [], []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            docs.append((number, parse_course(line)))
+        except ValueError as e:
+            errors.append({"line": number, "error": str(e)})
+            continue
+        if len(docs) >= chunk_size:
+            yield docs, errors
+            docs, errors = [], []
+    if docs or errors:
+        yield docs, errors
+
+
+def export_lines(cursor, to_json, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream a cursor as NDJSON, one course per line. Lines are sent in
+    groups of batch_size so memory stays flat however large the catalog is.
+    """
+    batch = []
+    for doc in cursor:
+        batch.append(json.dumps(to_json(doc), separators=(",", ":")))
+        if len(batch) >= batch_size:
+            yield ("\n".join(batch) + "\n").encode("utf-8")
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode("utf-8")
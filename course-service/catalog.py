@@ -0,0 +1,60 @@
+# catalog.py
+import hashlib
+import re
+
+from pymongo import ReturnDocument
+
+# Largest page a client may ask for with ?limit=.
+MAX_PAGE_SIZE = 500
+
+# Document holding the catalog version in the catalog_meta collection.
+CATALOG_VERSION_ID = "courses"
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def parse_fields(raw):
+    """
+    Turn ?fields=title,description into a Mongo projection.
+    The id is always returned. Returns None when every field is wanted.
+    Raises ValueError on names that are not plain top-level fields.
+    """
+    if not raw:
+        return None
+
+    projection = {}
+    for name in raw.split(","):
+        name = name.strip()
+        if not name or name in ("id", "_id"):
+            continue
+        if not _FIELD_NAME.match(name):
+            raise ValueError(f"Invalid field name: {name}")
+        projection[name] = 1
+    return projection or {"_id": 1}
+
+
+def catalog_version(meta):
+    """Current catalog version; 0 before the first change."""
+    doc = meta.find_one({"_id": CATALOG_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+def bump_catalog_version(meta):
+    """Record a create/update/delete. Called after the write succeeded."""
+    doc = meta.find_one_and_update(
+        {"_id": CATALOG_VERSION_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def listing_etag(version, args):
+    """
+    Strong ETag of a /courses response: the catalog version plus the query
+    parameters that shape the body (in any order).
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    return f"v{version}-{digest}"
@@ -0,0 +1,317 @@
+# publisher.py
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+
+import pika
+from pika.exceptions import AMQPError, NackError, UnroutableError
+
+try:
+    import fcntl
+except ImportError:  # Windows: the spool is then only safe within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Spooled events replayed per rewrite of the spool file.
+REPLAY_CHUNK = 500
+
+
+class _Slot:
+    """One pooled connection with its confirmed channel."""
+
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+        self.pid = None
+
+    def reset(self):
+        connection = self.connection
+        self.connection = None
+        self.channel = None
+        # Never close a socket inherited from a parent process
+        if connection is not None and self.pid == os.getpid():
+            try:
+                if not connection.is_closed:
+                    connection.close()
+            except Exception:
+                pass
+
+
+class EventPublisher:
+    """
+    Long-lived publisher for course events.
+
+    A small pool of connections, each with one channel in confirm mode, lets
+    request threads publish concurrently without a broker handshake per
+    event. Messages are persistent.
+
+    When the broker cannot be reached, events are appended to a local spool
+    file and a background thread replays them in order once it is back.
+    While the spool file is not empty new events queue behind it, so they
+    are not delivered ahead of older ones, whichever process spooled those.
+    Replay is at-least-once: every message carries a message_id consumers
+    can deduplicate on.
+
+    Several processes may share the spool (the debug reloader, gunicorn
+    workers): every read and rewrite of it holds an flock on a lock file
+    next to it. Messages the broker nacks are moved to a dead-letter file
+    instead of being retried.
+    """
+
+    def __init__(self, rabbitmq_url, exchange, spool_path, pool_size=4, retry_interval=5,
+                 dead_letter_path=None):
+        self.rabbitmq_url = rabbitmq_url
+        self.exchange = exchange
+        self.spool_path = spool_path
+        self.lock_path = f"{spool_path}.lock"
+        self.dead_letter_path = dead_letter_path or f"{spool_path}.dead"
+        self.retry_interval = retry_interval  # seconds
+
+        self._slots = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._slots.put(_Slot())
+
+        self._spool_lock = threading.Lock()
+        self._spooled = len(self._read_spool())
+        self._wake = threading.Event()
+        self._thread = None
+
+        self._stats_lock = threading.Lock()
+        self.published = 0
+        self.spooled_total = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        """Start the replay thread; spooled events from a previous run go first."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="event-spool", daemon=True)
+        self._thread.start()
+        if self._spooled:
+            logger.info(f"{self._spooled} spooled events waiting for RabbitMQ")
+            self._wake.set()
+
+    def _ensure_channel(self, slot):
+        if slot.pid != os.getpid():
+            # Forked worker: the parent's connection is not usable here
+            slot.connection = None
+            slot.channel = None
+
+        if slot.connection is not None and not slot.connection.is_closed:
+            try:
+                # Service heartbeats and surface a dropped connection before publishing
+                slot.connection.process_data_events(time_limit=0)
+            except AMQPError:
+                slot.reset()
+
+        if slot.channel is None or slot.channel.is_closed:
+            slot.reset()
+            slot.connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
+            slot.pid = os.getpid()
+            slot.channel = slot.connection.channel()
+            # basic_publish returns once the broker has the message
+            slot.channel.confirm_delivery()
+            slot.channel.exchange_declare(exchange=self.exchange, exchange_type="topic", durable=True)
+        return slot.channel
+
+    def _send(self, message):
+        """
+        Publish one message and wait for its confirm, retrying once on a
+        fresh connection if the pooled one turns out to be dead.
+        """
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # persistent
+            content_type="application/json",
+            message_id=message["message_id"]
+        )
+        body = json.dumps(message["body"]).encode("utf-8")
+
+        slot = self._slots.get()
+        try:
+            for attempt in range(2):
+                try:
+                    self._ensure_channel(slot).basic_publish(
+                        exchange=self.exchange,
+                        routing_key=message["routing_key"],
+                        body=body,
+                        properties=properties
+                    )
+                    return
+                except (NackError, UnroutableError):
+                    # The broker answered, so the connection is fine
+                    raise
+                except AMQPError:
+                    slot.reset()
+                    if attempt:
+                        raise
+        finally:
+            self._slots.put(slot)
+
+    def publish(self, event_type, payload):
+        """
+        Publish {"event_type", "payload"} on course.<event_type>.
+
+        Returns:
+            bool: True if the broker confirmed it, False if it was spooled
+        """
+        message = {
+            "routing_key": f"course.{event_type}",
+            "message_id": uuid.uuid4().hex,
+            "body": {"event_type": event_type, "payload": payload}
+        }
+
+        with self._locked_spool():
+            # The spool may hold another process's events, not only ours
+            if self._backlog():
+                self._append(message)
+                return False
+
+        try:
+            self._send(message)
+        except (NackError, UnroutableError) as e:
+            with self._locked_spool():
+                self._dead_letter(json.dumps(message) + "\n", e)
+            return False
+        except (AMQPError, OSError) as e:
+            logger.error(f"Event publish failed, spooling: {e}")
+            with self._locked_spool():
+                self._append(message)
+            return False
+
+        with self._stats_lock:
+            self.published += 1
+        return True
+
+    @contextmanager
+    def _locked_spool(self):
+        """Hold the spool against other threads, and other processes when possible."""
+        with self._spool_lock:
+            if fcntl is None:
+                yield
+                return
+            # Opened per use: an fd inherited across fork would share the lock
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _backlog(self):
+        """True if the spool file holds events. Called with the spool locked."""
+        try:
+            return os.path.getsize(self.spool_path) > 0
+        except FileNotFoundError:
+            return False
+
+    def _append(self, message):
+        """Add a message to the spool file. Called with the spool locked."""
+        with open(self.spool_path, "a", encoding="utf-8") as spool:
+            spool.write(json.dumps(message) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        self._spooled += 1
+        with self._stats_lock:
+            self.spooled_total += 1
+
+    def _dead_letter(self, line, error):
+        """Keep a message the broker refused. Called with the spool locked."""
+        logger.error(f"Event rejected by RabbitMQ, moved to {self.dead_letter_path}: {error}")
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead:
+            dead.write(line)
+            dead.flush()
+            os.fsync(dead.fileno())
+        with self._stats_lock:
+            self.dead_lettered += 1
+
+    def _read_spool(self):
+        try:
+            with open(self.spool_path, encoding="utf-8") as spool:
+                return [line for line in spool if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.retry_interval)
+            self._wake.clear()
+            if self._spooled:
+                try:
+                    self.replay()
+                except Exception as e:
+                    logger.error(f"Event spool replay failed: {e}")
+
+    def replay(self):
+        """
+        Publish spooled events oldest first, dropping each chunk from the
+        spool once it is confirmed. Stops at the first failure.
+        """
+        while True:
+            with self._locked_spool():
+                lines = self._read_spool()
+                # Another process may have drained (or removed) the spool
+                self._spooled = len(lines)
+            if not lines:
+                return
+
+            done = set()
+            sent = 0
+            failed = False
+            for line in lines[:REPLAY_CHUNK]:
+                try:
+                    self._send(json.loads(line))
+                    sent += 1
+                except ValueError:
+                    logger.error(f"Dropping unreadable spooled event: {line[:200]}")
+                except (NackError, UnroutableError) as e:
+                    with self._locked_spool():
+                        self._dead_letter(line, e)
+                except (AMQPError, OSError) as e:
+                    logger.warning(f"RabbitMQ still unavailable, {self._spooled} events spooled: {e}")
+                    failed = True
+                    break
+                done.add(line)
+
+            with self._locked_spool():
+                # Drop exactly the lines handled here (each is unique by its
+                # message_id): other processes may have appended or replayed
+                # some meanwhile
+                remaining = [line for line in self._read_spool() if line not in done]
+                temp_path = f"{self.spool_path}.{os.getpid()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as spool:
+                    spool.writelines(remaining)
+                    spool.flush()
+                    os.fsync(spool.fileno())
+                os.replace(temp_path, self.spool_path)
+                self._spooled = len(remaining)
+            with self._stats_lock:
+                self.replayed += sent
+
+            if failed:
+                return
+            if not remaining:
+                logger.info("Event spool drained")
+                return
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "published": self.published,
+                "spooled": self.spooled_total,
+                "replayed": self.replayed,
+                "dead_lettered": self.dead_lettered,
+                "pending": self._spooled,
+            }
+
+    def close(self):
+        """Close the pooled connections (e.g. on shutdown)."""
+        slots = [self._slots.get() for _ in range(self._slots.qsize())]
+        for slot in slots:
+            slot.reset()
+            self._slots.put(slot)
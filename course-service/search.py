@@ -0,0 +1,181 @@
+# search.py
+import bisect
+import heapq
+import math
+import re
+import threading
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Fields the index can filter and count results by.
+FACETS = ("category", "difficulty")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text or "").lower())
+
+
+class SearchIndex:
+    """
+    In-process inverted index over course titles and descriptions.
+
+    Ranking is BM25 with the title counted `title_weight` times. The last
+    word of a query also matches as a prefix ("pyth" finds "python") unless
+    the query ends with a space, so the index can back a type-ahead box.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, title_weight=2, max_expansions=16):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.max_expansions = max_expansions
+        self.loaded = False
+
+        self._postings = {}  # term -> {course_id: weighted term frequency}
+        self._terms = []  # sorted, for prefix lookups
+        self._lengths = {}  # course_id -> weighted length
+        self._doc_terms = {}  # course_id -> its terms, for removal
+        self._total_length = 0
+        self._docs = {}  # course_id -> {"id", "title", facets...}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _frequencies(self, course):
+        frequencies = {}
+        for term in tokenize(course.get("title")):
+            frequencies[term] = frequencies.get(term, 0) + self.title_weight
+        for term in tokenize(course.get("description")):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        return frequencies
+
+    def _add(self, course):
+        course_id = course["id"]
+        frequencies = self._frequencies(course)
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[course_id] = frequency
+        length = sum(frequencies.values())
+        self._lengths[course_id] = length
+        self._doc_terms[course_id] = tuple(frequencies)
+        self._total_length += length
+        self._docs[course_id] = {
+            "id": course_id,
+            "title": course.get("title"),
+            **{facet: course.get(facet) for facet in FACETS}
+        }
+        return frequencies
+
+    def _remove(self, course_id):
+        if course_id not in self._docs:
+            return
+        for term in self._doc_terms.pop(course_id):
+            docs = self._postings[term]
+            del docs[course_id]
+            if not docs:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+        self._total_length -= self._lengths.pop(course_id)
+        del self._docs[course_id]
+
+    def ensure_loaded(self, collection, to_json):
+        """Build the index from the collection on first use."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load(to_json(doc) for doc in collection.find())
+
+    def load(self, courses):
+        """Rebuild from scratch (courses: iterable of course JSON dicts)."""
+        with self._lock:
+            self._postings, self._lengths, self._doc_terms, self._docs = {}, {}, {}, {}
+            self._total_length = 0
+            for course in courses:
+                self._add(course)
+            self._terms = sorted(self._postings)
+        self.loaded = True
+
+    def upsert(self, course):
+        with self._lock:
+            self._remove(course["id"])
+            for term in self._add(course):
+                if len(self._postings[term]) == 1:
+                    bisect.insort(self._terms, term)
+
+    def remove(self, course_id):
+        with self._lock:
+            self._remove(course_id)
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        expansions = []
+        for term in self._terms[start:start + self.max_expansions]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _term_scores(self, term, average_length):
+        docs = self._postings.get(term)
+        if not docs:
+            return {}
+        count = len(self._docs)
+        idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+        k1, b = self.k1, self.b
+        return {
+            course_id: idf * frequency * (k1 + 1)
+            / (frequency + k1 * (1 - b + b * self._lengths[course_id] / average_length))
+            for course_id, frequency in docs.items()
+        }
+
+    def search(self, query, limit=10, filters=None):
+        """
+        Best `limit` courses for query, optionally restricted to facet values
+        (filters: {"category": "Data"}).
+
+        Returns:
+            dict: total matches, results [{id, title, score, facets...}] and
+            facet counts over every match
+        """
+        terms = tokenize(query)
+        if not terms:
+            return {"total": 0, "results": [], "facets": {facet: {} for facet in FACETS}}
+        prefix = None if query[-1:].isspace() else terms.pop()
+
+        with self._lock:
+            average_length = self._total_length / len(self._docs) if self._docs else 1
+            scores = {}
+            for term in terms:
+                for course_id, score in self._term_scores(term, average_length).items():
+                    scores[course_id] = scores.get(course_id, 0) + score
+            if prefix is not None:
+                # Best expansion only, so short prefixes do not pile up scores
+                best = {}
+                for term in self._expand(prefix):
+                    for course_id, score in self._term_scores(term, average_length).items():
+                        if score > best.get(course_id, 0):
+                            best[course_id] = score
+                for course_id, score in best.items():
+                    scores[course_id] = scores.get(course_id, 0) + score
+
+            docs = self._docs
+            if filters:
+                scores = {
+                    course_id: score for course_id, score in scores.items()
+                    if all(docs[course_id].get(facet) == value for facet, value in filters.items())
+                }
+
+            facets = {facet: {} for facet in FACETS}
+            for course_id in scores:
+                for facet in FACETS:
+                    value = docs[course_id].get(facet)
+                    if value is not None:
+                        facets[facet][value] = facets[facet].get(value, 0) + 1
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = [dict(docs[course_id], score=round(score, 4)) for course_id, score in top]
+
+        return {"total": len(scores), "results": results, "facets": facets}
+
+    def stats(self):
+        with self._lock:
+            return {"courses": len(self._docs), "terms": len(self._postings)}
@@ -0,0 +1,212 @@
+# snapshot.py
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Smaller bodies are not worth compressing.
+COMPRESS_MIN_BYTES = 1024
+
+
+class Encoded:
+    """
+    A JSON body encoded once, with its ETag and compressed variants made
+    on first use.
+    """
+
+    __slots__ = ("body", "_etag", "_gzip", "_brotli")
+
+    def __init__(self, body):
+        self.body = body
+        self._etag = None
+        self._gzip = None
+        self._brotli = None
+
+    @property
+    def etag(self):
+        # A hash of the content, so every replica hands out the same ETag.
+        if self._etag is None:
+            self._etag = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        return self._etag
+
+    def variant(self, accepted):
+        """
+        Pick the best encoding the client accepts.
+        Returns (body, content_encoding or None, etag).
+        """
+        if len(self.body) >= COMPRESS_MIN_BYTES:
+            if brotli is not None and "br" in accepted:
+                if self._brotli is None:
+                    self._brotli = brotli.compress(self.body)
+                return self._brotli, "br", f"{self.etag}-br"
+            if "gzip" in accepted:
+                if self._gzip is None:
+                    self._gzip = gzip.compress(self.body, compresslevel=6)
+                return self._gzip, "gzip", f"{self.etag}-gz"
+        return self.body, None, self.etag
+
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class CatalogSnapshot:
+    """
+    In-memory copy of the course catalog, each course pre-encoded.
+
+    Writes handled by this process are applied right away; writes from other
+    replicas arrive through a MongoDB change stream. After the stream breaks,
+    the whole catalog is reloaded, since changes may have been missed.
+    """
+
+    def __init__(self, to_json, max_listings=32, reconnect_delay=5):
+        self.to_json = to_json
+        self.max_listings = max_listings
+        self.reconnect_delay = reconnect_delay  # seconds
+        self.loaded = False
+
+        self._courses = {}  # id -> (course, Encoded)
+        self._ids = []  # sorted; ObjectId hex strings sort in _id order
+        self._listings = {}  # fields -> Encoded, dropped on every change
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def subscribe(self, listener):
+        """
+        Mirror every change into listener, an object with load(courses),
+        upsert(course) and remove(course_id) (e.g. the search index).
+        """
+        self._listeners.append(listener)
+
+    def ensure_loaded(self, collection, watch=True):
+        """Load the catalog on first use, then follow its change stream."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            # Open the stream first so nothing written during the load is missed.
+            stream = collection.watch(full_document="updateLookup") if watch else None
+            self.load(collection)
+            if stream is not None:
+                threading.Thread(
+                    target=self._follow, args=(collection, stream), name="catalog-snapshot", daemon=True
+                ).start()
+
+    def load(self, collection):
+        courses = {}
+        for doc in collection.find():
+            course = self.to_json(doc)
+            courses[course["id"]] = (course, Encoded(encode(course)))
+
+        with self._lock:
+            self._courses = courses
+            self._ids = sorted(courses)
+            self._listings = {}
+        for listener in self._listeners:
+            listener.load(course for course, _ in courses.values())
+        self.loaded = True
+        logger.info(f"Catalog snapshot loaded: {len(courses)} courses")
+
+    def upsert(self, course):
+        entry = (course, Encoded(encode(course)))
+        with self._lock:
+            if course["id"] not in self._courses:
+                bisect.insort(self._ids, course["id"])
+            self._courses[course["id"]] = entry
+            self._listings = {}
+        for listener in self._listeners:
+            listener.upsert(course)
+
+    def remove(self, course_id):
+        with self._lock:
+            if self._courses.pop(course_id, None) is not None:
+                del self._ids[bisect.bisect_left(self._ids, course_id)]
+                self._listings = {}
+        for listener in self._listeners:
+            listener.remove(course_id)
+
+    def apply_change(self, change):
+        """Apply one change stream event."""
+        operation = change["operationType"]
+        if operation in ("insert", "update", "replace"):
+            # None when the course was deleted before the lookup ran
+            doc = change.get("fullDocument")
+            if doc is not None:
+                self.upsert(self.to_json(doc))
+        elif operation == "delete":
+            self.remove(str(change["documentKey"]["_id"]))
+
+    def _follow(self, collection, stream):
+        while True:
+            try:
+                if stream is None:
+                    stream = collection.watch(full_document="updateLookup")
+                    self.load(collection)
+                with stream:
+                    for change in stream:
+                        self.apply_change(change)
+            except PyMongoError as e:
+                logger.error(f"Catalog change stream failed, reloading in {self.reconnect_delay} sec: {e}")
+                time.sleep(self.reconnect_delay)
+            stream = None
+
+    def course(self, course_id):
+        """Encoded course, or None if it is not in the snapshot."""
+        entry = self._courses.get(course_id)
+        return entry[1] if entry is not None else None
+
+    def listing(self, fields=None):
+        """
+        Encoded list of every course, limited to `fields` (plus id) when
+        given. The full listing is joined from the per-course bytes.
+        """
+        key = tuple(sorted(fields)) if fields else None
+        encoded = self._listings.get(key)
+        if encoded is not None:
+            return encoded
+
+        with self._lock:
+            if key is None:
+                body = b"[" + b",".join(self._courses[i][1].body for i in self._ids) + b"]"
+            else:
+                body = encode([self._project(self._courses[i][0], key) for i in self._ids])
+            encoded = Encoded(body)
+            if len(self._listings) >= self.max_listings:
+                self._listings = {}
+            self._listings[key] = encoded
+        return encoded
+
+    def page(self, fields=None, after=None, limit=50):
+        """Encoded {"courses", "next_after"} page of courses after the `after` id."""
+        key = tuple(sorted(fields)) if fields else None
+        with self._lock:
+            start = bisect.bisect_right(self._ids, after) if after else 0
+            ids = self._ids[start:start + limit]
+            courses = [
+                self._courses[i][0] if key is None else self._project(self._courses[i][0], key)
+                for i in ids
+            ]
+            has_more = start + limit < len(self._ids)
+        return Encoded(encode({"courses": courses, "next_after": ids[-1] if has_more else None}))
+
+    @staticmethod
+    def _project(course, fields):
+        projected = {"id": course["id"]}
+        for field in fields:
+            if field != "_id" and field in course:
+                projected[field] = course[field]
+        return projected
@@ -0,0 +1,408 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from bson import ObjectId
+from pika.exceptions import AMQPConnectionError, NackError
+from pymongo.errors import BulkWriteError
+from werkzeug.datastructures import MultiDict
+
+import app as course_app
+import publisher
+from bulk import export_lines, parse_course, read_chunks
+from catalog import listing_etag, parse_fields
+from publisher import EventPublisher
+from search import SearchIndex
+from snapshot import CatalogSnapshot
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d[key])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCourses:
+    """courses collection: every document in a list, queries counted."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        after = ((query or {}).get("_id") or {}).get("$gt")
+        docs = [d for d in self.docs if after is None or d["_id"] > after]
+        if projection:
+            docs = [{k: v for k, v in d.items() if k == "_id" or k in projection} for d in docs]
+        return FakeCursor([dict(d) for d in docs])
+
+    def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if d["_id"] == query["_id"]), None)
+
+    def insert_one(self, doc):
+        doc["_id"] = ObjectId()
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs):
+        for doc in docs:
+            self.insert_one(doc)
+
+
+class FakeMeta:
+
+    def __init__(self):
+        self.version = 0
+
+    def find_one(self, query):
+        return {"_id": query["_id"], "version": self.version}
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.version += update["$inc"]["version"]
+        return {"_id": query["_id"], "version": self.version}
+
+
+def course(n, **fields):
+    return dict({"_id": ObjectId(f"{n:024x}"), "title": f"Course {n}", "description": ""}, **fields)
+
+
+class FakeBroker:
+    """Stands in for pika.BlockingConnection; events are recorded by payload n."""
+
+    def __init__(self):
+        self.up = False
+        self.nacked = set()
+        self.received = []
+
+    def connection(self, parameters):
+        broker = self
+        if not broker.up:
+            raise AMQPConnectionError("broker down")
+
+        class Channel:
+            is_closed = False
+
+            def confirm_delivery(self):
+                pass
+
+            def exchange_declare(self, **kwargs):
+                pass
+
+            def basic_publish(self, exchange, routing_key, body, properties=None):
+                if not broker.up:
+                    self.is_closed = True
+                    raise AMQPConnectionError("connection lost")
+                n = json.loads(body)["payload"]["n"]
+                if n in broker.nacked:
+                    raise NackError([])
+                broker.received.append(n)
+
+        class Connection:
+            is_closed = False
+
+            def channel(self):
+                return Channel()
+
+            def process_data_events(self, time_limit=0):
+                pass
+
+            def close(self):
+                self.is_closed = True
+
+        return Connection()
+
+
+class TestEventPublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.spool = os.path.join(self.dir, "course_events.spool")
+        self.broker = FakeBroker()
+        patcher = mock.patch.object(publisher.pika, "BlockingConnection", self.broker.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def publisher(self):
+        return EventPublisher("amqp://test", "learning_events", self.spool, retry_interval=3600)
+
+    def test_spooled_events_replay_in_order(self):
+        events = self.publisher()
+        self.assertFalse(events.publish("course_created", {"n": 0}))
+        self.broker.up = True
+        # Queued behind the spool, not sent ahead of it
+        self.assertFalse(events.publish("course_created", {"n": 1}))
+        events.replay()
+        self.assertTrue(events.publish("course_created", {"n": 2}))
+        self.assertEqual(self.broker.received, [0, 1, 2])
+        self.assertEqual(events.stats()["pending"], 0)
+
+    def test_processes_sharing_a_spool_lose_nothing(self):
+        first, second = self.publisher(), self.publisher()
+        for n in range(3):
+            first.publish("course_created", {"n": n})
+        for n in range(3, 6):
+            second.publish("course_created", {"n": n})
+
+        self.broker.up = True
+        second.replay()
+        self.assertEqual(self.broker.received, list(range(6)))
+
+        # The spool was drained by the other process: nothing is held back
+        first.replay()
+        self.assertEqual(first.stats()["pending"], 0)
+        self.assertTrue(first.publish("course_created", {"n": 6}))
+
+    def test_events_queue_behind_another_process_backlog(self):
+        first, second = self.publisher(), self.publisher()
+        first.publish("course_created", {"n": 0})
+        self.broker.up = True
+        # second has spooled nothing itself, but must not overtake event 0
+        self.assertFalse(second.publish("course_created", {"n": 1}))
+        self.assertEqual(self.broker.received, [])
+        first.replay()
+        self.assertEqual(self.broker.received, [0, 1])
+        self.assertTrue(second.publish("course_created", {"n": 2}))
+
+    def test_nacked_events_are_dead_lettered(self):
+        events = self.publisher()
+        for n in range(3):
+            events.publish("course_created", {"n": n})
+        self.broker.up = True
+        self.broker.nacked = {1}
+        events.replay()
+
+        self.assertEqual(self.broker.received, [0, 2])
+        self.assertEqual(events.stats()["pending"], 0)
+        with open(events.dead_letter_path) as dead:
+            self.assertEqual([json.loads(line)["body"]["payload"]["n"] for line in dead], [1])
+
+        # A nack on a direct publish does not block the events behind it
+        self.broker.nacked = {3}
+        self.assertFalse(events.publish("course_created", {"n": 3}))
+        self.assertTrue(events.publish("course_created", {"n": 4}))
+        self.assertEqual(self.broker.received, [0, 2, 4])
+
+
+class TestCatalog(unittest.TestCase):
+
+    def test_parse_fields(self):
+        self.assertIsNone(parse_fields(None))
+        self.assertEqual(parse_fields("title, description,id"), {"title": 1, "description": 1})
+        # Only the id was asked for
+        self.assertEqual(parse_fields("_id"), {"_id": 1})
+        for raw in ("title,$where", "attempts.score", "1st"):
+            with self.assertRaises(ValueError):
+                parse_fields(raw)
+
+    def test_listing_etag_depends_on_version_and_query_only(self):
+        etag = listing_etag(3, MultiDict([("fields", "title"), ("limit", "10")]))
+        self.assertEqual(etag, listing_etag(3, MultiDict([("limit", "10"), ("fields", "title")])))
+        self.assertNotEqual(etag, listing_etag(4, MultiDict([("fields", "title"), ("limit", "10")])))
+        self.assertNotEqual(etag, listing_etag(3, MultiDict([("fields", "title"), ("limit", "20")])))
+        self.assertTrue(etag.startswith("v3-"))
+
+
+class AppTestCase(unittest.TestCase):
+    snapshot = "false"
+
+    def setUp(self):
+        self.courses = FakeCourses([course(n) for n in range(1, 6)])
+        self.meta = FakeMeta()
+        for name, value in (("get_db", lambda: self.courses), ("get_meta", lambda: self.meta)):
+            patcher = mock.patch.object(course_app, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        environ = {"COURSE_SNAPSHOT_ENABLED": self.snapshot, "COURSE_SNAPSHOT_WATCH": "false"}
+        with mock.patch.dict(os.environ, environ):
+            os.environ.pop("RABBITMQ_URL", None)
+            self.client = course_app.create_app().test_client()
+
+
+class TestCourseListing(AppTestCase):
+
+    def test_unchanged_listing_is_answered_without_a_query(self):
+        response = self.client.get("/courses?fields=title")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 5)
+        finds = self.courses.finds
+
+        response = self.client.get("/courses?fields=title", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.courses.finds, finds)
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get("/courses").headers["ETag"]
+        self.client.post("/courses", json={"title": "New"})
+        response = self.client.get("/courses", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 6)
+
+    def test_pages_follow_next_after(self):
+        page = self.client.get("/courses?limit=2&fields=title").get_json()
+        titles = [c["title"] for c in page["courses"]]
+        while page["next_after"]:
+            page = self.client.get(f"/courses?limit=2&fields=title&after={page['next_after']}").get_json()
+            titles += [c["title"] for c in page["courses"]]
+        self.assertEqual(titles, [f"Course {n}" for n in range(1, 6)])
+
+
+class TestSnapshotListing(AppTestCase):
+    snapshot = "true"
+
+    def test_etag_is_a_content_hash(self):
+        response = self.client.get("/courses")
+        etag = response.headers["ETag"]
+        self.assertEqual(self.client.get("/courses", headers={"If-None-Match": etag}).status_code, 304)
+        self.client.post("/courses", json={"title": "New"})
+        self.assertEqual(self.client.get("/courses", headers={"If-None-Match": etag}).status_code, 200)
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = CatalogSnapshot(lambda doc: dict(doc))
+        for n in (3, 1, 4, 2):
+            self.snapshot.upsert({"id": f"id{n}", "title": f"Course {n}"})
+
+    def page(self, after=None, limit=2, fields=None):
+        return json.loads(self.snapshot.page(fields, after, limit).body)
+
+    def test_pages_cover_every_course_once(self):
+        first = self.page()
+        self.assertEqual([c["id"] for c in first["courses"]], ["id1", "id2"])
+        self.assertEqual(first["next_after"], "id2")
+        # Exactly two pages: the last one has no cursor
+        last = self.page("id2")
+        self.assertEqual([c["id"] for c in last["courses"]], ["id3", "id4"])
+        self.assertIsNone(last["next_after"])
+        self.assertEqual(self.page("id4"), {"courses": [], "next_after": None})
+
+    def test_cursor_of_a_removed_course_still_works(self):
+        self.snapshot.remove("id2")
+        self.assertEqual([c["id"] for c in self.page("id2")["courses"]], ["id3", "id4"])
+
+    def test_projection(self):
+        self.assertEqual(self.page(limit=1, fields={"title": 1})["courses"], [{"id": "id1", "title": "Course 1"}])
+        self.assertEqual(self.page(limit=1, fields={"_id": 1})["courses"], [{"id": "id1"}])
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def assertConsistent(self, index):
+        self.assertEqual(index._terms, sorted(index._postings))
+        for course_id, terms in index._doc_terms.items():
+            for term in terms:
+                self.assertIn(course_id, index._postings[term])
+
+    def test_upsert_and_remove_keep_terms_in_step(self):
+        index = SearchIndex()
+        index.load([{"id": "a", "title": "Python basics"}, {"id": "b", "title": "Python data"}])
+        index.upsert({"id": "c", "title": "Rust", "description": "systems programming"})
+        self.assertConsistent(index)
+
+        # Renaming drops the old words
+        index.upsert({"id": "b", "title": "Pandas"})
+        self.assertConsistent(index)
+        self.assertNotIn("data", index._terms)
+        self.assertEqual([r["id"] for r in index.search("python")["results"]], ["a"])
+
+        index.remove("a")
+        index.remove("missing")
+        self.assertConsistent(index)
+        self.assertEqual(index.search("pyth")["total"], 0)
+        self.assertEqual([r["id"] for r in index.search("pan")["results"]], ["b"])
+        self.assertEqual(index.stats(), {"courses": 2, "terms": 4})
+
+
+class TestBulk(unittest.TestCase):
+
+    def test_read_chunks_numbers_lines_and_reports_errors(self):
+        lines = [
+            b'{"title": "a"}\n',
+            b"\n",
+            b'{"title": 5}\n',
+            b"[1]\n",
+            b'{"title": "b", "description": "d"}\n',
+            b"not json\n",
+            b'{"title": "c"}',
+        ]
+        chunks = list(read_chunks(io.BytesIO(b"".join(lines)), chunk_size=2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0][0], [(1, {"title": "a", "description": ""}), (5, {"title": "b", "description": "d"})])
+        self.assertEqual([e["line"] for e in chunks[0][1]], [3, 4])
+        self.assertEqual(chunks[0][1][0]["error"], "title must be a string")
+        self.assertEqual(chunks[1][0], [(7, {"title": "c", "description": ""})])
+        self.assertEqual([e["line"] for e in chunks[1][1]], [6])
+
+    def test_parse_course_rejects_non_strings(self):
+        for line in ('{"title": ["a"]}', '{"title": {"x": 1}}', '{"title": "a", "description": 1}', '{"title": ""}'):
+            with self.assertRaises(ValueError):
+                parse_course(line)
+
+    def test_export_lines_batches(self):
+        chunks = list(export_lines(iter([{"n": n} for n in range(5)]), dict, batch_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual([json.loads(line) for line in b"".join(chunks).splitlines()], [{"n": n} for n in range(5)])
+
+
+class TestBulkImport(AppTestCase):
+
+    def ndjson(self, count):
+        return "".join(json.dumps({"title": f"Imported {n}"}) + "\n" for n in range(count))
+
+    def test_import_and_export(self):
+        response = self.client.post("/courses/bulk", data=self.ndjson(3) + "oops\n")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {
+            "imported": 3, "failed": 1, "errors": [{"line": 4, "error": mock.ANY}], "stopped_at_line": None
+        })
+        exported = self.client.get("/courses/export?fields=title").get_data().splitlines()
+        self.assertEqual(len(exported), 8)
+        self.assertEqual(set(json.loads(exported[-1])), {"id", "title"})
+
+    def test_failed_chunk_stops_the_import(self):
+        insert_many = self.courses.insert_many
+        calls = []
+
+        def failing_insert_many(docs):
+            calls.append(len(docs))
+            if len(calls) == 2:
+                insert_many(docs[:10])
+                raise BulkWriteError({"nInserted": 10, "writeErrors": [{"index": 10, "errmsg": "E11000 duplicate"}]})
+            insert_many(docs)
+
+        self.courses.insert_many = failing_insert_many
+        response = self.client.post("/courses/bulk", data=self.ndjson(2500))
+        self.assertEqual(response.status_code, 207)
+        result = response.get_json()
+        self.assertEqual(result["imported"], 1010)
+        self.assertEqual(result["stopped_at_line"], 1011)
+        self.assertEqual(result["errors"], [{"line": 1011, "error": "Not imported: E11000 duplicate"}])
+        # The third chunk was never written
+        self.assertEqual(calls, [1000, 1000])
+        self.assertEqual(len(self.courses.docs), 5 + 1010)
+
+
+if __name__ == '__main__':
+    unittest.main()
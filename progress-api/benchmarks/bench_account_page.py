@@ -0,0 +1,88 @@
+"""
+Requests and latency to load the account page for a user with 1, 10 and 50
+subscriptions: the old per-course waterfall (quiz lookup, then progress, for
+every course) versus one POST /progress/batch.
+
+progress-api runs in-process against a Mongo stand-in; every browser request
+also pays a simulated round trip to user-service, and every quiz lookup a
+simulated quiz-service call. Requires httpx.
+
+Usage: python benchmarks/bench_account_page.py [hop_ms] [mongo_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure Mongo reads, not the summary cache
+os.environ["PROGRESS_EVENTS_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.standins import AsyncCollection  # noqa: E402
+
+USER = "bench-user"
+
+
+def progress_docs(subscriptions):
+    return [
+        {"user_id": USER, "course_id": f"course-{i}", "quiz_id": i, "average_score": 5.0,
+         "best_score": 9, "last_score": 7, "total_attempts": 3, "improvement_percentage": 0,
+         "updated_at": "2024-01-01T00:00:00"}
+        for i in range(subscriptions)
+    ]
+
+
+async def waterfall(client, course_ids, hop):
+    requests = 2  # /api/me and /api/courses-data
+    await asyncio.sleep(2 * hop)
+    for i, course_id in enumerate(course_ids):
+        await asyncio.sleep(2 * hop)  # browser -> user-service -> quiz-service
+        requests += 1
+        await asyncio.sleep(hop)  # browser -> user-service
+        response = await client.get(f"/progress/{USER}/{course_id}/{i}")
+        response.raise_for_status()
+        requests += 1
+    return requests
+
+
+async def batched(client, course_ids, hop):
+    requests = 2
+    await asyncio.sleep(2 * hop)
+    await asyncio.sleep(hop)
+    response = await client.post("/progress/batch", json={
+        "user_id": USER, "items": [{"course_id": c} for c in course_ids]
+    })
+    response.raise_for_status()
+    return requests + 1
+
+
+async def run(hop, mongo_round_trip):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://progress-api") as client:
+        print(f"{'subscriptions':>13} {'old requests':>13} {'old ms':>8} {'batch requests':>15} {'batch ms':>9}")
+        for subscriptions in (1, 10, 50):
+            main.app.state.progress_col = AsyncCollection(progress_docs(subscriptions), mongo_round_trip)
+            course_ids = [f"course-{i}" for i in range(subscriptions)]
+
+            start = time.perf_counter()
+            old_requests = await waterfall(client, course_ids, hop)
+            old_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            new_requests = await batched(client, course_ids, hop)
+            new_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{subscriptions:>13} {old_requests:>13} {old_ms:>8.1f} {new_requests:>15} {new_ms:>9.1f}")
+
+
+def main_bench():
+    hop = (float(sys.argv[1]) if len(sys.argv) > 1 else 20) / 1000
+    mongo_round_trip = (float(sys.argv[2]) if len(sys.argv) > 2 else 1) / 1000
+    asyncio.run(run(hop, mongo_round_trip))
+
+
+if __name__ == "__main__":
+    main_bench()
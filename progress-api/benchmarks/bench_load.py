@@ -0,0 +1,120 @@
+"""
+Load test of GET /progress/{user}/{course}/{quiz} on one uvicorn worker:
+the previous sync endpoint (blocking pymongo, run in the threadpool) versus
+the async endpoint (motor client from the lifespan, ORJSON responses).
+
+Both apps run in-process against a Mongo stand-in with the same simulated
+round trip. Requires httpx.
+
+Usage: python benchmarks/bench_load.py [requests] [round_trip_ms]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure Mongo reads, not the summary cache
+os.environ["PROGRESS_EVENTS_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.standins import AsyncCollection, BlockingCollection  # noqa: E402
+
+SYNC_PORT = 5813
+ASYNC_PORT = 5814
+USERS = [f"user-{i}" for i in range(100)]
+
+
+def progress_docs():
+    return [
+        {"user_id": user, "course_id": "course-1", "quiz_id": 1, "attempts": [],
+         "average_score": 5.0, "best_score": 9, "last_score": 7, "total_attempts": 12,
+         "improvement_percentage": 40.0, "updated_at": "2024-01-01T00:00:00"}
+        for user in USERS
+    ]
+
+
+def sync_app(round_trip):
+    """The endpoint as it was before moving to motor."""
+    app = FastAPI()
+    progress_col = BlockingCollection(progress_docs(), round_trip)
+
+    @app.get("/progress/{user_id}/{course_id}/{quiz_id}")
+    def get_progress(user_id: str, course_id: str, quiz_id: str):
+        result = progress_col.find_one(main.progress_key(user_id, course_id, quiz_id), main.SUMMARY_PROJECTION)
+        if not result:
+            return {"message": "No progress data yet"}
+        return {
+            "user_id": user_id, "course_id": course_id, "quiz_id": quiz_id,
+            "average_score": result.get("average_score"), "highest_score": result.get("best_score"),
+            "recent_score": result.get("last_score"), "attempts": result.get("total_attempts", 0),
+            "improvement": result.get("improvement_percentage"), "updated_at": result.get("updated_at")
+        }
+
+    return app
+
+
+def async_app(round_trip):
+    # The real app, with the stand-in in place of the lifespan's motor client
+    main.app.state.progress_col = AsyncCollection(progress_docs(), round_trip)
+    main.app.state.attempts_col = AsyncCollection([], round_trip)
+    return main.app
+
+
+def serve(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           lifespan="off", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def drive(base_url, requests, concurrency):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"/progress/{USERS[i % len(USERS)]}/course-1/1")
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / elapsed, latencies[int(len(latencies) * 0.99) - 1] * 1000, errors
+
+
+def main_bench():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+
+    serve(sync_app(round_trip), SYNC_PORT)
+    serve(async_app(round_trip), ASYNC_PORT)
+
+    print(f"{'concurrency':>11} {'sync req/s':>11} {'p99 ms':>8} {'async req/s':>12} {'p99 ms':>8}")
+    for concurrency in (10, 100, 500):
+        sync_rps, sync_p99, sync_errors = asyncio.run(
+            drive(f"http://127.0.0.1:{SYNC_PORT}", requests, concurrency))
+        async_rps, async_p99, async_errors = asyncio.run(
+            drive(f"http://127.0.0.1:{ASYNC_PORT}", requests, concurrency))
+        print(f"{concurrency:>11} {sync_rps:>11.0f} {sync_p99:>8.1f} {async_rps:>12.0f} {async_p99:>8.1f}"
+              f"   errors sync={sync_errors} async={async_errors}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,98 @@
+"""
+Response size and latency of the progress summary for a user with 10k
+attempts: the old full-document response (every attempt inline) versus the
+projected summary, plus one page of the paginated /attempts endpoint.
+
+Needs a MongoDB to write to; the app is pointed at a throwaway database.
+
+Usage: MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_progress_payload.py [attempts] [reads]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure Mongo reads, not the summary cache
+os.environ["PROGRESS_EVENTS_ENABLED"] = "false"
+os.environ["DATABASE_NAME"] = "progress_api_bench"
+
+from pymongo import MongoClient  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+import main  # noqa: E402
+from main import get_attempts, get_progress  # noqa: E402
+
+KEY = {"user_id": "bench-user", "course_id": "bench-course", "quiz_id": 1}
+
+
+def seed(db, attempts_count):
+    db.client.drop_database("progress_api_bench")
+    attempts = [
+        {"quiz_id": 1, "score": i % 10, "timestamp": f"2024-{i // 1000 % 12 + 1:02d}-01T00:00:{i:06d}"}
+        for i in range(attempts_count)
+    ]
+    summary = {"average_score": 4.5, "best_score": 9, "last_score": attempts[-1]["score"],
+               "total_attempts": attempts_count, "improvement_percentage": 0, "updated_at": "now"}
+
+    # Legacy layout for the old endpoint, bucketed layout for the new ones
+    db["legacy_progress"].insert_one(dict(KEY, attempts=attempts, **summary))
+    db["progress"].insert_one(dict(KEY, attempts=attempts[-50:], bucketed=True, **summary))
+    buckets = {}
+    for attempt in attempts:
+        buckets.setdefault(attempt["timestamp"][:7], []).append(attempt)
+    db["progress_attempts"].insert_many([
+        dict(KEY, bucket=bucket, attempts=items, count=len(items))
+        for bucket, items in sorted(buckets.items())
+    ])
+
+
+async def old_get_progress(request, user_id, course_id, quiz_id):
+    """The endpoint as it was: whole document, every attempt in the response."""
+    legacy = request.app.state.progress_col.database["legacy_progress"]
+    result = await legacy.find_one({"user_id": user_id, "course_id": course_id, "quiz_id": int(quiz_id)})
+    attempts = result.get("attempts", [])
+    return {
+        "user_id": user_id, "course_id": course_id, "quiz_id": quiz_id,
+        "average_score": result.get("average_score"), "highest_score": result.get("best_score"),
+        "recent_score": result.get("last_score"), "attempts": len(attempts),
+        "improvement": result.get("improvement_percentage"), "attempt_details": attempts
+    }
+
+
+async def measure(label, call, reads):
+    start = time.perf_counter()
+    for _ in range(reads):
+        response = await call()
+    elapsed_ms = (time.perf_counter() - start) / reads * 1000
+    size = len(json.dumps(response, default=str))
+    print(f"{label:<36} {size:>10} bytes {elapsed_ms:>9.3f} ms")
+
+
+async def run(attempts_count, reads):
+    async with main.lifespan(main.app):
+        request = Request({"type": "http", "app": main.app})
+        ids = ("bench-user", "bench-course", "1")
+        await measure("old summary (all attempts)", lambda: old_get_progress(request, *ids), reads)
+        await measure("projected summary", lambda: get_progress(request, *ids), reads)
+        await measure("attempts page (limit=50)",
+                      lambda: get_attempts(request, *ids, after=None, limit=50), reads)
+        await measure("attempts page (after=mid, limit=50)",
+                      lambda: get_attempts(request, *ids, after=f"2024-06-01T00:00:{attempts_count // 2:06d}",
+                                           limit=50), reads)
+
+
+def main_bench():
+    attempts_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    reads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    client = MongoClient(main.MONGO_URI)
+    seed(client["progress_api_bench"], attempts_count)
+    try:
+        asyncio.run(run(attempts_count, reads))
+    finally:
+        client.drop_database("progress_api_bench")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,70 @@
+"""
+Local stand-ins for MongoDB. They only simulate network cost, so benchmarks
+measure our own overhead.
+"""
+import asyncio
+import time
+
+
+def _matches(doc, query):
+    for field, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if doc.get(field) not in value["$in"]:
+                return False
+        elif doc.get(field) != value:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    included = [f for f, on in projection.items() if on and f != "_id"]
+    if included:
+        return {f: doc[f] for f in included if f in doc}
+    return {f: v for f, v in doc.items() if projection.get(f, 1)}
+
+
+class BlockingCollection:
+    """pymongo-style collection: find_one blocks for one round trip."""
+
+    def __init__(self, docs, round_trip):
+        self.docs = docs
+        self.round_trip = round_trip
+
+    def find_one(self, query, projection=None):
+        time.sleep(self.round_trip)
+        for doc in self.docs:
+            if _matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+
+class AsyncCursor:
+
+    def __init__(self, docs, round_trip):
+        self.docs = docs
+        self.round_trip = round_trip
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.round_trip)
+        for doc in self.docs:
+            yield doc
+
+
+class AsyncCollection(BlockingCollection):
+    """motor-style collection: find_one and find cost one round trip each."""
+
+    def find(self, query, projection=None):
+        return AsyncCursor([_project(doc, projection) for doc in self.docs if _matches(doc, query)],
+                           self.round_trip)
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(self.round_trip)
+        for doc in self.docs:
+            if _matches(doc, query):
+                return _project(doc, projection)
+        return None
@@ -0,0 +1,79 @@
+def parse_after(after):
+    """
+    Split an attempts page cursor "timestamp~seq" into (timestamp, seq).
+    A bare timestamp (older clients) gives seq None: resume after every
+    attempt at that timestamp.
+    """
+    timestamp, _, seq = after.rpartition("~")
+    if timestamp and seq.isdigit():
+        return timestamp, int(seq)
+    return after, None
+
+
+def attempts_page_pipeline(key, after, limit):
+    """
+    Aggregation returning up to `limit` attempts of a progress document
+    not migrated to buckets yet that come after the `after` cursor, oldest
+    first
+
+    Attempts are not stored in timestamp order (shard workers and retries
+    deliver late events), so they are sorted here. Ties on the timestamp are
+    broken by seq, the attempt's position in its array, which never changes
+    because attempts are only ever appended.
+    """
+    timestamp, seq = parse_after(after) if after else (None, None)
+    pipeline = [
+        {"$match": dict(key)},
+        {"$unwind": {"path": "$attempts", "includeArrayIndex": "seq"}},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$attempts", {"seq": "$seq"}]}}},
+        {"$sort": {"timestamp": 1, "seq": 1}},
+    ]
+
+    if timestamp:
+        later = {"timestamp": {"$gt": timestamp}}
+        if seq is not None:
+            later = {"$or": [later, {"timestamp": timestamp, "seq": {"$gt": seq}}]}
+        pipeline.append({"$match": later})
+    pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"_id": 0}})
+    return pipeline
+
+
+def buckets_query(key, after):
+    """Filter for the attempts buckets that can hold attempts after the cursor."""
+    query = dict(key)
+    if after:
+        # Buckets are monthly: skip the ones that end before the cursor
+        query["bucket"] = {"$gte": parse_after(after)[0][:7]}
+    return query
+
+
+def bucket_rows(bucket, after):
+    """
+    The attempts of one bucket document that come after the `after` cursor,
+    oldest first, each with its seq (position in the bucket). Every bucket
+    holds one month, so the rows of buckets read in month order are in
+    timestamp order too.
+    """
+    timestamp, seq = parse_after(after) if after else (None, None)
+    rows = [dict(attempt, seq=i) for i, attempt in enumerate(bucket.get("attempts") or [])]
+    rows.sort(key=lambda row: (row["timestamp"], row["seq"]))
+    if timestamp:
+        rows = [
+            row for row in rows
+            if row["timestamp"] > timestamp or (row["timestamp"] == timestamp and seq is not None and row["seq"] > seq)
+        ]
+    return rows
+
+
+def attempts_page(rows, limit):
+    """
+    Response for the rows of a pipeline run with limit + 1: the first
+    `limit` attempts and the cursor of the next page (None on the last one).
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_after = f"{rows[-1]['timestamp']}~{rows[-1]['seq']}" if has_more else None
+    for row in rows:
+        del row["seq"]
+    return {"attempts": rows, "next_after": next_after}
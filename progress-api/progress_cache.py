@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProgressCache:
+    """
+    In-process LRU + TTL cache of progress summaries keyed by
+    (user_id, course_id, quiz_id)
+
+    The progress worker bumps a `version` on every write and publishes the new
+    summary on progress.updated, which is written through here. An entry is
+    only ever replaced by a newer version, so a slow read that loaded an older
+    document cannot overwrite what the worker already pushed.
+
+    Entries are only as fresh as those pushes: while nothing is receiving
+    them (enabled=False) the cache is empty and every lookup misses.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at, version, summary)
+        # Newest version seen per key, kept after the entry itself is evicted
+        self._floors = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.write_throughs = 0
+        self.stale_puts = 0
+        self.evictions = 0
+        self._hit_time = 0.0
+        self._miss_time = 0.0
+
+    def generation(self):
+        """
+        Take before loading from the database and pass to put(), so a load
+        that raced with a full invalidation is not cached.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """
+        Returns:
+            dict or None: cached summary
+        """
+        with self._lock:
+            entry = self._entries.get(key) if self.enabled else None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, summary = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return summary
+
+    def _store(self, key, summary, version):
+        version = version or 0
+        floor = self._floors.get(key)
+        if floor is not None and version < floor:
+            self.stale_puts += 1
+            return False
+
+        self._entries[key] = (time.monotonic() + self.ttl, version, summary)
+        self._entries.move_to_end(key)
+        self._floors[key] = version
+        self._floors.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        while len(self._floors) > self.max_entries * 2:
+            self._floors.popitem(last=False)
+        return True
+
+    def put(self, key, summary, version, generation=None):
+        """Cache a summary read from the database (read-through)."""
+        if self.max_entries <= 0:
+            return False
+        with self._lock:
+            if not self.enabled or (generation is not None and generation != self._generation):
+                return False
+            return self._store(key, summary, version)
+
+    def write_through(self, key, summary, version):
+        """Apply a summary pushed by the progress worker."""
+        if self.max_entries <= 0:
+            return False
+        with self._lock:
+            if not self.enabled:
+                return False
+            self.write_throughs += 1
+            return self._store(key, summary, version)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._clear()
+            else:
+                self._entries.pop(key, None)
+
+    def set_enabled(self, enabled):
+        """
+        Turn caching on once updates are being received, off when they stop.
+        Either way the cache starts over empty, and loads begun before the
+        switch are not stored.
+        """
+        with self._lock:
+            self._clear()
+            self.enabled = enabled
+
+    def _clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._floors.clear()
+
+    def record_latency(self, hit, seconds):
+        with self._lock:
+            if hit:
+                self._hit_time += seconds
+            else:
+                self._miss_time += seconds
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "write_throughs": self.write_throughs,
+                "stale_puts": self.stale_puts,
+                "evictions": self.evictions,
+                "avg_hit_latency_ms": round(self._hit_time / self.hits * 1000, 3) if self.hits else None,
+                "avg_miss_latency_ms": round(self._miss_time / self.misses * 1000, 3) if self.misses else None,
+            }
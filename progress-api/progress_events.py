@@ -0,0 +1,61 @@
+"""
+Consumer of progress.updated events published by the progress worker after
+each write, feeding the summaries into the ProgressCache (write-through).
+"""
+import asyncio
+import json
+import logging
+
+import aio_pika
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EXCHANGE = "progress_events"
+PROGRESS_UPDATED = "progress.updated"
+
+
+def apply_updates(cache, event):
+    """Write every summary of a progress.updated event through to the cache."""
+    for update in event.get("updates", []):
+        key = (update["user_id"], update["course_id"], update["quiz_id"])
+        summary = {k: v for k, v in update.items() if k not in ("user_id", "course_id", "quiz_id")}
+        cache.write_through(key, summary, update.get("version"))
+
+
+async def listen(cache, rabbitmq_url, reconnect_delay=5):
+    """
+    Run until cancelled. Each process gets its own exclusive queue, so every
+    replica sees every update.
+
+    The cache is only on while the queue is bound: updates missed while
+    disconnected would otherwise leave summaries stale for up to the TTL.
+    It starts over empty on every (re)connect.
+    """
+    while True:
+        try:
+            connection = await aio_pika.connect(rabbitmq_url)
+            try:
+                async with connection:
+                    channel = await connection.channel()
+                    exchange = await channel.declare_exchange(
+                        PROGRESS_EXCHANGE, aio_pika.ExchangeType.TOPIC, durable=True
+                    )
+                    queue = await channel.declare_queue("", exclusive=True, auto_delete=True)
+                    await queue.bind(exchange, PROGRESS_UPDATED)
+                    cache.set_enabled(True)
+
+                    logger.info("Progress event listener waiting for events")
+                    async with queue.iterator(no_ack=True) as messages:
+                        async for message in messages:
+                            try:
+                                apply_updates(cache, json.loads(message.body))
+                            except (KeyError, TypeError, ValueError) as e:
+                                logger.warning(f"Ignoring malformed progress event: {str(e)}")
+            finally:
+                cache.set_enabled(False)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Progress event listener disconnected, retrying in {reconnect_delay} sec: {str(e)}")
+            await asyncio.sleep(reconnect_delay)
@@ -0,0 +1,218 @@
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from progress_cache import ProgressCache
+from test_progress_attempts import run_pipeline
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$gte" in condition and (value is None or value < condition["$gte"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def project(doc, projection):
+    if projection is None:
+        return dict(doc)
+    return {k: v for k, v in doc.items() if k != "_id" and projection.get(k)}
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.read = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            self.read += 1
+            yield doc
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    """Motor collection over a list of documents; queries are recorded."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.finds = []
+        self.find_ones = 0
+
+    async def find_one(self, query, projection=None):
+        self.find_ones += 1
+        return next((project(d, projection) for d in self.docs if matches(d, query)), None)
+
+    def find(self, query, projection=None, sort=None, batch_size=None):
+        self.finds.append(query)
+        docs = [d for d in self.docs if matches(d, query)]
+        for field, direction in reversed(sort or []):
+            docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        self.cursor = FakeCursor([project(d, projection) for d in docs])
+        return self.cursor
+
+    def aggregate(self, pipeline):
+        return FakeCursor(run_pipeline([dict(d) for d in self.docs], pipeline))
+
+
+def summary(user, course, quiz, best, updated_at):
+    return {"user_id": user, "course_id": course, "quiz_id": quiz, "best_score": best, "last_score": best,
+            "average_score": best, "total_attempts": 1, "updated_at": updated_at, "version": 1}
+
+
+class AppTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.progress, self.buckets = FakeCollection(), FakeCollection()
+        self.cache = ProgressCache(enabled=False)
+        state = {"progress_col": self.progress, "attempts_col": self.buckets, "progress_cache": self.cache}
+        for name, value in state.items():
+            patcher = mock.patch.object(main.app.state, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Not entered: the lifespan would connect to Mongo and RabbitMQ
+        self.client = TestClient(main.app)
+
+
+class TestProgressSummary(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.progress.docs = [dict(summary("user1", "c1", 1, 8, "2024-01-01T00:00:00"),
+                                   improvement_percentage=25.0, attempts=[{"score": 8}])]
+
+    def test_summary(self):
+        response = self.client.get("/progress/user1/c1/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "user_id": "user1", "course_id": "c1", "quiz_id": "1", "average_score": 8, "highest_score": 8,
+            "recent_score": 8, "attempts": 1, "improvement": 25.0, "updated_at": "2024-01-01T00:00:00"
+        })
+        self.assertEqual(self.client.get("/progress/user1/c1/2").json(), {"message": "No progress data yet"})
+
+    def test_cache_is_only_used_while_enabled(self):
+        for _ in range(2):
+            self.client.get("/progress/user1/c1/1")
+        self.assertEqual(self.progress.find_ones, 2)
+
+        self.cache.set_enabled(True)
+        for _ in range(2):
+            self.assertEqual(self.client.get("/progress/user1/c1/1").json()["highest_score"], 8)
+        self.assertEqual(self.progress.find_ones, 3)
+
+
+class TestProgressBatch(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.progress.docs = [
+            summary("user1", "c1", 1, 5, "2024-01-01T00:00:00"),
+            summary("user1", "c1", 2, 8, "2024-02-01T00:00:00"),
+            summary("user1", "c2", 1, 3, "2024-01-15T00:00:00"),
+            summary("user2", "c3", 1, 9, "2024-01-01T00:00:00"),
+        ]
+
+    def test_found_and_missing_in_request_order(self):
+        response = self.client.post("/progress/batch", json={"user_id": "user1", "items": [
+            {"course_id": "c1", "quiz_id": 1},
+            {"course_id": "c1"},
+            {"course_id": "c3"},
+            {"course_id": "c2", "quiz_id": 7},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([(r["course_id"], r["quiz_id"], r.get("highest_score")) for r in results[:2]],
+                         [("c1", 1, 5), ("c1", 2, 8)])
+        # c3 has progress, but another user's
+        self.assertEqual(results[2:], [
+            {"course_id": "c3", "quiz_id": None, "message": "No progress data yet"},
+            {"course_id": "c2", "quiz_id": 7, "message": "No progress data yet"},
+        ])
+        self.assertEqual(len(self.progress.finds), 1)
+
+    def test_item_limit(self):
+        items = [{"course_id": f"c{n}"} for n in range(3)]
+        with mock.patch.object(main, "PROGRESS_BATCH_MAX", 2):
+            response = self.client.post("/progress/batch", json={"user_id": "user1", "items": items})
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post("/progress/batch", json={"user_id": "user1", "items": items[:2]})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.progress.finds), 1)
+
+
+def attempt(timestamp, score):
+    return {"quiz_id": 1, "score": score, "timestamp": timestamp}
+
+
+class TestAttempts(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.history = [
+            attempt("2024-02-01T00:00:00", 4),
+            attempt("2024-01-03T00:00:00", 1),
+            attempt("2024-02-01T00:00:00", 5),
+            attempt("2024-03-01T00:00:00", 6),
+            attempt("2024-01-04T00:00:00", 2),
+            attempt("2024-01-05T00:00:00", 3),
+        ]
+
+    def read_all(self, limit):
+        scores, after, pages = [], None, 0
+        while True:
+            params = {"limit": limit} if after is None else {"limit": limit, "after": after}
+            response = self.client.get("/progress/user1/c1/1/attempts", params=params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            scores += [a["score"] for a in page["attempts"]]
+            pages += 1
+            after = page["next_after"]
+            if after is None:
+                return scores, pages
+
+    def test_bucketed_history(self):
+        key = {"user_id": "user1", "course_id": "c1", "quiz_id": 1}
+        self.progress.docs = [dict(key, bucketed=True, attempts=self.history[-2:])]
+        months = {}
+        for a in self.history:
+            months.setdefault(a["timestamp"][:7], []).append(a)
+        self.buckets.docs = [dict(key, bucket=month, attempts=attempts) for month, attempts in months.items()]
+        for limit in (1, 2, 4, 6, 50):
+            self.assertEqual(self.read_all(limit), ([1, 2, 3, 4, 5, 6], max(1, -(-6 // limit))), limit)
+
+        # The first page of two only needs January's bucket
+        page = self.client.get("/progress/user1/c1/1/attempts", params={"limit": 2}).json()
+        self.assertEqual([a["score"] for a in page["attempts"]], [1, 2])
+        self.assertEqual((self.buckets.cursor.read, self.buckets.cursor.closed), (1, True))
+
+    def test_legacy_history_in_the_progress_document(self):
+        self.progress.docs = [{"user_id": "user1", "course_id": "c1", "quiz_id": 1, "attempts": self.history}]
+        self.assertEqual(self.read_all(4), ([1, 2, 3, 4, 5, 6], 2))
+        self.assertEqual(self.buckets.docs, [])
+
+    def test_no_history_and_bad_limit(self):
+        response = self.client.get("/progress/user1/c1/1/attempts")
+        self.assertEqual(response.json(), {"attempts": [], "next_after": None})
+        self.assertEqual(self.client.get("/progress/user1/c1/1/attempts?limit=0").status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
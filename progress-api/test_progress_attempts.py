@@ -0,0 +1,127 @@
+import unittest
+
+from progress_attempts import attempts_page, attempts_page_pipeline, bucket_rows, buckets_query, parse_after
+
+KEY = {"user_id": "user1", "course_id": "course1", "quiz_id": 1}
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            for op, operand in condition.items():
+                if value is None or not {"$gt": value > operand, "$gte": value >= operand}[op]:
+                    return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+def run_pipeline(docs, pipeline):
+    """Just enough of the aggregation stages attempts_page_pipeline uses."""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if matches(d, spec)]
+        elif name == "$unwind":
+            field = spec["path"][1:]
+            docs = [dict(d, **{field: item, spec["includeArrayIndex"]: i})
+                    for d in docs for i, item in enumerate(d[field])]
+        elif name == "$replaceRoot":
+            field, extra = spec["newRoot"]["$mergeObjects"]
+            docs = [dict(d[field[1:]], **{k: d[ref[1:]] for k, ref in extra.items()}) for d in docs]
+        elif name == "$sort":
+            docs = sorted(docs, key=lambda d: tuple(d[k] for k in spec))
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [{k: v for k, v in d.items() if k not in spec} for d in docs]
+    return docs
+
+
+def bucketed_page(buckets, after, limit):
+    """What get_attempts does with bucket documents; returns (page, buckets read)."""
+    rows, read = [], 0
+    for bucket in sorted((b for b in buckets if matches(b, buckets_query(KEY, after))), key=lambda b: b["bucket"]):
+        read += 1
+        rows.extend(bucket_rows(bucket, after))
+        if len(rows) > limit:
+            break
+    return attempts_page(rows, limit), read
+
+
+def read_all(docs, bucketed, limit):
+    attempts, after, pages = [], None, 0
+    while True:
+        if bucketed:
+            page, _ = bucketed_page(docs, after, limit)
+        else:
+            page = attempts_page(run_pipeline(docs, attempts_page_pipeline(KEY, after, limit + 1)), limit)
+        attempts.extend(page["attempts"])
+        pages += 1
+        after = page["next_after"]
+        if after is None:
+            return attempts, pages
+
+
+def attempt(timestamp, score):
+    return {"quiz_id": 1, "score": score, "timestamp": timestamp}
+
+
+class TestAttemptsPaging(unittest.TestCase):
+
+    def setUp(self):
+        # Written in arrival order: late events carry older timestamps, and
+        # a legacy document can hold several attempts at one timestamp
+        self.history = [
+            attempt("2024-01-05T00:00:00", 1),
+            attempt("2024-02-01T00:00:00", 2),
+            attempt("2024-01-03T00:00:00", 3),
+            attempt("2024-02-01T00:00:00", 4),
+            attempt("2024-02-01T00:00:00", 5),
+            attempt("2024-01-04T00:00:00", 6),
+            attempt("2024-03-01T00:00:00", 7),
+        ]
+        self.expected = [3, 6, 1, 2, 4, 5, 7]
+
+    def test_inline_history_pages_in_timestamp_order(self):
+        docs = [dict(KEY, attempts=self.history)]
+        for limit in range(1, 8):
+            attempts, _ = read_all(docs, False, limit)
+            self.assertEqual([a["score"] for a in attempts], self.expected, f"limit={limit}")
+            self.assertNotIn("seq", attempts[0])
+
+    def test_bucketed_history_pages_in_timestamp_order(self):
+        buckets = {}
+        for a in self.history:
+            buckets.setdefault(a["timestamp"][:7], []).append(a)
+        # Bucket documents are not stored in month order either
+        docs = [dict(KEY, bucket=month, attempts=attempts) for month, attempts in reversed(buckets.items())]
+        for limit in range(1, 8):
+            attempts, pages = read_all(docs, True, limit)
+            self.assertEqual([a["score"] for a in attempts], self.expected, f"limit={limit}")
+            self.assertEqual(pages, -(-len(self.expected) // limit))
+
+    def test_buckets_are_read_until_the_page_is_full(self):
+        docs = [dict(KEY, bucket=f"2023-{month:02d}", attempts=[attempt(f"2023-{month:02d}-01T00:00:00", month)])
+                for month in range(12, 0, -1)]
+        page, read = bucketed_page(docs, None, 2)
+        self.assertEqual([a["score"] for a in page["attempts"]], [1, 2])
+        # Two for the page, one more to know there is a next page
+        self.assertEqual(read, 3)
+        page, read = bucketed_page(docs, page["next_after"], 2)
+        self.assertEqual([a["score"] for a in page["attempts"]], [3, 4])
+        # The cursor's own month is read again
+        self.assertEqual(read, 4)
+
+    def test_cursor_parsing(self):
+        self.assertEqual(parse_after("2024-02-01T00:00:00~4"), ("2024-02-01T00:00:00", 4))
+        # Cursors handed out before seq existed still work
+        self.assertEqual(parse_after("2024-02-01T00:00:00"), ("2024-02-01T00:00:00", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import progress_events
+from progress_cache import ProgressCache
+from progress_events import apply_updates
+
+KEY = ("user1", "course1", 1)
+
+
+class TestProgressCache(unittest.TestCase):
+
+    def test_read_through_and_lru(self):
+        cache = ProgressCache(max_entries=2)
+        self.assertIsNone(cache.get(KEY))
+        cache.put(KEY, {"total_attempts": 1}, 1)
+        cache.put(("u", "c", 2), {}, 1)
+        cache.get(KEY)
+        cache.put(("u", "c", 3), {}, 1)
+        self.assertEqual(cache.get(KEY), {"total_attempts": 1})
+        self.assertIsNone(cache.get(("u", "c", 2)))
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_entries_expire(self):
+        cache = ProgressCache(ttl=0.01)
+        cache.put(KEY, {}, 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(KEY))
+
+    def test_older_version_never_replaces_newer(self):
+        cache = ProgressCache()
+        cache.write_through(KEY, {"total_attempts": 2}, 2)
+        self.assertFalse(cache.put(KEY, {"total_attempts": 1}, 1))
+        self.assertEqual(cache.get(KEY), {"total_attempts": 2})
+        self.assertEqual(cache.stats()["stale_puts"], 1)
+
+    def test_load_racing_full_invalidation_is_dropped(self):
+        cache = ProgressCache()
+        generation = cache.generation()
+        cache.invalidate()
+        self.assertFalse(cache.put(KEY, {}, 1, generation))
+        self.assertIsNone(cache.get(KEY))
+
+    def test_apply_updates_writes_through(self):
+        cache = ProgressCache()
+        apply_updates(cache, {"updates": [
+            {"user_id": "user1", "course_id": "course1", "quiz_id": 1, "version": 3, "total_attempts": 3}
+        ]})
+        self.assertEqual(cache.get(KEY)["total_attempts"], 3)
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ProgressCache(enabled=False)
+        self.assertFalse(cache.put(KEY, {}, 1))
+        self.assertFalse(cache.write_through(KEY, {}, 1))
+        self.assertIsNone(cache.get(KEY))
+
+        generation = cache.generation()
+        cache.set_enabled(True)
+        # Loaded before the listener was subscribed: may already be stale
+        self.assertFalse(cache.put(KEY, {}, 1, generation))
+        self.assertTrue(cache.put(KEY, {}, 1))
+        self.assertEqual(cache.get(KEY), {})
+
+        cache.set_enabled(False)
+        self.assertIsNone(cache.get(KEY))
+
+    def test_listener_caches_only_while_subscribed(self):
+        cache = ProgressCache(enabled=False)
+        seen = []
+        event = {"updates": [{"user_id": "user1", "course_id": "course1", "quiz_id": 1, "version": 1}]}
+
+        class Messages:
+            delivered = False
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                seen.append(("subscribed", cache.enabled, cache.get(KEY) is not None))
+                if self.delivered:
+                    raise ConnectionError("connection lost")
+                self.delivered = True
+                return SimpleNamespace(body=json.dumps(event).encode("utf-8"))
+
+        class Queue:
+            async def bind(self, exchange, routing_key):
+                seen.append(("binding", cache.enabled, False))
+
+            def iterator(self, no_ack):
+                return Messages()
+
+        class Channel:
+            async def declare_exchange(self, *args, **kwargs):
+                return None
+
+            async def declare_queue(self, *args, **kwargs):
+                return Queue()
+
+        class Connection:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def channel(self):
+                return Channel()
+
+        async def connect(url):
+            if seen:
+                seen.append(("reconnecting", cache.enabled, cache.get(KEY) is not None))
+                raise asyncio.CancelledError()
+            return Connection()
+
+        with mock.patch.object(progress_events.aio_pika, "connect", connect):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(progress_events.listen(cache, "amqp://test", reconnect_delay=0))
+
+        self.assertEqual(seen, [
+            ("binding", False, False),
+            ("subscribed", True, False),
+            ("subscribed", True, True),
+            ("reconnecting", False, False),
+        ])
+
+    def test_concurrent_submit_and_read(self):
+        """
+        A writer plays the worker (bump version, write through) while readers
+        do slow read-throughs; the cache must end on the latest version.
+        """
+        cache = ProgressCache()
+        db = {"version": 0}
+        db_lock = threading.Lock()
+        done = threading.Event()
+
+        def submit():
+            for _ in range(200):
+                with db_lock:
+                    db["version"] += 1
+                    summary = dict(db)
+                cache.write_through(KEY, summary, summary["version"])
+            done.set()
+
+        def read():
+            while not done.is_set():
+                if cache.get(KEY) is not None:
+                    continue
+                generation = cache.generation()
+                with db_lock:
+                    summary = dict(db)
+                time.sleep(0.0005)  # the read lands after newer writes
+                cache.put(KEY, summary, summary["version"], generation)
+                cache.invalidate(KEY)
+
+        readers = [threading.Thread(target=read) for _ in range(8)]
+        writer = threading.Thread(target=submit)
+        for thread in readers + [writer]:
+            thread.start()
+        for thread in readers + [writer]:
+            thread.join()
+
+        cache.write_through(KEY, dict(db), db["version"])
+        self.assertEqual(cache.get(KEY)["version"], 200)
+
+        # Every stale read after the final write is rejected
+        self.assertFalse(cache.put(KEY, {"version": 150}, 150))
+        self.assertEqual(cache.get(KEY)["version"], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
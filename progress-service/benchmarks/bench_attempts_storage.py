@@ -0,0 +1,64 @@
+"""
+Progress document size and read latency with the full attempts array versus
+the capped window plus attempt buckets, for users with 100, 1k and 10k
+attempts on one quiz.
+
+Needs a MongoDB to write to (a throwaway database is created and dropped).
+
+Usage: MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_attempts_storage.py [reads]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import encode  # noqa: E402
+from pymongo import MongoClient  # noqa: E402
+
+from migrate_attempts import migrate  # noqa: E402
+from utils import compute_progress_metrics  # noqa: E402
+
+KEY = {"user_id": "bench-user", "course_id": "bench-course", "quiz_id": 1}
+
+
+def seed(progress, attempts_count):
+    attempts = [
+        {"quiz_id": 1, "score": i % 10 + 1,
+         "timestamp": f"2024-{i // 1000 % 12 + 1:02d}-01T00:00:{i:06d}"}
+        for i in range(attempts_count)
+    ]
+    doc = dict(KEY, attempts=attempts, **compute_progress_metrics(attempts))
+    progress.insert_one(doc)
+
+
+def read_latency(progress, reads):
+    start = time.perf_counter()
+    for _ in range(reads):
+        doc = progress.find_one(KEY)
+    return (time.perf_counter() - start) / reads * 1000, len(encode(doc))
+
+
+def main():
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    database = client["progress_storage_bench"]
+
+    try:
+        print(f"{'attempts':>9} {'full doc':>10} {'full read':>10} {'capped doc':>11} {'capped read':>12}")
+        for attempts_count in (100, 1000, 10000):
+            client.drop_database("progress_storage_bench")
+            progress, buckets = database["progress"], database["progress_attempts"]
+            seed(progress, attempts_count)
+
+            full_ms, full_size = read_latency(progress, reads)
+            migrate(progress, buckets, window=50, batch_size=100)
+            capped_ms, capped_size = read_latency(progress, reads)
+
+            print(f"{attempts_count:>9} {full_size:>9}B {full_ms:>8.3f}ms {capped_size:>10}B {capped_ms:>10.3f}ms")
+    finally:
+        client.drop_database("progress_storage_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Course analytics at 1M progress documents: answering "top scorers and average
+score for a course" by scanning every progress document, versus reading the
+progress_stats aggregate the worker maintains. Also times the incremental
+upkeep per event and a full rebuild pass (what rebuild_stats.py computes).
+
+Pure Python: the scan stands in for a collection scan and is a lower bound
+of what Mongo would spend on the same query.
+
+Usage: python benchmarks/bench_progress_stats.py [documents] [courses]
+"""
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import counted_totals, fold_stats, merge_stats_deltas  # noqa: E402
+
+TOP_K = 10
+BATCH = 1000
+
+
+def progress_docs(documents, courses):
+    rng = random.Random(7)
+    for i in range(documents):
+        attempts = rng.randint(1, 20)
+        yield {
+            "user_id": f"user-{i // courses}",
+            "course_id": f"course-{i % courses}",
+            "quiz_id": i % courses,
+            "version": attempts,
+            "total_attempts": attempts,
+            "score_sum": attempts * rng.randint(0, 10),
+            "best_score": rng.randint(0, 10),
+            "updated_at": f"2024-01-01T00:00:{i:07d}"
+        }
+
+
+def scan_course(documents, courses, course_id):
+    """Without aggregates: one pass over every document per query."""
+    attempts = score_sum = 0
+    top = []
+    for doc in progress_docs(documents, courses):
+        if doc["course_id"] != course_id:
+            continue
+        attempts += doc["total_attempts"]
+        score_sum += doc["score_sum"]
+        heapq.heappush(top, (doc["best_score"], doc["user_id"]))
+        if len(top) > TOP_K:
+            heapq.heappop(top)
+    return round(score_sum / attempts, 2), sorted(top, reverse=True)
+
+
+def rebuild(documents, courses):
+    aggregates = {}
+    batch = []
+    for doc in progress_docs(documents, courses):
+        batch.append(doc)
+        if len(batch) == BATCH:
+            for stats_id, delta in merge_stats_deltas(batch).items():
+                fold_stats(aggregates.setdefault(stats_id, {}), delta, TOP_K)
+            batch = []
+    for stats_id, delta in merge_stats_deltas(batch).items():
+        fold_stats(aggregates.setdefault(stats_id, {}), delta, TOP_K)
+    return aggregates
+
+
+def incremental(aggregates, documents, courses, events):
+    """One more attempt for `events` learners, in batches of 100 like the worker."""
+    rng = random.Random(11)
+    docs = []
+    for doc in progress_docs(events, courses):
+        doc["counted"] = counted_totals(doc)
+        doc["version"] += 1
+        doc["total_attempts"] += 1
+        score = rng.randint(0, 10)
+        doc["score_sum"] += score
+        doc["best_score"] = max(doc["best_score"], score)
+        docs.append(doc)
+
+    start = time.perf_counter()
+    for first in range(0, len(docs), 100):
+        for stats_id, delta in merge_stats_deltas(docs[first:first + 100]).items():
+            fold_stats(aggregates[stats_id], delta, TOP_K)
+    return (time.perf_counter() - start) / len(docs) * 1e6
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    courses = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    start = time.perf_counter()
+    scanned = scan_course(documents, courses, "course-0")
+    scan_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    aggregates = rebuild(documents, courses)
+    rebuild_s = time.perf_counter() - start
+
+    reads = 100_000
+    start = time.perf_counter()
+    for i in range(reads):
+        stats = aggregates[f"course:course-{i % courses}"]
+        stats["average_score"], stats["top"][:TOP_K]
+    lookup_us = (time.perf_counter() - start) / reads * 1e6
+
+    course = aggregates["course:course-0"]
+    assert scanned[0] == course["average_score"]
+    assert [s for s, _ in scanned[1]] == [e["best_score"] for e in course["top"]]
+
+    upkeep_us = incremental(aggregates, documents, courses, 100_000)
+
+    print(f"{documents} progress documents, {courses} courses")
+    print(f"  scan per course query:      {scan_ms:>10.1f} ms")
+    print(f"  aggregate per course query: {lookup_us:>10.3f} us")
+    print(f"  upkeep per event:           {upkeep_us:>10.2f} us")
+    print(f"  full rebuild pass:          {rebuild_s:>10.1f} s")
+
+
+if __name__ == "__main__":
+    main()
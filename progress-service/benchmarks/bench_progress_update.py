@@ -0,0 +1,90 @@
+"""
+Events/sec of progress updates for a document that already holds 10, 1k and
+10k attempts: the old find_one + full $set of attempts versus the single
+atomic update pipeline. Also checks both produce the same metrics.
+
+Needs a MongoDB to write to (a throwaway database is created and dropped).
+
+Usage: MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_progress_update.py [events]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient, ASCENDING  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+from utils import compute_progress_metrics, progress_key, progress_update_pipeline  # noqa: E402
+
+METRICS = ["total_attempts", "last_score", "best_score", "average_score", "improvement_percentage"]
+
+
+def seed(col, prior):
+    attempts = [
+        {"quiz_id": 1, "score": (i * 7) % 10 + 1, "timestamp": f"seed-{i:06d}"}
+        for i in range(prior)
+    ]
+    doc = {"user_id": "bench-user", "course_id": "bench-course", "quiz_id": 1, "attempts": attempts}
+    doc.update(compute_progress_metrics(attempts))
+    col.delete_many({})
+    col.insert_one(doc)
+
+
+def legacy_update(col, event):
+    key = progress_key(event)
+    progress = col.find_one(key)
+    attempts = progress.get("attempts", []) if progress else []
+    if any(a["timestamp"] == event["timestamp"] for a in attempts):
+        return
+    attempts.append({"quiz_id": event["quiz_id"], "score": event["score"], "timestamp": event["timestamp"]})
+    update = dict(compute_progress_metrics(attempts), attempts=attempts,
+                  updated_at=datetime.utcnow().isoformat())
+    col.update_one(key, {"$set": update}, upsert=True)
+
+
+def pipeline_update(col, event):
+    query = progress_key(event)
+    query["attempts.timestamp"] = {"$ne": event["timestamp"]}
+    try:
+        col.update_one(query, progress_update_pipeline(event, datetime.utcnow().isoformat()), upsert=True)
+    except DuplicateKeyError:
+        pass
+
+
+def run(col, update, prior, events):
+    seed(col, prior)
+    start = time.perf_counter()
+    for i in range(events):
+        update(col, {"user_id": "bench-user", "course_id": "bench-course", "quiz_id": 1,
+                     "score": i % 10, "timestamp": f"event-{i:06d}"})
+    elapsed = time.perf_counter() - start
+
+    # Replaying an event must not add an attempt
+    update(col, {"user_id": "bench-user", "course_id": "bench-course", "quiz_id": 1,
+                 "score": 0, "timestamp": "event-000000"})
+    doc = col.find_one({"user_id": "bench-user"})
+    return events / elapsed, {k: doc.get(k) for k in METRICS}
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    database = client["progress_bench"]
+    col = database["progress"]
+    col.create_index([("user_id", ASCENDING), ("course_id", ASCENDING), ("quiz_id", ASCENDING)], unique=True)
+
+    try:
+        print(f"{'prior attempts':>15} {'legacy ev/s':>12} {'pipeline ev/s':>14}  metrics match")
+        for prior in (10, 1000, 10000):
+            legacy_rate, legacy_metrics = run(col, legacy_update, prior, events)
+            pipeline_rate, pipeline_metrics = run(col, pipeline_update, prior, events)
+            print(f"{prior:>15} {legacy_rate:>12.0f} {pipeline_rate:>14.0f}  {legacy_metrics == pipeline_metrics}")
+    finally:
+        client.drop_database("progress_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Batch throughput of the progress worker when some writes fail: failed
+events go to the delay queues and the batch is acked at once, so the
+consumer should keep its pace instead of backing off in the callback.
+
+Runs process_batch directly against the Mongo stand-in and a channel that
+only counts publishes and acks; no broker is needed.
+
+Usage: python benchmarks/bench_retry_throughput.py [events] [round_trip_ms]
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import progress_worker  # noqa: E402
+from benchmarks.standins import RoundTripCollection  # noqa: E402
+
+QUEUE = "progress_bench_queue"
+BATCH_SIZE = 100
+
+
+class CountingChannel:
+
+    def __init__(self):
+        self.published = 0
+        self.acks = 0
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        self.published += 1
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks += 1
+
+
+def message(tag):
+    body = json.dumps({
+        "user_id": f"user-{tag}",
+        "course_id": "course-1",
+        "quiz_id": 1,
+        "score": tag % 10,
+        "timestamp": f"2024-01-01T00:00:{tag:08d}"
+    }).encode("utf-8")
+    return tag, SimpleNamespace(headers=None, content_type="application/json", message_id=str(tag)), body
+
+
+def run(label, events, collection):
+    channel = CountingChannel()
+    start = time.perf_counter()
+    for first in range(0, events, BATCH_SIZE):
+        batch = [message(tag) for tag in range(first + 1, min(first + BATCH_SIZE, events) + 1)]
+        progress_worker.process_batch(channel, collection, batch, queue=QUEUE)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {events / elapsed:10.0f} events/s  retried={channel.published:<6} acks={channel.acks}")
+    return elapsed
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = (float(sys.argv[2]) if len(sys.argv) > 2 else 1) / 1000
+
+    clean = run("no failures", events, RoundTripCollection(round_trip))
+    flaky = run("1 in 10 writes fails", events, RoundTripCollection(round_trip, fail_every=10))
+    print(f"slowdown with failures: {flaky / clean:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Local stand-ins for the external systems progress-service talks to.
+They only simulate network cost, so benchmarks measure our own overhead.
+"""
+import time
+
+from pymongo.errors import BulkWriteError
+
+
+class RoundTripCollection:
+    """
+    Mongo stand-in: each write call costs one simulated round trip. With
+    fail_every, every fail_every-th update of a bulk_write fails validation.
+    """
+
+    def __init__(self, round_trip, fail_every=0):
+        self.round_trip = round_trip
+        self.fail_every = fail_every
+        self.calls = 0
+        self.updates = 0
+
+    def update_one(self, query, update, upsert=False):
+        self.calls += 1
+        self.updates += 1
+        time.sleep(self.round_trip)
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        self.updates += len(operations)
+        time.sleep(self.round_trip)
+        if self.fail_every:
+            errors = [
+                {"index": i, "code": 2, "errmsg": "document failed validation"}
+                for i in range(len(operations)) if i % self.fail_every == 0
+            ]
+            if errors:
+                raise BulkWriteError({"writeErrors": errors})
+
+
+def round_trip_collection(round_trip):
+    """Picklable factory for worker processes."""
+    return RoundTripCollection(round_trip)
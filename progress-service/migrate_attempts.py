@@ -0,0 +1,83 @@
+"""
+Move the attempt history of existing progress documents into the
+progress_attempts buckets and cap each document to its newest attempts.
+
+Safe to re-run and to run while workers are consuming: buckets skip attempts
+they already hold, and documents are only trimmed after their history has
+been copied.
+
+Usage: python migrate_attempts.py [--window 50] [--batch-size 500] [--dry-run]
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from bson import encode
+from pymongo import ReturnDocument, UpdateOne
+
+import progress_worker
+from utils import attempt_of, bucket_filter, bucket_merge_pipeline, group_by_bucket, trim_attempts_pipeline
+
+logger = logging.getLogger("migrate_attempts")
+
+
+def bucket_updates(doc, updated_at):
+    events = [
+        (None, dict(attempt, user_id=doc["user_id"], course_id=doc["course_id"], quiz_id=doc["quiz_id"]))
+        for attempt in doc.get("attempts", [])
+    ]
+    return [
+        UpdateOne(
+            bucket_filter(items[0][1]),
+            bucket_merge_pipeline([attempt_of(event) for _, event in items], updated_at),
+            upsert=True
+        )
+        for items in group_by_bucket(events).values()
+    ]
+
+
+def migrate(progress, buckets, window, batch_size, dry_run=False):
+    progress_worker.ensure_indexes(progress, buckets)
+
+    stats = {"documents": 0, "attempts": 0, "bytes_before": 0, "bytes_after": 0}
+    updated_at = datetime.utcnow().isoformat()
+    cursor = progress.find({"bucketed": {"$ne": True}}, batch_size=batch_size)
+
+    for doc in cursor:
+        stats["documents"] += 1
+        stats["attempts"] += len(doc.get("attempts", []))
+        stats["bytes_before"] += len(encode(doc))
+        if dry_run:
+            continue
+
+        operations = bucket_updates(doc, updated_at)
+        if operations:
+            buckets.bulk_write(operations, ordered=False)
+        trimmed = progress.find_one_and_update(
+            {"_id": doc["_id"], "bucketed": {"$ne": True}},
+            trim_attempts_pipeline(window),
+            return_document=ReturnDocument.AFTER
+        )
+        if trimmed is not None:
+            stats["bytes_after"] += len(encode(trimmed))
+
+        if stats["documents"] % batch_size == 0:
+            logger.info(f"Migrated {stats['documents']} documents…")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--window", type=int, default=progress_worker.ATTEMPTS_WINDOW)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = migrate(progress_worker.progress_col, progress_worker.attempts_col,
+                    args.window, args.batch_size, args.dry_run)
+    logger.info(f"Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
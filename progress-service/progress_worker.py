@@ -2,15 +2,35 @@ import json
 import os
 import time
 import logging
+import uuid
 from datetime import datetime
 
 import pika
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import PyMongoError
-from tenacity import retry, wait_exponential, stop_after_attempt
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from dotenv import load_dotenv
 
-from utils import compute_progress_metrics
+from retries import (
+    StageCounters,
+    next_delivery,
+    parse_delays,
+    retry_queue,
+    retry_queue_arguments,
+)
+from utils import (
+    attempt_key,
+    attempt_of,
+    bucket_filter,
+    bucket_merge_pipeline,
+    coalesce_events,
+    counted_totals,
+    group_by_bucket,
+    merge_stats_deltas,
+    progress_key,
+    progress_update_pipeline,
+    recorded_attempts_query,
+    stats_update_pipeline,
+)
 
 load_dotenv()
 
@@ -27,18 +47,64 @@ EXCHANGE_NAME = "quiz_events"
 ROUTING_KEY = "quiz.submitted"
 QUEUE_NAME = "progress_queue"
 
+# After each write the new summaries are published here; progress-api writes
+# them through to its cache
+PROGRESS_EXCHANGE = "progress_events"
+PROGRESS_UPDATED = "progress.updated"
+SUMMARY_FIELDS = {
+    "_id": 0, "user_id": 1, "course_id": 1, "quiz_id": 1, "average_score": 1, "best_score": 1,
+    "last_score": 1, "total_attempts": 1, "improvement_percentage": 1, "updated_at": 1, "version": 1
+}
+# Also needed to fold the documents into the progress_stats aggregates
+READ_BACK_FIELDS = dict(SUMMARY_FIELDS, score_sum=1, counted=1)
+
+# Batch mode: up to BATCH_SIZE messages or BATCH_MAX_WAIT_MS per bulk_write.
+# BATCH_SIZE=1 keeps the one-message-at-a-time consumer.
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "200"))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))
+BATCH_MAX_WAIT = float(os.getenv("BATCH_MAX_WAIT_MS", "50")) / 1000
+
+# Newest attempts kept in each progress document; the full history is in
+# monthly buckets of the progress_attempts collection
+ATTEMPTS_WINDOW = int(os.getenv("ATTEMPTS_WINDOW", "50"))
+
+# Failed events wait in {queue}.retry.<ms>ms queues, one per delay, and go to
+# the dead-letter queue once every delay has been tried
+RETRY_DELAYS_MS = parse_delays(os.getenv("RETRY_DELAYS_MS", "1000,5000,30000,120000"))
+DEAD_LETTER_QUEUE = f"{QUEUE_NAME}.dead"
+STATS_LOG_INTERVAL = float(os.getenv("STATS_LOG_INTERVAL", "60"))
+
+# >1 runs a router plus this many shard consumer processes (see worker_pool.py)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+
+# Leaderboard size kept in each course/quiz aggregate of progress_stats
+STATS_TOP_K = int(os.getenv("STATS_TOP_K", "10"))
+
 # --------------------------
 # Setup MongoDB
 # --------------------------
 mongo_client = MongoClient(MONGO_URI, socketTimeoutMS=5000)
 db = mongo_client[os.getenv("DATABASE_NAME", "LearnHubDB")]
 progress_col = db["progress"]
+attempts_col = db["progress_attempts"]
+# Per-course and per-quiz aggregates, updated as events are processed
+stats_col = db["progress_stats"]
+
+counters = StageCounters()
+
+
+def ensure_indexes(collection, buckets=None):
+    # secure that same one user+one course has one progress record
+    collection.create_index(
+        [("user_id", ASCENDING), ("course_id", ASCENDING), ("quiz_id", ASCENDING)],
+        unique=True
+    )
+    if buckets is not None:
+        buckets.create_index(
+            [("user_id", ASCENDING), ("course_id", ASCENDING), ("quiz_id", ASCENDING), ("bucket", ASCENDING)],
+            unique=True
+        )
 
-# secure that same one user+one course has one progress record
-progress_col.create_index(
-    [("user_id", ASCENDING), ("course_id", ASCENDING), ("quiz_id", ASCENDING)],
-    unique=True
-)
 
 # --------------------------
 # Helpers
@@ -56,91 +122,376 @@ def parse_event(body):
         raise ValueError(f"Failed to parse event: {e}")
 
 
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(min=1, max=10))
-def update_progress(event):
-    """Use retry for resilience."""
+def apply_event(collection, event, buckets=None):
+    """
+    Record one attempt with a single atomic update (safe under parallel consumers),
+    then add it to its attempts bucket.
+
+    Returns:
+        bool: False if the event was already recorded
+    """
 
     user_id = event["user_id"]
     course_id = event["course_id"]
-    quiz_id = event["quiz_id"]
-    score = event["score"]
     timestamp = event["timestamp"]
 
     logger.info(f"Updating progress for user={user_id}, course={course_id}")
 
-    # get the current progress record
-    progress = progress_col.find_one({
-        "user_id": user_id,
-        "course_id": course_id,
-        "quiz_id": quiz_id
-    })
-
-    attempts = progress.get("attempts", []) if progress else []
-
-    # if the timestamp exists, jump it
-    if any(a["timestamp"] == timestamp for a in attempts):
+    # Older than the attempts window: only its bucket can tell it was counted
+    if buckets is not None and recorded_attempts(buckets, [event]):
         logger.info("Duplicate event detected — skipping")
-        return
+        return False
+
+    # Only match a document that does not hold this attempt yet. If it does,
+    # the upsert tries to insert a second document for the key and the unique
+    # index rejects it: that is our duplicate signal.
+    query = progress_key(event)
+    query["attempts.timestamp"] = {"$ne": timestamp}
+    updated_at = datetime.utcnow().isoformat()
+    pipeline = progress_update_pipeline(event, updated_at, ATTEMPTS_WINDOW)
+
+    recorded = False
+    for _ in range(2):
+        try:
+            collection.update_one(query, pipeline, upsert=True)
+            recorded = True
+            break
+        except DuplicateKeyError:
+            # Either a duplicate, or another consumer created the document
+            # first; one retry tells them apart
+            continue
+
+    # Written even for duplicates: a previous delivery may have stopped
+    # between the two updates, and the bucket merge skips known attempts
+    if buckets is not None:
+        merge_into_bucket(buckets, bucket_filter(event), bucket_merge_pipeline([attempt_of(event)], updated_at))
+
+    if recorded:
+        logger.info("Progress updated successfully.")
+    else:
+        logger.info("Duplicate event detected — skipping")
+    return recorded
+
+
+def recorded_attempts(buckets, events):
+    """
+    Attempt keys of the events whose attempt is already in its bucket.
+
+    The progress document only keeps the newest ATTEMPTS_WINDOW attempts,
+    so a redelivered event older than that passes its duplicate filter.
+    Buckets are written after the progress update, so an attempt found in
+    its bucket has been counted in the summary.
+    """
+    if not events:
+        return set()
+    wanted = {attempt_key(event) for event in events}
+    found = set()
+    projection = {"_id": 0, "user_id": 1, "course_id": 1, "quiz_id": 1, "attempts.timestamp": 1}
+    for doc in buckets.find(recorded_attempts_query(events), projection):
+        for attempt in doc.get("attempts", []):
+            key = (doc["user_id"], doc["course_id"], doc["quiz_id"], attempt["timestamp"])
+            if key in wanted:
+                found.add(key)
+    return found
+
+
+def merge_into_bucket(buckets, query, pipeline):
+    try:
+        buckets.update_one(query, pipeline, upsert=True)
+    except DuplicateKeyError:
+        # Another consumer created the bucket first; the merge is idempotent
+        buckets.update_one(query, pipeline, upsert=True)
+
+
+def write_buckets(buckets, tagged_events, updated_at):
+    """
+    Add (delivery_tag, event) pairs to their attempts buckets with one
+    unordered bulk_write.
+
+    Returns:
+        dict: delivery tag -> error, for events that could not be written
+    """
+    groups = list(group_by_bucket(tagged_events).values())
+    updates = [
+        (bucket_filter(items[0][1]), bucket_merge_pipeline([attempt_of(e) for _, e in items], updated_at))
+        for items in groups
+    ]
+
+    failed = {}
+    try:
+        buckets.bulk_write([UpdateOne(q, p, upsert=True) for q, p in updates], ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            items = groups[error["index"]]
+            try:
+                if error.get("code") != 11000:
+                    raise PyMongoError(error.get("errmsg"))
+                merge_into_bucket(buckets, *updates[error["index"]])
+            except PyMongoError as bucket_error:
+                logger.error(f"Attempts bucket update failed for {len(items)} events: {bucket_error}")
+                failed.update((tag, bucket_error) for tag, _ in items)
+    except PyMongoError as e:
+        logger.error(f"Database error writing attempts buckets: {e}")
+        return {tag: e for tag, _ in tagged_events}
+    return failed
 
-    # Append new attempt
-    attempts.append({
-        "quiz_id": quiz_id,
-        "score": score,
-        "timestamp": timestamp
-    })
-
-    # calculate the metrics
-    metrics = compute_progress_metrics(attempts)
-
-    update_doc = {
-        "$set": {
-            "user_id": user_id,
-            "course_id": course_id,
-            "quiz_id": quiz_id,
-            "attempts": attempts,
-            "total_attempts": metrics["total_attempts"],
-            "last_score": metrics["last_score"],
-            "best_score": metrics["best_score"],
-            "average_score": metrics["average_score"],
-            "improvement_percentage": metrics["improvement_percentage"],
-            "updated_at": datetime.utcnow().isoformat()
-        }
-    }
-
-    progress_col.update_one(
-        {"user_id": user_id, "course_id": course_id, "quiz_id": quiz_id},
-        update_doc,
-        upsert=True
-    )
 
-    logger.info("Progress updated successfully.")
+def write_events(collection, tagged_events, buckets=None):
+    """
+    Apply (delivery_tag, event) pairs with one unordered bulk_write,
+    one update per (user, course, quiz) key, then add them to their
+    attempts buckets.
 
+    Events already in their attempts bucket are duplicates and are skipped.
 
-def on_message(channel, method, properties, body):
-    """RabbitMQ consumer callback."""
+    Returns:
+        dict: delivery tag -> error, for events that could not be written
+    """
+    if buckets is not None and tagged_events:
+        try:
+            recorded = recorded_attempts(buckets, [event for _, event in tagged_events])
+        except PyMongoError as e:
+            logger.error(f"Database error checking batch of {len(tagged_events)} events: {e}")
+            return {tag: e for tag, _ in tagged_events}
+        if recorded:
+            logger.info(f"Skipping {len(recorded)} events already recorded")
+            counters.incr("duplicates", len(recorded))
+            tagged_events = [(tag, event) for tag, event in tagged_events if attempt_key(event) not in recorded]
+
+    groups = list(coalesce_events(tagged_events).values())
+    if not groups:
+        return {}
+
+    updated_at = datetime.utcnow().isoformat()
+    operations = []
+    for items in groups:
+        events = [event for _, event in items]
+        query = progress_key(events[0])
+        query["attempts.timestamp"] = {"$nin": [event["timestamp"] for event in events]}
+        operations.append(UpdateOne(query, progress_update_pipeline(events, updated_at, ATTEMPTS_WINDOW), upsert=True))
+
+    failed = {}
+    retry_one_by_one = []
     try:
-        event = parse_event(body)
-        logger.info(f"Received event: {event}")
-
-        update_progress(event)   # With retry logic
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            items = groups[error["index"]]
+            if error.get("code") == 11000:
+                # Some event of the group was already recorded, or the document
+                # was created concurrently: sort it out event by event
+                retry_one_by_one.extend(items)
+            else:
+                logger.error(f"Bulk update failed for {len(items)} events: {error.get('errmsg')}")
+                failed.update((tag, error.get("errmsg")) for tag, _ in items)
+    except PyMongoError as e:
+        logger.error(f"Database error writing batch of {len(tagged_events)} events: {e}")
+        return {tag: e for tag, _ in tagged_events}
 
-        channel.basic_ack(delivery_tag=method.delivery_tag)
+    for tag, event in retry_one_by_one:
+        try:
+            apply_event(collection, event)
+        except PyMongoError as e:
+            logger.error(f"Database error, scheduling retry: {e}")
+            failed[tag] = e
+
+    if buckets is not None:
+        # Events that failed above are retried whole later
+        written = [(tag, event) for items in groups for tag, event in items if tag not in failed]
+        failed.update(write_buckets(buckets, written, updated_at))
+    return failed
+
+
+def declare_retry_queues(channel, queue):
+    """Delay queues that feed back into queue, plus the shared dead-letter queue."""
+    for delay_ms in RETRY_DELAYS_MS:
+        channel.queue_declare(
+            queue=retry_queue(queue, delay_ms),
+            durable=True,
+            arguments=retry_queue_arguments(queue, delay_ms)
+        )
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+
+
+def schedule_retry(channel, queue, properties, body, error, retryable=True):
+    """Republish a failed message to its next delay queue, or dead-letter it."""
+    routing_key, headers = next_delivery(
+        queue, properties.headers if properties else None, error,
+        RETRY_DELAYS_MS, DEAD_LETTER_QUEUE, retryable=retryable
+    )
+    channel.basic_publish(
+        exchange="",
+        routing_key=routing_key,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2,
+            content_type=properties.content_type if properties else None,
+            message_id=properties.message_id if properties else None,
+            headers=headers
+        )
+    )
+    if routing_key == DEAD_LETTER_QUEUE:
+        logger.warning(f"Dead-lettering event after {headers['x-retry-count']} attempts: {error}")
+        counters.incr("dead_lettered")
+    else:
+        counters.incr("retried")
+
+
+def read_summaries(collection, events):
+    """Read back the progress documents of written events with one query."""
+    keys = {(e["user_id"], e["course_id"], e["quiz_id"]): e for e in events}
+    if not keys:
+        return []
+    try:
+        return list(collection.find({"$or": [progress_key(e) for e in keys.values()]}, READ_BACK_FIELDS))
+    except PyMongoError as e:
+        logger.warning(f"Could not read back progress summaries: {e}")
+        return []
+
+
+def update_stats(collection, stats, docs):
+    """
+    Fold what changed in the read-back progress documents into the
+    progress_stats aggregates.
+
+    Each document first claims its new totals as `counted` with a
+    compare-and-set, so a redelivered event or a concurrent consumer never
+    counts the same change twice. If the aggregate write then fails the
+    change is missing until rebuild_stats.py runs.
+    """
+    changed = [doc for doc in docs if (doc.get("counted") or {}).get("version") != doc.get("version")]
+    if not changed:
+        return
 
-    except ValueError as e:
-        logger.error(f"Bad event — discarding: {e}")
-        channel.basic_ack(delivery_tag=method.delivery_tag)
+    token = uuid.uuid4().hex
+    claims = []
+    for doc in changed:
+        query = progress_key(doc)
+        query["counted.version"] = (doc.get("counted") or {}).get("version")
+        claims.append(UpdateOne(query, {"$set": {"counted": dict(counted_totals(doc), token=token)}}))
 
+    try:
+        result = collection.bulk_write(claims, ordered=False)
+        if result.modified_count < len(claims):
+            # Some were claimed by another consumer first; keep only ours
+            ours = collection.find(
+                {"$or": [progress_key(doc) for doc in changed], "counted.token": token},
+                {"_id": 0, "user_id": 1, "course_id": 1, "quiz_id": 1}
+            )
+            ours = {(d["user_id"], d["course_id"], d["quiz_id"]) for d in ours}
+            changed = [doc for doc in changed if (doc["user_id"], doc["course_id"], doc["quiz_id"]) in ours]
+
+        updated_at = datetime.utcnow().isoformat()
+        operations = [
+            UpdateOne({"_id": stats_id}, stats_update_pipeline(delta, STATS_TOP_K, updated_at), upsert=True)
+            for stats_id, delta in merge_stats_deltas(changed).items()
+        ]
+        if operations:
+            stats.bulk_write(operations, ordered=False)
     except PyMongoError as e:
-        logger.error(f"Database error, requeueing event: {e}")
-        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        logger.error(f"Could not update progress stats, run rebuild_stats.py: {e}")
+        counters.incr("stats_failed")
 
-    except Exception as e:
-        logger.error(f"Unexpected error, requeueing: {e}")
-        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+
+def publish_summaries(channel, docs):
+    """
+    Publish read-back summaries on progress.updated. Best effort:
+    progress-api's cache entries also expire.
+    """
+    if not docs:
+        return
+    updates = [{field: doc[field] for field in SUMMARY_FIELDS if field in doc} for doc in docs]
+    channel.basic_publish(
+        exchange=PROGRESS_EXCHANGE,
+        routing_key=PROGRESS_UPDATED,
+        body=json.dumps({"event_type": "progress_updated", "updates": updates}),
+        properties=pika.BasicProperties(content_type="application/json")
+    )
+    counters.incr("published", len(updates))
+
+
+def process_batch(channel, collection, messages, queue=QUEUE_NAME, buckets=None, publish_updates=False,
+                  stats=None):
+    """
+    Write a batch of (delivery_tag, properties, body) messages consumed from
+    queue. Failed events are handed to the retry pipeline, then the whole
+    batch is settled with a single multiple=True ack; nothing blocks or
+    requeues in place. With publish_updates the new summaries go out on
+    progress.updated; with a stats collection they are folded into the
+    course/quiz aggregates.
+    """
+    counters.incr("received", len(messages))
+    tagged_events = []
+    for tag, properties, body in messages:
+        try:
+            tagged_events.append((tag, parse_event(body)))
+        except ValueError as e:
+            # Retrying cannot fix a malformed event
+            logger.error(f"Bad event — dead-lettering: {e}")
+            schedule_retry(channel, queue, properties, body, e, retryable=False)
+
+    failed = write_events(collection, tagged_events, buckets)
+    for tag, properties, body in messages:
+        if tag in failed:
+            schedule_retry(channel, queue, properties, body, failed[tag])
+
+    if publish_updates or stats is not None:
+        docs = read_summaries(collection, [event for tag, event in tagged_events if tag not in failed])
+        if stats is not None:
+            update_stats(collection, stats, docs)
+        if publish_updates:
+            publish_summaries(channel, docs)
+
+    channel.basic_ack(delivery_tag=messages[-1][0], multiple=True)
+    counters.incr("written", len(tagged_events) - len(failed))
+    logger.info(f"Processed batch of {len(messages)} messages ({len(failed)} failed)")
+
+
+def consume_batches(channel, handle_batch, queue=QUEUE_NAME, batch_size=BATCH_SIZE,
+                    max_wait=BATCH_MAX_WAIT, should_stop=None):
+    """
+    Pull messages until batch_size arrive or max_wait passes, then hand them
+    to handle_batch(channel, [(delivery_tag, properties, body), ...]), which
+    settles them.
+    Runs until should_stop() is true between batches (forever by default).
+    """
+    pending = []
+    deadline = None
+    next_stats = time.monotonic() + STATS_LOG_INTERVAL
+    for method, properties, body in channel.consume(queue, inactivity_timeout=max_wait):
+        if method is not None:
+            pending.append((method.delivery_tag, properties, body))
+            if deadline is None:
+                deadline = time.monotonic() + max_wait
+
+        if pending and (method is None or len(pending) >= batch_size or time.monotonic() >= deadline):
+            handle_batch(channel, pending)
+            pending = []
+            deadline = None
+
+        if time.monotonic() >= next_stats:
+            logger.info(f"Worker counters: {counters.snapshot()}")
+            next_stats = time.monotonic() + STATS_LOG_INTERVAL
+
+        if not pending and should_stop is not None and should_stop():
+            break
+
+    channel.cancel()
+
+
+def on_message(channel, method, properties, body):
+    """RabbitMQ consumer callback (BATCH_SIZE=1)."""
+    process_batch(channel, progress_col, [(method.delivery_tag, properties, body)],
+                  buckets=attempts_col, publish_updates=True, stats=stats_col)
 
 
 def start_worker():
+    if WORKER_PROCESSES > 1:
+        from worker_pool import run_pool
+        return run_pool(WORKER_PROCESSES)
+
     logger.info("Progress Worker starting…")
+    ensure_indexes(progress_col, attempts_col)
 
     while True:
         try:
@@ -150,12 +501,24 @@ def start_worker():
             channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="topic", durable=True)
             channel.queue_declare(queue=QUEUE_NAME, durable=True)
             channel.queue_bind(queue=QUEUE_NAME, exchange=EXCHANGE_NAME, routing_key=ROUTING_KEY)
-
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(queue=QUEUE_NAME, on_message_callback=on_message)
+            declare_retry_queues(channel, QUEUE_NAME)
+            channel.exchange_declare(exchange=PROGRESS_EXCHANGE, exchange_type="topic", durable=True)
+            # Retries are acked only once the broker has confirmed the republish
+            channel.confirm_delivery()
 
             logger.info("Waiting for quiz.submitted events…")
-            channel.start_consuming()
+            if BATCH_SIZE > 1:
+                channel.basic_qos(prefetch_count=max(PREFETCH_COUNT, BATCH_SIZE))
+                consume_batches(
+                    channel,
+                    lambda ch, messages: process_batch(ch, progress_col, messages,
+                                                       buckets=attempts_col, publish_updates=True,
+                                                       stats=stats_col)
+                )
+            else:
+                channel.basic_qos(prefetch_count=1)
+                channel.basic_consume(queue=QUEUE_NAME, on_message_callback=on_message)
+                channel.start_consuming()
 
         except Exception as e:
             logger.error(f"Worker crashed, reconnecting in 5 sec: {e}")
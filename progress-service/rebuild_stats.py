@@ -0,0 +1,100 @@
+"""
+Recompute the progress_stats aggregates (per course and per quiz) from the
+progress collection in one streaming pass, and mark every document as
+counted so the workers carry on incrementally from there.
+
+Pause the progress workers while it runs (events wait in RabbitMQ): a
+document written during the pass would be counted from the wrong base.
+
+Usage: python rebuild_stats.py [--top-k 10] [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from pymongo import ReplaceOne, UpdateOne
+
+import progress_worker
+from utils import counted_totals, fold_stats, merge_stats_deltas
+
+logger = logging.getLogger("rebuild_stats")
+
+# Documents written before the running totals existed fall back to their attempts
+PROJECTION = {
+    "user_id": 1, "course_id": 1, "quiz_id": 1, "updated_at": 1, "version": 1,
+    "total_attempts": {"$ifNull": ["$total_attempts", {"$size": {"$ifNull": ["$attempts", []]}}]},
+    "score_sum": {"$ifNull": ["$score_sum", {"$sum": "$attempts.score"}]},
+    "best_score": {"$ifNull": ["$best_score", {"$max": "$attempts.score"}]}
+}
+
+
+def fold_batch(aggregates, docs, top_k):
+    """Add a batch of progress documents to the in-memory aggregates."""
+    for stats_id, delta in merge_stats_deltas(docs).items():
+        scope = {key: delta[key] for key in ("scope", "course_id", "quiz_id") if key in delta}
+        fold_stats(aggregates.setdefault(stats_id, scope), delta, top_k)
+
+
+def mark_counted(progress, docs):
+    progress.bulk_write([
+        UpdateOne(
+            {"_id": doc["_id"], "version": doc.get("version")},
+            {"$set": {"counted": dict(counted_totals(doc), token="rebuild")}}
+        )
+        for doc in docs
+    ], ordered=False)
+
+
+def rebuild(progress, stats, top_k, batch_size, dry_run=False):
+    aggregates = {}
+    summary = {"documents": 0, "aggregates": 0}
+    batch = []
+
+    for doc in progress.find({}, PROJECTION, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) < batch_size:
+            continue
+        fold_batch(aggregates, batch, top_k)
+        if not dry_run:
+            mark_counted(progress, batch)
+        summary["documents"] += len(batch)
+        batch = []
+        if summary["documents"] % (batch_size * 100) == 0:
+            logger.info(f"Counted {summary['documents']} documents…")
+
+    if batch:
+        fold_batch(aggregates, batch, top_k)
+        if not dry_run:
+            mark_counted(progress, batch)
+        summary["documents"] += len(batch)
+
+    summary["aggregates"] = len(aggregates)
+    if dry_run:
+        return summary
+
+    updated_at = datetime.utcnow().isoformat()
+    operations = [
+        ReplaceOne({"_id": stats_id}, dict(aggregate, updated_at=updated_at), upsert=True)
+        for stats_id, aggregate in aggregates.items()
+    ]
+    for start in range(0, len(operations), batch_size):
+        stats.bulk_write(operations[start:start + batch_size], ordered=False)
+    # Courses and quizzes without any progress left
+    stats.delete_many({"_id": {"$nin": list(aggregates)}})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=progress_worker.STATS_TOP_K)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    summary = rebuild(progress_worker.progress_col, progress_worker.stats_col,
+                      args.top_k, args.batch_size, args.dry_run)
+    logger.info(f"Done: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Delayed retries and dead-lettering for progress events, without sleeping in
+the consumer.
+
+A failed event is republished to a delay queue ({queue}.retry.<ms>ms) whose
+message TTL dead-letters it back to the queue it came from, and the original
+is acked right away. The attempt number travels in the x-retry-count header;
+once every delay has been used, or the event cannot be parsed at all, it goes
+to the dead-letter queue for inspection instead of cycling forever.
+"""
+import threading
+
+RETRY_COUNT_HEADER = "x-retry-count"
+LAST_ERROR_HEADER = "x-last-error"
+
+DEFAULT_RETRY_DELAYS_MS = (1000, 5000, 30000, 120000)
+
+
+def parse_delays(value):
+    """ "1000,5000" -> (1000, 5000) """
+    if not value:
+        return DEFAULT_RETRY_DELAYS_MS
+    return tuple(int(v) for v in value.split(",") if v.strip())
+
+
+def retry_queue(queue, delay_ms):
+    return f"{queue}.retry.{delay_ms}ms"
+
+
+def retry_queue_arguments(queue, delay_ms):
+    """Queue arguments that hold messages for delay_ms, then send them back to queue."""
+    return {
+        "x-message-ttl": delay_ms,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": queue
+    }
+
+
+def retry_count(headers):
+    try:
+        return int((headers or {}).get(RETRY_COUNT_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def next_delivery(queue, headers, error, delays, dead_letter_queue, retryable=True):
+    """
+    Where a failed event goes next
+
+    Returns:
+        tuple: (routing_key, headers) to republish with on the default exchange
+    """
+    attempt = retry_count(headers)
+    new_headers = dict(headers or {})
+    new_headers[RETRY_COUNT_HEADER] = attempt + 1
+    new_headers[LAST_ERROR_HEADER] = str(error)[:500]
+
+    if not retryable or attempt >= len(delays):
+        return dead_letter_queue, new_headers
+    return retry_queue(queue, delays[attempt]), new_headers
+
+
+class StageCounters:
+    """
+    Thread-safe per-stage event counters (received, written, retried,
+    dead_lettered, ...)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def incr(self, stage, n=1):
+        with self._lock:
+            self._counts[stage] = self._counts.get(stage, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
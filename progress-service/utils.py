@@ -1,3 +1,6 @@
+import hashlib
+
+
 def compute_progress_metrics(attempts):
     """
     attempts: list of dicts with fields:
@@ -33,3 +36,354 @@ def compute_progress_metrics(attempts):
         "average_score": round(average_score, 2),
         "improvement_percentage": round(improvement_percentage, 2) if improvement_percentage else 0,
     }
+
+
+def progress_key(event):
+    """Filter selecting the single progress document for an event."""
+    return {
+        "user_id": event["user_id"],
+        "course_id": event["course_id"],
+        "quiz_id": event["quiz_id"]
+    }
+
+
+def attempt_of(event):
+    """The attempt entry stored for an event."""
+    return {"quiz_id": event["quiz_id"], "score": event["score"], "timestamp": event["timestamp"]}
+
+
+def progress_update_pipeline(events, updated_at, window=None):
+    """
+    Update pipeline that records attempts and refreshes every metric in a
+    single atomic update_one, without reading the document first.
+
+    events: one event, or a list of events for the same key in arrival order
+    window: keep only the newest `window` attempts in the document (the full
+    history lives in the attempt buckets). Documents written before buckets
+    existed are not trimmed until the migration has copied their history.
+
+    Running totals (score_sum, first_score) replace the rescan of attempts;
+    documents written before they existed fall back to the attempts array once.
+    Produces the same values as compute_progress_metrics.
+    """
+    if isinstance(events, dict):
+        events = [events]
+
+    new_attempts = [attempt_of(e) for e in events]
+    scores = [a["score"] for a in new_attempts]
+    attempts = {"$ifNull": ["$attempts", []]}
+    appended = {"$concatArrays": [attempts, new_attempts]}
+    if window:
+        appended = {"$cond": ["$bucketed", {"$slice": [appended, -window]}, appended]}
+
+    return [
+        # New documents start bucketed; legacy ones wait for the migration
+        {"$set": {
+            "bucketed": {"$ifNull": ["$bucketed", {"$eq": [{"$type": "$attempts"}, "missing"]}]}
+        }},
+        {"$set": {
+            "attempts": appended,
+            "total_attempts": {"$add": [{"$ifNull": ["$total_attempts", {"$size": attempts}]}, len(scores)]},
+            "score_sum": {"$add": [{"$ifNull": ["$score_sum", {"$sum": "$attempts.score"}]}, sum(scores)]},
+            "first_score": {"$ifNull": [
+                "$first_score",
+                {"$ifNull": [{"$arrayElemAt": ["$attempts.score", 0]}, scores[0]]}
+            ]},
+            "best_score": {"$max": ["$best_score", max(scores)]},
+            "last_score": scores[-1],
+            # Lets readers tell a newer summary from an older one
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            "updated_at": updated_at
+        }},
+        {"$set": {
+            "average_score": {"$round": [{"$divide": ["$score_sum", "$total_attempts"]}, 2]},
+            "improvement_percentage": {"$cond": [
+                {"$eq": ["$first_score", 0]},
+                0,
+                {"$round": [
+                    {"$multiply": [
+                        {"$divide": [{"$subtract": ["$last_score", "$first_score"]}, "$first_score"]},
+                        100
+                    ]},
+                    2
+                ]}
+            ]}
+        }}
+    ]
+
+
+def bucket_of(timestamp):
+    """Monthly bucket of an ISO timestamp: "2024-05-17T10:00:00" -> "2024-05"."""
+    return str(timestamp)[:7]
+
+
+def bucket_filter(event):
+    """Filter selecting the attempts bucket an event belongs to."""
+    query = progress_key(event)
+    query["bucket"] = bucket_of(event["timestamp"])
+    return query
+
+
+def bucket_merge_pipeline(attempts, updated_at):
+    """
+    Update pipeline adding attempts to a bucket of the progress_attempts
+    collection. Attempts whose timestamp is already in the bucket are
+    skipped, so replays and re-runs are harmless; the bucket rollups
+    (count, score_sum, best_score) are recomputed from its own attempts.
+    """
+    return [
+        {"$set": {
+            "attempts": {"$concatArrays": [
+                {"$ifNull": ["$attempts", []]},
+                {"$filter": {
+                    "input": attempts,
+                    "as": "attempt",
+                    "cond": {"$not": [{"$in": ["$$attempt.timestamp", {"$ifNull": ["$attempts.timestamp", []]}]}]}
+                }}
+            ]},
+            "updated_at": updated_at
+        }},
+        {"$set": {
+            "count": {"$size": "$attempts"},
+            "score_sum": {"$sum": "$attempts.score"},
+            "best_score": {"$max": "$attempts.score"}
+        }}
+    ]
+
+
+def trim_attempts_pipeline(window):
+    """
+    Update pipeline for migrating a legacy document once its history is in
+    buckets: fill in the running totals, keep the newest `window` attempts
+    and mark it bucketed.
+    """
+    return [
+        {"$set": {
+            "total_attempts": {"$ifNull": ["$total_attempts", {"$size": {"$ifNull": ["$attempts", []]}}]},
+            "score_sum": {"$ifNull": ["$score_sum", {"$sum": "$attempts.score"}]},
+            "first_score": {"$ifNull": ["$first_score", {"$arrayElemAt": ["$attempts.score", 0]}]},
+            "attempts": {"$slice": [{"$ifNull": ["$attempts", []]}, -window]},
+            "bucketed": True
+        }}
+    ]
+
+
+def attempt_key(event):
+    """Identity of an attempt: its progress key plus its timestamp."""
+    return (event["user_id"], event["course_id"], event["quiz_id"], event["timestamp"])
+
+
+def recorded_attempts_query(events):
+    """
+    Filter selecting the attempts buckets that already hold any of the
+    events, one clause per bucket.
+    """
+    clauses = []
+    for items in group_by_bucket((None, event) for event in events).values():
+        query = bucket_filter(items[0][1])
+        query["attempts.timestamp"] = {"$in": [event["timestamp"] for _, event in items]}
+        clauses.append(query)
+    return {"$or": clauses}
+
+
+def group_by_bucket(tagged_events):
+    """
+    Group (delivery_tag, event) pairs by attempts bucket.
+
+    returns: dict of (user_id, course_id, quiz_id, bucket) -> list of (delivery_tag, event)
+    """
+    groups = {}
+    for tag, event in tagged_events:
+        key = (event["user_id"], event["course_id"], event["quiz_id"], bucket_of(event["timestamp"]))
+        groups.setdefault(key, []).append((tag, event))
+    return groups
+
+
+def coalesce_events(tagged_events):
+    """
+    Group (delivery_tag, event) pairs by progress key, keeping arrival order
+    within each key and dropping repeats of the same timestamp.
+
+    returns: dict of (user_id, course_id, quiz_id) -> list of (delivery_tag, event)
+    """
+    groups = {}
+    seen = set()
+    for tag, event in tagged_events:
+        key = (event["user_id"], event["course_id"], event["quiz_id"])
+        if (key, event["timestamp"]) in seen:
+            continue
+        seen.add((key, event["timestamp"]))
+        groups.setdefault(key, []).append((tag, event))
+    return groups
+
+
+def jump_hash(key, buckets):
+    """
+    Jump consistent hash (Lamping & Veach): maps a 64-bit key to a bucket in
+    [0, buckets) and moves only ~1/buckets of the keys when a bucket is added.
+    """
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def shard_for(event, shards):
+    """
+    Shard owning the progress document of an event; every event for the
+    same (user_id, course_id, quiz_id) lands on the same shard.
+    """
+    key = f"{event['user_id']}|{event['course_id']}|{event['quiz_id']}".encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shards)
+
+
+def stats_ids(course_id, quiz_id):
+    """_id of the course-level and quiz-level progress_stats documents."""
+    return f"course:{course_id}", f"quiz:{course_id}:{quiz_id}"
+
+
+def counted_totals(doc):
+    """What a progress document contributes to the aggregates."""
+    return {
+        "version": doc.get("version"),
+        "attempts": doc.get("total_attempts") or 0,
+        "score_sum": doc.get("score_sum") or 0,
+        "best_score": doc.get("best_score")
+    }
+
+
+def stats_delta(doc):
+    """
+    Change a progress document brings to the aggregates since it was last
+    counted (its `counted` field holds the totals already included).
+
+    returns: dict of learners, attempts, score_sum, histogram (best score ->
+    learners) and leaders (new leaderboard entries), or None if unchanged
+    """
+    counted = doc.get("counted")
+    if counted is not None and counted.get("version") == doc.get("version"):
+        return None
+
+    current = counted_totals(doc)
+    previous = counted or {"attempts": 0, "score_sum": 0, "best_score": None}
+    histogram, leaders = {}, []
+    if current["best_score"] != previous["best_score"]:
+        if previous["best_score"] is not None:
+            histogram[str(previous["best_score"])] = -1
+        if current["best_score"] is not None:
+            histogram[str(current["best_score"])] = 1
+            leaders.append({
+                "user_id": doc["user_id"],
+                "quiz_id": doc["quiz_id"],
+                "best_score": current["best_score"],
+                "updated_at": doc.get("updated_at")
+            })
+
+    return {
+        "learners": 0 if counted else 1,
+        "attempts": current["attempts"] - previous["attempts"],
+        "score_sum": current["score_sum"] - previous["score_sum"],
+        "histogram": histogram,
+        "leaders": leaders
+    }
+
+
+def merge_stats_deltas(docs):
+    """
+    Sum the stats_delta of progress documents into one delta per course-level
+    and quiz-level aggregate.
+
+    returns: dict of progress_stats _id -> delta, with its scope fields
+    """
+    merged = {}
+    for doc in docs:
+        delta = stats_delta(doc)
+        if delta is None:
+            continue
+
+        course_stats, quiz_stats = stats_ids(doc["course_id"], doc["quiz_id"])
+        scopes = (
+            (course_stats, {"scope": "course", "course_id": doc["course_id"]}),
+            (quiz_stats, {"scope": "quiz", "course_id": doc["course_id"], "quiz_id": doc["quiz_id"]}),
+        )
+        for stats_id, scope in scopes:
+            total = merged.setdefault(
+                stats_id, dict(scope, learners=0, attempts=0, score_sum=0, histogram={}, leaders=[])
+            )
+            for field in ("learners", "attempts", "score_sum"):
+                total[field] += delta[field]
+            for score, learners in delta["histogram"].items():
+                total["histogram"][score] = total["histogram"].get(score, 0) + learners
+            total["leaders"].extend(delta["leaders"])
+    return merged
+
+
+def merge_leaders(top, leaders, top_k):
+    """
+    Leaderboard after replacing the entries of `leaders`' (user, quiz) pairs:
+    best score first, earliest to reach it on ties. Best scores never go
+    down, so nobody who dropped out of the top K can come back.
+    """
+    replaced = {(entry["user_id"], entry["quiz_id"]) for entry in leaders}
+    entries = [entry for entry in top if (entry["user_id"], entry["quiz_id"]) not in replaced]
+    entries.extend(leaders)
+    entries.sort(key=lambda entry: (-entry["best_score"], entry.get("updated_at") or ""))
+    return entries[:top_k]
+
+
+def fold_stats(stats, delta, top_k):
+    """Apply a merged delta to an in-memory aggregate, like stats_update_pipeline does."""
+    for field in ("learners", "attempts", "score_sum"):
+        stats[field] = stats.get(field, 0) + delta[field]
+    histogram = stats.setdefault("histogram", {})
+    for score, learners in delta["histogram"].items():
+        histogram[score] = histogram.get(score, 0) + learners
+        if not histogram[score]:
+            # The pipeline leaves empty bins at 0; readers treat both the same
+            del histogram[score]
+    stats["top"] = merge_leaders(stats.get("top", []), delta["leaders"], top_k)
+    stats["average_score"] = round(stats["score_sum"] / stats["attempts"], 2) if stats["attempts"] else None
+    return stats
+
+
+def stats_update_pipeline(delta, top_k, updated_at):
+    """
+    Update pipeline adding a merged delta to a progress_stats document:
+    counters are incremented in place and the leaderboard is re-sorted and
+    capped to top_k, all in one atomic update_one.
+    """
+    fields = {key: {"$literal": delta[key]} for key in ("scope", "course_id", "quiz_id") if key in delta}
+    for field in ("learners", "attempts", "score_sum"):
+        fields[field] = {"$add": [{"$ifNull": [f"${field}", 0]}, delta[field]]}
+    for score, learners in delta["histogram"].items():
+        fields[f"histogram.{score}"] = {"$add": [{"$ifNull": [f"$histogram.{score}", 0]}, learners]}
+    if delta["leaders"]:
+        replaced = [[entry["user_id"], entry["quiz_id"]] for entry in delta["leaders"]]
+        fields["top"] = {"$slice": [
+            {"$sortArray": {
+                "input": {"$concatArrays": [
+                    {"$filter": {
+                        "input": {"$ifNull": ["$top", []]},
+                        "cond": {"$not": [{"$in": [["$$this.user_id", "$$this.quiz_id"], {"$literal": replaced}]}]}
+                    }},
+                    {"$literal": delta["leaders"]}
+                ]},
+                "sortBy": {"best_score": -1, "updated_at": 1}
+            }},
+            top_k
+        ]}
+    fields["updated_at"] = updated_at
+
+    return [
+        {"$set": fields},
+        {"$set": {
+            "average_score": {"$cond": [
+                {"$gt": ["$attempts", 0]},
+                {"$round": [{"$divide": ["$score_sum", "$attempts"]}, 2]},
+                None
+            ]}
+        }}
+    ]
@@ -0,0 +1,198 @@
+"""
+Parallel progress worker: one router plus N shard consumer processes.
+
+The router consumes progress_queue and republishes every event to
+progress_queue.shard.<n>, picked by jump consistent hash of
+(user_id, course_id, quiz_id). Each shard queue has exactly one consumer
+process, so events for the same progress document are applied in order
+while different documents are written in parallel.
+
+Run with WORKER_PROCESSES=<n> python progress_worker.py
+"""
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pika
+
+import progress_worker
+from utils import shard_for
+
+logger = logging.getLogger("progress_worker.pool")
+
+# How long shard workers may keep draining their queues after SIGTERM
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
+
+def shard_queue(shard, queue=progress_worker.QUEUE_NAME):
+    return f"{queue}.shard.{shard}"
+
+
+def route_batch(channel, messages, shards, queue):
+    """
+    Republish a batch to the shard queues (confirmed and persistent), then
+    ack the originals with one multiple=True ack.
+    """
+    for tag, properties, body in messages:
+        try:
+            shard = shard_for(json.loads(body), shards)
+        except (ValueError, KeyError, TypeError):
+            # Unparseable: any shard will do, its worker discards it
+            shard = 0
+        channel.basic_publish(
+            exchange="",
+            routing_key=shard_queue(shard, queue),
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=properties.content_type,
+                message_id=properties.message_id,
+                headers=properties.headers
+            ),
+            mandatory=True
+        )
+    channel.basic_ack(delivery_tag=messages[-1][0], multiple=True)
+
+
+def run_router(shards, stop_event, queue=progress_worker.QUEUE_NAME, bind=True):
+    """Route until stop_event is set; reconnects on broker errors."""
+    while not stop_event.is_set():
+        try:
+            connection = pika.BlockingConnection(pika.URLParameters(progress_worker.RABBITMQ_URL))
+            channel = connection.channel()
+
+            channel.queue_declare(queue=queue, durable=True)
+            if bind:
+                channel.exchange_declare(exchange=progress_worker.EXCHANGE_NAME, exchange_type="topic", durable=True)
+                channel.queue_bind(queue=queue, exchange=progress_worker.EXCHANGE_NAME,
+                                   routing_key=progress_worker.ROUTING_KEY)
+            for shard in range(shards):
+                channel.queue_declare(queue=shard_queue(shard, queue), durable=True)
+
+            channel.confirm_delivery()
+            channel.basic_qos(prefetch_count=max(progress_worker.PREFETCH_COUNT, progress_worker.BATCH_SIZE))
+
+            logger.info(f"Routing {queue} to {shards} shards…")
+            progress_worker.consume_batches(
+                channel,
+                lambda ch, messages: route_batch(ch, messages, shards, queue),
+                queue=queue,
+                batch_size=progress_worker.BATCH_SIZE,
+                should_stop=stop_event.is_set
+            )
+            connection.close()
+
+        except Exception as e:
+            logger.error(f"Router crashed, reconnecting in 5 sec: {e}")
+            stop_event.wait(5)
+
+
+def run_shard_worker(shard, stop_event, queue=progress_worker.QUEUE_NAME,
+                     collection_factory=None, factory_args=(), processed=None):
+    """
+    Consume one shard queue in batches. After stop_event is set the worker
+    keeps going until its queue is empty, then exits.
+    """
+    # The parent coordinates shutdown through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    if collection_factory:
+        collection, buckets, stats = collection_factory(*factory_args), None, None
+    else:
+        collection, buckets = progress_worker.progress_col, progress_worker.attempts_col
+        stats = progress_worker.stats_col
+    name = shard_queue(shard, queue)
+
+    def handle_batch(channel, messages):
+        progress_worker.process_batch(channel, collection, messages, queue=name, buckets=buckets,
+                                      publish_updates=buckets is not None, stats=stats)
+        if processed is not None:
+            with processed.get_lock():
+                processed.value += len(messages)
+
+    while True:
+        try:
+            connection = pika.BlockingConnection(pika.URLParameters(progress_worker.RABBITMQ_URL))
+            channel = connection.channel()
+            channel.queue_declare(queue=name, durable=True)
+            progress_worker.declare_retry_queues(channel, name)
+            channel.exchange_declare(exchange=progress_worker.PROGRESS_EXCHANGE, exchange_type="topic", durable=True)
+            channel.confirm_delivery()
+            channel.basic_qos(prefetch_count=max(progress_worker.PREFETCH_COUNT, progress_worker.BATCH_SIZE))
+
+            def drained():
+                return stop_event.is_set() and not channel.get_waiting_message_count() \
+                    and channel.queue_declare(queue=name, passive=True).method.message_count == 0
+
+            progress_worker.consume_batches(channel, handle_batch, queue=name,
+                                            batch_size=progress_worker.BATCH_SIZE, should_stop=drained)
+            connection.close()
+            return
+
+        except Exception as e:
+            if stop_event.is_set():
+                return
+            logger.error(f"Shard {shard} worker crashed, reconnecting in 5 sec: {e}")
+            stop_event.wait(5)
+
+
+def run_pool(processes, stop_event=None, queue=progress_worker.QUEUE_NAME, bind=True,
+             collection_factory=None, factory_args=(), processed=None):
+    """
+    Start `processes` shard workers and route in this process until SIGTERM
+    (or stop_event), then let the workers drain and exit.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = stop_event or ctx.Event()
+
+    if collection_factory is None:
+        progress_worker.ensure_indexes(progress_worker.progress_col, progress_worker.attempts_col)
+
+    workers = [
+        ctx.Process(
+            target=run_shard_worker,
+            args=(shard, stop_event, queue, collection_factory, factory_args, processed),
+            name=f"progress-shard-{shard}"
+        )
+        for shard in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    if threading.current_thread() is threading.main_thread():
+        def request_stop(signum, frame):
+            logger.info("Shutdown requested, draining…")
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+    logger.info(f"Progress Worker starting with {processes} shard processes…")
+    run_router(processes, stop_event, queue=queue, bind=bind)
+
+    reap_workers(workers, SHUTDOWN_DRAIN_SECONDS)
+    logger.info("Progress Worker stopped")
+
+
+def reap_workers(workers, drain_seconds, grace_seconds=5):
+    """
+    Wait up to drain_seconds for the shard workers to drain, then stop the
+    rest. Shard workers ignore SIGTERM, so a worker still alive after the
+    grace period is killed.
+    """
+    deadline = time.monotonic() + drain_seconds
+    for worker in workers:
+        worker.join(max(0, deadline - time.monotonic()))
+        if worker.is_alive():
+            logger.warning(f"{worker.name} did not drain in time, terminating")
+            worker.terminate()
+            worker.join(grace_seconds)
+        if worker.is_alive():
+            logger.warning(f"{worker.name} ignored SIGTERM, killing")
+            worker.kill()
+            worker.join()
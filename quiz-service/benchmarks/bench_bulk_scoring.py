@@ -0,0 +1,43 @@
+"""
+Bulk grading micro-benchmark: the old per-question loop versus the
+vectorized scorer (NumPy when installed) at 10k submissions x 100 answers.
+
+Usage: python benchmarks/bench_bulk_scoring.py [submissions] [questions]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_scoring import legacy_score, make_quiz  # noqa: E402
+from services import scoring  # noqa: E402
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    random.seed(7)
+
+    quiz = make_quiz(questions)
+    key = scoring.build_answer_key(quiz["questions"])
+    all_answers = [[random.randrange(4) for _ in range(questions)] for _ in range(submissions)]
+
+    start = time.perf_counter()
+    expected = [legacy_score(quiz, answers) for answers in all_answers]
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = scoring.score_bulk(key, all_answers)
+    bulk = time.perf_counter() - start
+
+    assert scores == expected
+    backend = "numpy" if scoring.np is not None else "pure python"
+    print(f"{submissions} x {questions} answers")
+    print(f"legacy loop   {legacy * 1000:>8.1f} ms")
+    print(f"score_bulk    {bulk * 1000:>8.1f} ms  ({backend}, {legacy / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
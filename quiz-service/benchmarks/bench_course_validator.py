@@ -0,0 +1,90 @@
+"""
+Added latency of course validation per GET /quiz request: the old uncached
+validator (one HTTP call per request) versus the cached validator, and how
+fast the circuit breaker fails once Course Service is down.
+
+Course Service is simulated by a session whose GET sleeps for the round trip.
+
+Usage: python benchmarks/bench_course_validator.py [requests] [round_trip_ms]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from services.course_validator import CourseValidator  # noqa: E402
+
+COURSES = [f"course-{i}" for i in range(200)]
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """Course Service stand-in: known courses return 200, others 404."""
+
+    def __init__(self, round_trip, down=False):
+        self.round_trip = round_trip
+        self.down = down
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        time.sleep(self.round_trip)
+        if self.down:
+            raise requests.exceptions.ConnectionError("course-service unreachable")
+        course_id = url.rsplit("/", 1)[-1]
+        return FakeResponse(200 if course_id in COURSES else 404)
+
+
+def run(label, validator, session, course_ids, clear_each_time=False):
+    start = time.perf_counter()
+    for course_id in course_ids:
+        if clear_each_time:
+            validator.clear()
+        validator.validate_course_exists(course_id)
+    elapsed = time.perf_counter() - start
+    stats = validator.stats()
+    print(f"{label:<28} {elapsed / len(course_ids) * 1000:8.3f} ms/request  "
+          f"http calls={session.calls:<6} hit_ratio={stats['hit_ratio']}  "
+          f"breaker={stats['breaker']}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = (float(sys.argv[2]) if len(sys.argv) > 2 else 5) / 1000
+
+    rng = random.Random(42)
+    # Mostly popular courses, a few unknown ids
+    course_ids = [
+        rng.choice(COURSES[:20]) if rng.random() < 0.8 else rng.choice(COURSES + ["missing-course"])
+        for _ in range(n)
+    ]
+
+    session = FakeSession(round_trip)
+    run("uncached", CourseValidator("http://course-service", session=session),
+        session, course_ids, clear_each_time=True)
+
+    session = FakeSession(round_trip)
+    run("cached", CourseValidator("http://course-service", session=session),
+        session, course_ids)
+
+    session = FakeSession(round_trip)
+    validator = CourseValidator("http://course-service", session=session)
+    for course_id in COURSES:
+        validator.mark_exists(course_id)  # warmed by course_created events
+    run("cached, event-warmed", validator, session, course_ids)
+
+    session = FakeSession(round_trip, down=True)
+    run("course-service down", CourseValidator("http://course-service", session=session),
+        session, course_ids, clear_each_time=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load-test harness: concurrency and throughput of the threaded Flask app
+versus the ASGI app for GET /quiz/<course_id> and POST /quiz/submit.
+
+Both apps run in-process against the SQLite stand-in for Turso with the same
+simulated round trip; the response cache is disabled so every request does
+database I/O. Requires httpx.
+
+Usage: python benchmarks/bench_load.py [requests] [round_trip_ms]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+import uvicorn  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from asgi import create_asgi_app  # noqa: E402
+from benchmarks.standins import AsyncSqliteClient, SqliteClient  # noqa: E402
+from routes import quiz_bp  # noqa: E402
+from schema import init_schema  # noqa: E402
+from services.outbox import OutboxFlusher  # noqa: E402
+from services.quiz_cache import QuizCache  # noqa: E402
+from services.quiz_templates import TemplateRegistry  # noqa: E402
+from services.scoring import AnswerKeyCache  # noqa: E402
+
+SECRET = "load-test-secret"
+FLASK_PORT = 5802
+ASGI_PORT = 5803
+COURSES = [f"course-{i}" for i in range(20)]
+
+
+def serve_flask(round_trip):
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = SECRET
+    app.config["JWT_TOKEN_LOCATION"] = ["cookies"]
+    app.config["COURSE_VALIDATION_ENABLED"] = False
+    JWTManager(app)
+    app.db = SqliteClient(round_trip=round_trip)
+    init_schema(app.db)
+    app.quiz_cache = QuizCache(max_entries=0)
+    app.quiz_templates = TemplateRegistry.load()
+    app.answer_keys = AnswerKeyCache(max_entries=0)
+    app.submission_batcher = app.db
+    app.outbox = OutboxFlusher(app.db, publisher=None)
+    app.register_blueprint(quiz_bp)
+
+    server = make_server("127.0.0.1", FLASK_PORT, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_asgi(round_trip):
+    os.environ["QUIZ_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["ANSWER_KEY_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["JWT_SECRET_KEY"] = SECRET
+    os.environ["COURSE_VALIDATION_ENABLED"] = "false"
+    app = create_asgi_app(db=AsyncSqliteClient(round_trip=round_trip), background=False)
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=ASGI_PORT,
+                                           log_level="warning", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def drive(base_url, requests, concurrency, token):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies={"access_token_cookie": token},
+                                 limits=limits, timeout=60) as client:
+        # Warm up and learn the quiz ids
+        quiz_ids = [(await client.get(f"/quiz/{c}")).json()["quiz_id"] for c in COURSES]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                if i % 2:
+                    response = await client.get(f"/quiz/{COURSES[i % len(COURSES)]}")
+                else:
+                    response = await client.post("/quiz/submit", json={
+                        "user_id": f"user{i}", "quiz_id": quiz_ids[i % len(quiz_ids)], "answers": [1] * 10
+                    })
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / elapsed, latencies[int(len(latencies) * 0.99) - 1] * 1000, errors
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+
+    serve_flask(round_trip)
+    serve_asgi(round_trip)
+    token = jwt.encode({"sub": "load-test", "type": "access"}, SECRET, algorithm="HS256")
+
+    print(f"{'concurrency':>11} {'flask req/s':>12} {'p99 ms':>8} {'asgi req/s':>12} {'p99 ms':>8}")
+    for concurrency in (10, 100, 500, 1000):
+        flask_rps, flask_p99, flask_errors = asyncio.run(
+            drive(f"http://127.0.0.1:{FLASK_PORT}", requests, concurrency, token))
+        asgi_rps, asgi_p99, asgi_errors = asyncio.run(
+            drive(f"http://127.0.0.1:{ASGI_PORT}", requests, concurrency, token))
+        print(f"{concurrency:>11} {flask_rps:>12.0f} {flask_p99:>8.0f} {asgi_rps:>12.0f} {asgi_p99:>8.0f}"
+              f"   errors flask={flask_errors} asgi={asgi_errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Requests/sec of GET /quiz/<course_id> with the response cache on and off,
+using a SQLite stand-in for Turso with a simulated network round trip.
+
+Usage: python benchmarks/bench_quiz_cache.py [requests] [round_trip_ms]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token  # noqa: E402
+
+from benchmarks.standins import SqliteClient  # noqa: E402
+from routes import quiz_bp  # noqa: E402
+from schema import init_schema  # noqa: E402
+from services.quiz_cache import QuizCache  # noqa: E402
+
+COURSES = [f"course-{i}" for i in range(50)]
+
+
+def make_app(db, cache):
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "bench-secret"
+    app.config["JWT_TOKEN_LOCATION"] = ["cookies"]
+    app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+    app.config["COURSE_VALIDATION_ENABLED"] = False
+    JWTManager(app)
+    app.db = db
+    app.quiz_cache = cache
+    app.register_blueprint(quiz_bp)
+    return app
+
+
+def run(label, app, requests):
+    with app.app_context():
+        token = create_access_token(identity="bench-user")
+    client = app.test_client()
+    client.set_cookie("access_token_cookie", token)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        response = client.get(f"/quiz/{COURSES[i % len(COURSES)]}")
+        assert response.status_code == 200, response.data
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {requests / elapsed:>10.0f} req/s")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    round_trip = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+
+    db = SqliteClient(round_trip=round_trip)
+    init_schema(db)
+    questions = json.dumps([
+        {"id": i, "question": f"Question {i}?", "options": ["A", "B", "C", "D"], "answer_index": i % 4}
+        for i in range(1, 51)
+    ])
+    db.batch([
+        ("INSERT INTO quizzes (course_id, title, questions_json) VALUES (?, ?, ?)",
+         [course_id, f"Quiz for Course {course_id}", questions])
+        for course_id in COURSES
+    ])
+
+    run("uncached", make_app(db, QuizCache(max_entries=0)), requests)
+
+    cache = QuizCache()
+    run("cached", make_app(db, cache), requests)
+    print("cache stats:", cache.stats())
+
+
+if __name__ == "__main__":
+    main()
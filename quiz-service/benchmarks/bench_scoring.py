@@ -0,0 +1,71 @@
+"""
+Submit payload size and scoring throughput: client-supplied quiz scored
+question by question (old) versus quiz_id + answers scored against a
+compact server-side answer key (new).
+
+Usage: python benchmarks/bench_scoring.py [submissions]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.scoring import AnswerKey, build_answer_key  # noqa: E402
+
+
+def legacy_score(quiz, answers):
+    """The previous calculate_quiz_score."""
+    score = 0
+    i = 0
+    for q in quiz["questions"]:
+        correct = q["answer_index"]
+        if int(answers[i]) == correct:
+            score += 1
+        i += 1
+    return score
+
+
+def make_quiz(size):
+    return {
+        "quiz_id": 1,
+        "course_id": "65f1c0ffee",
+        "title": "Quiz",
+        "questions": [
+            {"id": i, "question": f"Question {i} about this course topic?",
+             "options": ["Option A", "Option B", "Option C", "Option D"],
+             "answer_index": random.randrange(4)}
+            for i in range(size)
+        ],
+    }
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(7)
+
+    print(f"{'questions':>9} {'old payload':>12} {'new payload':>12} {'old subs/s':>12} {'new subs/s':>12}")
+    for size in (10, 100, 500):
+        quiz = make_quiz(size)
+        answer_key = AnswerKey(1, quiz["course_id"], build_answer_key(quiz["questions"]))
+        all_answers = [[random.randrange(4) for _ in range(size)] for _ in range(submissions)]
+
+        old_payload = len(json.dumps({"user_id": "u1", "quiz": quiz, "answers": all_answers[0]}))
+        new_payload = len(json.dumps({"user_id": "u1", "quiz_id": 1, "answers": all_answers[0]}))
+
+        start = time.perf_counter()
+        old_scores = [legacy_score(quiz, answers) for answers in all_answers]
+        old_rate = submissions / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        new_scores = [answer_key.score(answers) for answers in all_answers]
+        new_rate = submissions / (time.perf_counter() - start)
+
+        assert old_scores == new_scores
+        print(f"{size:>9} {old_payload:>11}B {new_payload:>11}B {old_rate:>12.0f} {new_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
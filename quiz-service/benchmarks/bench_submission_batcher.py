@@ -0,0 +1,55 @@
+"""
+Throughput and p50/p99 latency of quiz submissions written directly versus
+through the SubmissionBatcher at several batch windows, against a SQLite
+stand-in for Turso with a simulated network round trip.
+
+Usage: python benchmarks/bench_submission_batcher.py [submissions] [threads] [round_trip_ms]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standins import SqliteClient  # noqa: E402
+from routes import save_quiz_submission  # noqa: E402
+from schema import init_schema  # noqa: E402
+from services.submission_batcher import SubmissionBatcher  # noqa: E402
+
+
+def run(label, writer, submissions, threads):
+    answers = [1] * 10
+
+    def submit(i):
+        start = time.perf_counter()
+        save_quiz_submission(writer, f"user{i}", 1, "c1", answers, 7)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(submit, range(submissions)))
+    elapsed = time.perf_counter() - start
+
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<14} {submissions / elapsed:>9.0f} subs/s   p50 {p50:>7.1f} ms   p99 {p99:>7.1f} ms")
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    round_trip = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.02
+
+    db = SqliteClient(round_trip=round_trip)
+    init_schema(db)
+
+    run("direct", db, submissions, threads)
+    for window_ms in (1, 5, 10, 20):
+        batcher = SubmissionBatcher(db, max_batch_size=100, max_latency=window_ms / 1000)
+        run(f"window {window_ms}ms", batcher, submissions, threads)
+        print(f"{'':<14} {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
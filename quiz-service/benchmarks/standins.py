@@ -0,0 +1,138 @@
+"""
+Local stand-ins for the external systems quiz-service talks to.
+They only simulate network cost, so benchmarks measure our own overhead.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+ResultSet = namedtuple("ResultSet", ["rows", "last_insert_rowid", "rows_affected"])
+
+
+class SqliteClient:
+    """
+    Turso (libsql_client sync client) stand-in backed by SQLite.
+    round_trip: seconds added to every execute/batch call
+    """
+
+    def __init__(self, path=":memory:", round_trip=0.0):
+        self.round_trip = round_trip
+        self.calls = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+    def _run(self, stmt):
+        if isinstance(stmt, str):
+            stmt = (stmt, [])
+        sql, args = stmt
+        cursor = self._conn.execute(sql, args)
+        rows = cursor.fetchall()
+        return ResultSet(rows, cursor.lastrowid, cursor.rowcount)
+
+    def execute(self, sql, args=None):
+        time.sleep(self.round_trip)
+        with self._lock:
+            self.calls += 1
+            return self._run((sql, args or []))
+
+    def batch(self, stmts):
+        time.sleep(self.round_trip)
+        with self._lock:
+            self.calls += 1
+            self._conn.execute("BEGIN")
+            try:
+                results = [self._run(stmt) for stmt in stmts]
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return results
+
+
+class AsyncSqliteClient(SqliteClient):
+    """
+    Async (libsql_client.create_client) stand-in: the simulated round trip
+    is awaited, so it does not block the event loop.
+    """
+
+    async def execute(self, sql, args=None):
+        await asyncio.sleep(self.round_trip)
+        with self._lock:
+            self.calls += 1
+            return self._run((sql, args or []))
+
+    async def batch(self, stmts):
+        await asyncio.sleep(self.round_trip)
+        with self._lock:
+            self.calls += 1
+            self._conn.execute("BEGIN")
+            try:
+                results = [self._run(stmt) for stmt in stmts]
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return results
+
+    async def close(self):
+        self._conn.close()
+
+
+class FakeBroker:
+    """
+    In-memory RabbitMQ stand-in.
+
+    connect_latency: seconds spent on TCP + AMQP handshake per connection
+    publish_latency: seconds spent per basic_publish
+    """
+
+    def __init__(self, connect_latency=0.02, publish_latency=0.0002):
+        self.connect_latency = connect_latency
+        self.publish_latency = publish_latency
+        self.connections = 0
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def connection_factory(self):
+        broker = self
+
+        class FakeBlockingConnection:
+            def __init__(self, parameters=None):
+                time.sleep(broker.connect_latency)
+                with broker._lock:
+                    broker.connections += 1
+                self.is_closed = False
+
+            def channel(self):
+                return FakeChannel(broker)
+
+            def process_data_events(self, time_limit=0):
+                pass
+
+            def close(self):
+                self.is_closed = True
+
+        return FakeBlockingConnection
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_closed = False
+
+    def exchange_declare(self, **kwargs):
+        time.sleep(self.broker.publish_latency)
+
+    def confirm_delivery(self):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        time.sleep(self.broker.publish_latency)
+        with self.broker._lock:
+            self.broker.messages.append((exchange, routing_key, body))
+
+    def close(self):
+        self.is_closed = True
@@ -0,0 +1,72 @@
+"""
+Merge the duplicate quizzes the old SELECT-then-INSERT path created, so the
+one-quiz-per-course unique index can be built.
+
+For every course with several quizzes the oldest one (lowest id) is kept:
+submissions of the others are repointed to it, then the others are deleted.
+Safe to re-run; a database without duplicates is left untouched.
+
+Progress documents are keyed by quiz_id in the progress service and are not
+rewritten here: the merged ids are logged so they can be reconciled there.
+
+Usage: python migrate_quiz_duplicates.py [--dry-run]
+"""
+import argparse
+import logging
+
+from schema import init_schema
+
+logger = logging.getLogger("migrate_quiz_duplicates")
+
+SELECT_DUPLICATES = """
+    SELECT course_id, MIN(id) AS keep_id, GROUP_CONCAT(id) AS ids
+    FROM quizzes
+    GROUP BY course_id
+    HAVING COUNT(*) > 1
+"""
+
+
+def merge_duplicate_quizzes(db, dry_run=False):
+    """
+    Returns:
+        dict: course_id -> (kept quiz id, list of merged quiz ids)
+    """
+    merged = {}
+    for row in db.execute(SELECT_DUPLICATES).rows:
+        keep_id = row["keep_id"]
+        duplicate_ids = sorted(int(i) for i in str(row["ids"]).split(",") if int(i) != keep_id)
+        merged[row["course_id"]] = (keep_id, duplicate_ids)
+
+        placeholders = ",".join("?" * len(duplicate_ids))
+        submissions = db.execute(
+            f"SELECT COUNT(*) AS n FROM quiz_submissions WHERE quiz_id IN ({placeholders})", duplicate_ids
+        ).rows[0]["n"]
+        logger.info(f"Course {row['course_id']}: merging quizzes {duplicate_ids} into {keep_id} "
+                    f"({submissions} submissions repointed)")
+        if dry_run:
+            continue
+
+        # Submissions first, in the same batch, so none is left pointing at a deleted quiz
+        db.batch([
+            (f"UPDATE quiz_submissions SET quiz_id = ? WHERE quiz_id IN ({placeholders})", [keep_id, *duplicate_ids]),
+            (f"DELETE FROM quizzes WHERE id IN ({placeholders})", duplicate_ids),
+        ])
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_db_client
+    db = create_db_client()
+    merged = merge_duplicate_quizzes(db, args.dry_run)
+    if not args.dry_run:
+        init_schema(db)
+    logger.info(f"Done: {len(merged)} courses had duplicate quizzes")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
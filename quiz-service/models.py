@@ -10,7 +10,7 @@ class Quiz(db.Model):
     __tablename__ = 'quizzes'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.String(100), nullable=False)
+    course_id = db.Column(db.String(100), nullable=False, unique=True)
     title = db.Column(db.String(200), nullable=False)
     questions_json = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -41,4 +41,15 @@ class QuizSubmission(db.Model):
 
     @answers.setter
     def answers(self, value):
-        self.answers_json = json.dumps(value)
\ No newline at end of file
+        self.answers_json = json.dumps(value)
+
+
+class QuizEventOutbox(db.Model):
+    __tablename__ = 'quiz_event_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    routing_key = db.Column(db.String(100), nullable=False)
+    payload_json = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.Float, nullable=False)
+    claimed_until = db.Column(db.Float, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
\ No newline at end of file
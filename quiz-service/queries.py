@@ -0,0 +1,19 @@
+"""
+SQL shared by the quiz-service request handlers.
+"""
+
+SELECT_QUIZ_BY_COURSE = (
+    "SELECT id, course_id, title, questions_json FROM quizzes WHERE course_id = ?"
+)
+
+SELECT_QUIZ_BY_ID = (
+    "SELECT id, course_id, title, questions_json FROM quizzes WHERE id = ?"
+)
+
+# Get-or-create in one round trip. The no-op DO UPDATE makes RETURNING
+# yield the existing row when another request created it first.
+UPSERT_QUIZ = """
+    INSERT INTO quizzes (course_id, title, questions_json) VALUES (?, ?, ?)
+    ON CONFLICT (course_id) DO UPDATE SET course_id = excluded.course_id
+    RETURNING id, course_id, title, questions_json
+"""
@@ -0,0 +1,101 @@
+"""
+Framework-independent quiz-service logic shared by the Flask (WSGI) app in
+routes.py and the async (ASGI) app in asgi.py.
+"""
+import json
+import uuid
+from datetime import datetime
+
+from services.outbox import outbox_statement
+
+
+def parse_submission(data):
+    """
+    Validate a POST /quiz/submit body.
+    Older clients post the whole quiz; only its id is used.
+
+    Returns:
+        tuple: (user_id, quiz_id, answers)
+
+    Raises:
+        KeyError, TypeError, ValueError: if the payload is malformed
+    """
+    user_id = data["user_id"]
+    answers = data["answers"]
+    quiz_id = int(data["quiz_id"] if "quiz_id" in data else data["quiz"]["quiz_id"])
+    if not isinstance(answers, list):
+        raise TypeError("answers must be a list")
+    return user_id, quiz_id, answers
+
+
+def submission_result(submission_id, score, answer_key):
+    """Response body for a graded submission."""
+    total = len(answer_key)
+    return {
+        "submission_id": submission_id,
+        "score": score,
+        "total_questions": total,
+        "percentage": round((score / total) * 100, 2) if total else 0
+    }
+
+
+def submission_statements(user_id, quiz_id, course_id, answers, score):
+    """
+    Build the submission INSERT plus its quiz_submitted outbox row.
+    Both are idempotent on the submission id, so a batch that may or may not
+    have committed can safely be sent again.
+
+    Returns:
+        tuple: (submission_id, statements)
+    """
+
+    submission_id = str(uuid.uuid4())
+
+    event_data = {
+        'event_type': 'quiz_submitted',
+        'submission_id': submission_id,
+        'user_id': user_id,
+        'course_id': course_id,
+        'quiz_id': quiz_id,
+        'score': score,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+    statements = [
+        (
+            """
+            INSERT INTO quiz_submissions 
+            (id, user_id, quiz_id, course_id, answers_json, score)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO NOTHING
+            """,
+            [
+                submission_id,
+                user_id,
+                quiz_id,
+                course_id,
+                json.dumps(answers),
+                score,
+            ]
+        ),
+        outbox_statement('quiz.submitted', event_data, if_inserted=True),
+    ]
+
+    return submission_id, statements
+
+
+def build_quiz_response(row):
+    """
+    Serialize a quizzes row into the GET /quiz response body (bytes).
+    Correct answers stay on the server, so answer_index is stripped.
+    """
+    questions = json.loads(row["questions_json"])  # Convert JSON string back to list
+    response_data = {
+        "quiz_id": row["id"],
+        "course_id": row["course_id"],
+        "title": row["title"],
+        "questions": [
+            {k: v for k, v in q.items() if k != "answer_index"} for q in questions
+        ]
+    }
+    return json.dumps(response_data).encode("utf-8")
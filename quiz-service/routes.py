@@ -1,47 +1,29 @@
 import logging
-import json
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Quiz
-from services.course_validator import CourseValidator
-from services.message_publisher import MessagePublisher
-from datetime import datetime
-import uuid
+from queries import SELECT_QUIZ_BY_COURSE, SELECT_QUIZ_BY_ID, UPSERT_QUIZ
+from quiz_logic import (
+    build_quiz_response,
+    parse_submission,
+    submission_result,
+    submission_statements,
+)
 
 logger = logging.getLogger(__name__)
 
 quiz_bp = Blueprint('quiz', __name__)
 
-def calculate_quiz_score(quiz, answers):
-    score = 0
-    i = 0
-    for q in quiz["questions"]:
-        correct = q["answer_index"]
-        if int(answers[i]) == correct:
-            score += 1
-        i += 1
-    return score
+def load_quiz_by_id(db, quiz_id):
+    result = db.execute(SELECT_QUIZ_BY_ID, [quiz_id])
+    return result.rows[0] if result.rows else None
 
 def save_quiz_submission(db, user_id, quiz_id, course_id, answers, score):
-
-    submission_id = str(uuid.uuid4())
-
-    db.execute(
-        """
-        INSERT INTO quiz_submissions 
-        (id, user_id, quiz_id, course_id, answers_json, score)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        [
-            submission_id,
-            user_id,
-            quiz_id,
-            course_id,
-            json.dumps(answers),
-            score,
-        ]
-    )
-
+    """
+    Store the submission and its quiz_submitted event in one transaction.
+    The event is delivered later by the outbox flusher.
+    """
+    submission_id, statements = submission_statements(user_id, quiz_id, course_id, answers, score)
+    db.batch(statements)
     return submission_id
 
 
@@ -50,6 +32,17 @@ def health_check():
     return jsonify({'status': 'healthy', 'service': 'quiz-service'}), 200
 
 
+@quiz_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'publisher': current_app.publisher.metrics.snapshot(),
+        'outbox': current_app.outbox.stats(),
+        'quiz_cache': current_app.quiz_cache.stats(),
+        'submission_batcher': current_app.submission_batcher.stats(),
+        'course_validator': current_app.course_validator.stats()
+    }), 200
+
+
 @quiz_bp.route('/quiz/<course_id>', methods=['GET'])
 @jwt_required()
 def get_quiz(course_id):
@@ -61,12 +54,18 @@ def get_quiz(course_id):
         # -----------------------------------------------------------
         # 1. Validate that the course actually exists in Course Service
         # -----------------------------------------------------------
-        # course_validator = CourseValidator(current_app.config['COURSE_SERVICE_URL'])
-        # is_valid = course_validator.validate_course_exists(course_id)
-
-        # if not is_valid:
-        #     # If Course Service does not find the course, return 404
-        #     return jsonify({'error': 'Course not found or validation failed'}), 404
+        # Answered from cache or course events; only a cold miss calls Course Service
+        if current_app.config['COURSE_VALIDATION_ENABLED']:
+            if not current_app.course_validator.validate_course_exists(course_id):
+                # If Course Service does not find the course, return 404
+                return jsonify({'error': 'Course not found or validation failed'}), 404
+
+        # Serve the already-serialized response if we have it
+        cache = current_app.quiz_cache
+        body = cache.get(course_id)
+        if body is not None:
+            return current_app.response_class(body, status=200, mimetype='application/json')
+        cache_version = cache.version()
 
         # Get Turso database client
         db = current_app.db
@@ -74,47 +73,30 @@ def get_quiz(course_id):
         # -----------------------------------------------------------
         # 2. Check if a quiz already exists for this course in the DB
         # -----------------------------------------------------------
-        result = db.execute(
-            "SELECT id, course_id, title, questions_json FROM quizzes WHERE course_id = ?",
-            [course_id]
-        )
+        result = db.execute(SELECT_QUIZ_BY_COURSE, [course_id])
         row = result.rows[0] if result.rows else None
 
         # -----------------------------------------------------------
         # 3. If no quiz exists yet → Automatically create a default quiz
         # -----------------------------------------------------------
         if not row:
-            quiz = create_default_quiz(course_id)
-
-            # Insert newly created quiz into Turso
-            db.execute(
-                "INSERT INTO quizzes (course_id, title, questions_json) VALUES (?, ?, ?)",
-                [
-                    quiz["course_id"],
-                    quiz["title"],
-                    json.dumps(quiz["questions"])  # Store questions as JSON text
-                ]
-            )
+            quiz = current_app.quiz_templates.build(course_id)
 
-            # Query again to retrieve the inserted quiz record
+            # Idempotent upsert: concurrent first requests all get the same row
             result = db.execute(
-                "SELECT id, course_id, title, questions_json FROM quizzes WHERE course_id = ?",
-                [course_id]
+                UPSERT_QUIZ,
+                [quiz["course_id"], quiz["title"], quiz["questions_json"]]
             )
             row = result.rows[0]
 
         # -----------------------------------------------------------
         # 4. Build the final JSON response for the client
         # -----------------------------------------------------------
-        response_data = {
-            "quiz_id": row["id"],
-            "course_id": row["course_id"],
-            "title": row["title"],
-            "questions": json.loads(row["questions_json"])  # Convert JSON string back to list
-        }
+        body = build_quiz_response(row)
+        cache.put(course_id, body, cache_version)
 
         logger.info(f"Quiz retrieved successfully for course {course_id}")
-        return jsonify(response_data), 200
+        return current_app.response_class(body, status=200, mimetype='application/json')
 
     except Exception as e:
         # Catch-all error logging for debugging
@@ -124,270 +106,127 @@ def get_quiz(course_id):
 @quiz_bp.route('/quiz/submit', methods=['POST'])
 def submit_quiz():
     try:
-        data = request.get_json()
-        quiz = data["quiz"]
-        answers = data["answers"]
+        user_id, quiz_id, answers = parse_submission(request.get_json())
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Invalid quiz submission: {str(e)}")
+        return jsonify({"error": "Invalid submission"}), 400
 
-        print(quiz, data["user_id"])
+    try:
+        # 1. score against the server-side answer key
+        answer_key = current_app.answer_keys.get_or_load(
+            quiz_id, lambda qid: load_quiz_by_id(current_app.db, qid)
+        )
+        if answer_key is None:
+            return jsonify({"error": "Quiz not found"}), 404
 
-        # 1. count the score
-        score = calculate_quiz_score(quiz, answers)
+        score = answer_key.score(answers)
 
-        # 2. save to turso
+        # 2. save to turso (batched with other in-flight submissions)
         submission_id = save_quiz_submission(
-            db=current_app.db,
-            user_id=data["user_id"],
-            quiz_id=quiz["quiz_id"],
-            course_id=quiz["course_id"],
+            db=current_app.submission_batcher,
+            user_id=user_id,
+            quiz_id=quiz_id,
+            course_id=answer_key.course_id,
             answers=answers,
             score=score
         )
 
-        # Publish event
-        try:
-            publisher = MessagePublisher(current_app.config['RABBITMQ_URL'])
-            event_data = {
-                'event_type': 'quiz_submitted',
-                'user_id': data["user_id"],
-                'course_id': quiz["course_id"],
-                'quiz_id': quiz["quiz_id"],
-                'score': score,
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            publisher.publish_quiz_event(event_data)
-            logger.info(f"Quiz submission event published for user {data['user_id']}")
-        except Exception as e:
-            logger.error(f"Failed to publish quiz event: {str(e)}")
-
-        return jsonify({
-            "submission_id": submission_id,
-            "score": score,
-            "total_questions": len(quiz["questions"]),
-            "percentage": round((score / len(quiz["questions"])) * 100, 2)
-        }), 200
+        # 3. let the outbox flusher publish the event without waiting for it
+        current_app.outbox.wake()
+
+        return jsonify(submission_result(submission_id, score, answer_key)), 200
 
     except Exception as e:
         logger.error(f"Error submitting quiz: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
-def create_default_quiz(course_id):
-    quiz = Quiz()
-    quiz.course_id = course_id
-    quiz.title = f'Quiz for Course {course_id}'
-
-    # Course-specific questions based on your data
-    if 'python' in course_id.lower() or 'beginner' in course_id.lower():
-        quiz.questions = [
-            {
-                'id': 1,
-                'question': 'What is Python primarily used for?',
-                'options': ['Web development', 'Data analysis', 'Automation', 'All of the above'],
-                'answer_index': 3
-            },
-            {
-                'id': 2,
-                'question': 'Which keyword is used to define a function in Python?',
-                'options': ['function', 'def', 'func', 'define'],
-                'answer_index': 1
-            },
-            {
-                'id': 3,
-                'question': 'What is the correct way to create a list in Python?',
-                'options': ['list = {}', 'list = []', 'list = ()', 'list = <>'],
-                'answer_index': 1
-            },
-            {
-                'id': 4,
-                'question': 'How do you start building projects in Python?',
-                'options': ['Learn syntax first', 'Start with fundamentals', 'Jump into frameworks',
-                            'Copy existing code'],
-                'answer_index': 1
-            },
-            {
-                'id': 5,
-                'question': 'What is indentation used for in Python?',
-                'options': ['Decoration', 'Code blocks', 'Comments', 'Variables'],
-                'answer_index': 1
-            },
-            {
-                'id': 6,
-                'question': 'Which data type is mutable in Python?',
-                'options': ['String', 'Tuple', 'List', 'Integer'],
-                'answer_index': 2
-            },
-            {
-                'id': 7,
-                'question': 'What does "building projects today" mean for beginners?',
-                'options': ['Advanced projects only', 'Start with simple scripts', 'Enterprise applications',
-                            'Complex algorithms'],
-                'answer_index': 1
-            },
-            {
-                'id': 8,
-                'question': 'Python fundamentals include understanding what?',
-                'options': ['Variables and functions', 'Machine learning only', 'Web frameworks only',
-                            'Database design'],
-                'answer_index': 0
-            },
-            {
-                'id': 9,
-                'question': 'What makes Python good for absolute beginners?',
-                'options': ['Complex syntax', 'Readable syntax', 'No documentation', 'Requires compilation'],
-                'answer_index': 1
-            },
-            {
-                'id': 10,
-                'question': 'The best way to master Python fundamentals is to?',
-                'options': ['Read only', 'Practice coding', 'Watch videos only', 'Memorize syntax'],
-                'answer_index': 1
-            }
-        ]
-    elif 'react' in course_id.lower() or 'frontend' in course_id.lower():
-        quiz.questions = [
-            {
-                'id': 1,
-                'question': 'What is React primarily used for?',
-                'options': ['Backend development', 'Frontend development', 'Database management',
-                            'Server configuration'],
-                'answer_index': 1
-            },
-            {
-                'id': 2,
-                'question': 'React applications are described as what type?',
-                'options': ['Static', 'High-performance', 'Low-performance', 'Backend-only'],
-                'answer_index': 1
-            },
-            {
-                'id': 3,
-                'question': 'What does "modern web applications" mean in React context?',
-                'options': ['Old techniques', 'Current best practices', 'Outdated methods', 'Server-side only'],
-                'answer_index': 1
-            },
-            {
-                'id': 4,
-                'question': 'React is used for building what kind of web applications?',
-                'options': ['Simple static pages', 'Modern, high-performance apps', 'Basic HTML sites',
-                            'Text-only pages'],
-                'answer_index': 1
-            },
-            {
-                'id': 5,
-                'question': 'What is JSX in React?',
-                'options': ['A database', 'JavaScript XML', 'A server', 'A CSS framework'],
-                'answer_index': 1
-            },
-            {
-                'id': 6,
-                'question': 'Frontend development with React focuses on?',
-                'options': ['Server logic', 'User interfaces', 'Database queries', 'Network protocols'],
-                'answer_index': 1
-            },
-            {
-                'id': 7,
-                'question': 'High-performance in React means?',
-                'options': ['Slow rendering', 'Fast, efficient UIs', 'Large file sizes', 'Complex setup'],
-                'answer_index': 1
-            },
-            {
-                'id': 8,
-                'question': 'Modern React development emphasizes?',
-                'options': ['Old browsers only', 'Component-based architecture', 'Inline styles only',
-                            'Table-based layouts'],
-                'answer_index': 1
-            },
-            {
-                'id': 9,
-                'question': 'React applications are built using?',
-                'options': ['Only HTML', 'Components and state', 'Only CSS', 'Only JavaScript'],
-                'answer_index': 1
-            },
-            {
-                'id': 10,
-                'question': 'The goal of frontend React development is to?',
-                'options': ['Build modern, efficient web applications', 'Replace all backends', 'Eliminate JavaScript',
-                            'Avoid user interaction'],
-                'answer_index': 0
-            }
-        ]
-    elif 'data' in course_id.lower() or 'visualization' in course_id.lower():
-        quiz.questions = [
-            {
-                'id': 1,
-                'question': 'What is data analysis primarily used for?',
-                'options': ['Web design', 'Extracting insights from data', 'Writing code', 'Database storage'],
-                'answer_index': 1
-            },
-            {
-                'id': 2,
-                'question': 'Data visualization helps with?',
-                'options': ['Hiding data patterns', 'Presenting insights clearly', 'Storing more data',
-                            'Writing reports'],
-                'answer_index': 1
-            },
-            {
-                'id': 3,
-                'question': 'Pandas is primarily used for?',
-                'options': ['Web development', 'Data manipulation', 'Image processing', 'Audio editing'],
-                'answer_index': 1
-            },
-            {
-                'id': 4,
-                'question': 'Matplotlib is a tool for?',
-                'options': ['Data visualization', 'Web scraping', 'Database management', 'File compression'],
-                'answer_index': 0
-            },
-            {
-                'id': 5,
-                'question': 'Powerful data insights come from?',
-                'options': ['Ignoring patterns', 'Analyzing and visualizing data', 'Collecting more data',
-                            'Random guessing'],
-                'answer_index': 1
-            },
-            {
-                'id': 6,
-                'question': 'Data analysis helps businesses make?',
-                'options': ['Random decisions', 'Data-driven decisions', 'Quick decisions', 'Expensive decisions'],
-                'answer_index': 1
-            },
-            {
-                'id': 7,
-                'question': 'Visualization makes data more?',
-                'options': ['Complicated', 'Understandable', 'Hidden', 'Confusing'],
-                'answer_index': 1
-            },
-            {
-                'id': 8,
-                'question': 'Learning data analysis involves understanding?',
-                'options': ['Only statistics', 'Data patterns and tools', 'Only programming', 'Only mathematics'],
-                'answer_index': 1
-            },
-            {
-                'id': 9,
-                'question': 'The goal of data visualization is to?',
-                'options': ['Make data harder to understand', 'Communicate insights effectively', 'Hide information',
-                            'Complicate analysis'],
-                'answer_index': 1
-            },
-            {
-                'id': 10,
-                'question': 'Data analysis and visualization together provide?',
-                'options': ['Confusion', 'Powerful insights', 'More complexity', 'Less understanding'],
-                'answer_index': 1
-            }
-        ]
-    else:
-        # Generic fallback for unknown courses
-        quiz.questions = [
-            {
-                'id': i,
-                'question': f'Question {i} about this course topic?',
-                'options': ['Option A', 'Option B', 'Option C', 'Option D'],
-                'answer_index': i % 4
-            } for i in range(1, 11)
-        ]
-
-    return quiz
+@quiz_bp.route('/quiz/submit/bulk', methods=['POST'])
+@jwt_required()
+def submit_quiz_bulk():
+    """
+    Grade and store many submissions at once (re-grades, imports).
+    Body: {"submissions": [{"user_id", "quiz_id", "answers"}, ...]}
+
+    Submissions are stored in chunks, each in its own transaction. If a chunk
+    fails, the ones before it stay stored and the rest are not attempted: the
+    response is then a 207 whose results say which submissions were stored,
+    so a client resends only those marked "Not stored".
+    """
+    data = request.get_json(silent=True) or {}
+    submissions = data.get("submissions")
+    max_submissions = current_app.config["BULK_SUBMIT_MAX"]
+
+    if not isinstance(submissions, list) or not submissions:
+        return jsonify({"error": "submissions must be a non-empty list"}), 400
+    if len(submissions) > max_submissions:
+        return jsonify({"error": f"At most {max_submissions} submissions per request"}), 413
+
+    results = [None] * len(submissions)
+
+    # 1. validate and group by quiz so each quiz is scored in one pass
+    by_quiz = {}
+    for index, item in enumerate(submissions):
+        try:
+            quiz_id = int(item["quiz_id"])
+            if not isinstance(item["answers"], list) or not item["user_id"]:
+                raise ValueError("answers must be a list")
+        except (KeyError, TypeError, ValueError):
+            results[index] = {"index": index, "error": "Invalid submission"}
+            continue
+        by_quiz.setdefault(quiz_id, []).append(index)
+
+    try:
+        # 2. vectorized scoring against each quiz's answer key
+        statements = []
+        for quiz_id, indexes in by_quiz.items():
+            answer_key = current_app.answer_keys.get_or_load(
+                quiz_id, lambda qid: load_quiz_by_id(current_app.db, qid)
+            )
+            if answer_key is None:
+                for index in indexes:
+                    results[index] = {"index": index, "error": "Quiz not found"}
+                continue
+
+            scores = answer_key.score_many([submissions[i]["answers"] for i in indexes])
+            for index, score in zip(indexes, scores):
+                item = submissions[index]
+                submission_id, stmts = submission_statements(
+                    item["user_id"], quiz_id, answer_key.course_id, item["answers"], score
+                )
+                statements.append((index, stmts))
+                results[index] = {
+                    "index": index,
+                    "submission_id": submission_id,
+                    "score": score,
+                    "total_questions": len(answer_key)
+                }
+
+    except Exception as e:
+        logger.error(f"Error in bulk quiz submission: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    # 3. batched inserts; outbox rows go in the same transactions
+    chunk = current_app.config["BULK_SUBMIT_CHUNK"]
+    accepted = 0
+    try:
+        for start in range(0, len(statements), chunk):
+            current_app.db.batch([stmt for _, stmts in statements[start:start + chunk] for stmt in stmts])
+            accepted = min(start + chunk, len(statements))
+    except Exception as e:
+        logger.error(f"Bulk submission stopped after {accepted} of {len(statements)} submissions: {str(e)}")
+        for index, _ in statements[accepted:]:
+            results[index] = {"index": index, "error": "Not stored"}
+
+    if accepted:
+        current_app.outbox.wake()
+
+    logger.info(f"Bulk submission stored {accepted} of {len(submissions)} submissions")
+    return jsonify({
+        "accepted": accepted,
+        "rejected": len(submissions) - accepted,
+        "results": results
+    }), 200 if accepted == len(statements) else 207
 
 
 # def calculate_quiz_score(quiz, answers):
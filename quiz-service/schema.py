@@ -0,0 +1,51 @@
+"""
+Schema for the quiz-service Turso (libSQL) database.
+
+Every statement is idempotent, so the list is applied on each startup.
+"""
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS quizzes (
+        id INTEGER PRIMARY KEY,
+        course_id TEXT NOT NULL,
+        title TEXT NOT NULL,
+        questions_json TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_submissions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        quiz_id INTEGER NOT NULL,
+        course_id TEXT NOT NULL,
+        answers_json TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        submitted_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # One quiz per course. A database with duplicates left by the old
+    # SELECT-then-INSERT path fails here until migrate_quiz_duplicates.py
+    # has merged them.
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_quizzes_course_id ON quizzes (course_id)
+    """,
+    # Transactional outbox: rows are written in the same batch as the
+    # submission and drained to RabbitMQ by services.outbox.OutboxFlusher
+    """
+    CREATE TABLE IF NOT EXISTS quiz_event_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        routing_key TEXT NOT NULL,
+        payload_json TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        claimed_until REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+
+def init_schema(db):
+    """Create missing tables and indexes in one round trip."""
+    db.batch(SCHEMA_STATEMENTS)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+
+import aio_pika
+
+from services.outbox import (
+    CLAIM_SQL,
+    OUTBOX_STATS_SQL,
+    delete_statement,
+    message_id,
+    release_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOutboxFlusher:
+    """
+    asyncio counterpart of OutboxFlusher for the ASGI app
+    Uses the async libSQL client and aio-pika with publisher confirms;
+    a batch is published concurrently and confirmed as a whole
+    """
+
+    def __init__(self, db, rabbitmq_url: str, batch_size: int = 100,
+                 poll_interval: float = 0.5, lease_seconds: float = 30):
+        self.db = db
+        self.rabbitmq_url = rabbitmq_url
+        self.exchange_name = 'quiz_events'
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+        self._connection = None
+        self._exchange = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self.flushed = 0
+        self.failed_batches = 0
+        self.last_flush_at = None
+
+    async def _get_exchange(self):
+        if self._exchange is None:
+            # connect_robust reconnects transparently after broker restarts
+            self._connection = await aio_pika.connect_robust(self.rabbitmq_url)
+            channel = await self._connection.channel(publisher_confirms=True)
+            self._exchange = await channel.declare_exchange(
+                self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True
+            )
+        return self._exchange
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Async outbox flusher started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._connection.close()
+
+    def wake(self):
+        self._wake.set()
+
+    async def flush_once(self):
+        """
+        Publish one batch of pending events
+
+        Returns:
+            int: number of leading events confirmed by the broker
+        """
+        now = time.time()
+        result = await self.db.execute(CLAIM_SQL, [now + self.lease_seconds, now, self.batch_size])
+        rows = sorted(result.rows, key=lambda row: row["id"])
+        if not rows:
+            return 0
+
+        exchange = await self._get_exchange()
+        outcomes = await asyncio.gather(*[
+            exchange.publish(
+                aio_pika.Message(
+                    body=row["payload_json"].encode("utf-8"),
+                    content_type="application/json",
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    message_id=message_id(row),
+                ),
+                routing_key=row["routing_key"],
+            )
+            for row in rows
+        ], return_exceptions=True)
+
+        confirmed = next(
+            (i for i, outcome in enumerate(outcomes) if isinstance(outcome, Exception)),
+            len(rows)
+        )
+        if confirmed < len(rows):
+            logger.error(f"Failed to publish outbox event: {outcomes[confirmed]}")
+
+        statements = []
+        if confirmed:
+            statements.append(delete_statement([row["id"] for row in rows[:confirmed]]))
+        if confirmed < len(rows):
+            statements.append(release_statement([row["id"] for row in rows[confirmed:]]))
+        await self.db.batch(statements)
+
+        self.flushed += confirmed
+        if confirmed < len(rows):
+            self.failed_batches += 1
+        self.last_flush_at = time.time()
+        return confirmed
+
+    async def _run(self):
+        backoff = self.poll_interval
+        while True:
+            try:
+                flushed = await self.flush_once()
+                backoff = self.poll_interval
+                if flushed < self.batch_size:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox flush failed: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    async def stats(self):
+        result = await self.db.execute(OUTBOX_STATS_SQL)
+        row = result.rows[0]
+        oldest = row["oldest"]
+        return {
+            "depth": row["depth"],
+            "oldest_age_seconds": round(time.time() - oldest, 3) if oldest is not None else 0,
+            "flushed": self.flushed,
+            "failed_batches": self.failed_batches,
+            "last_flush_at": self.last_flush_at,
+        }
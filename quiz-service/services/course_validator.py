@@ -1,6 +1,12 @@
 import logging
-import requests
+import threading
 import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
@@ -8,19 +14,118 @@ logger = logging.getLogger(__name__)
 class CourseValidator:
     """
     Service to validate course existence by calling Course Service
-    Implements retry logic with timeout for resilience
+    Answers from a positive/negative TTL cache (kept warm by course events),
+    falls back to one pooled HTTP call, and fails fast through a circuit
+    breaker when Course Service is down
     """
 
-    def __init__(self, course_service_url: str):
-        self.course_service_url = course_service_url
-        self.max_retries = 3
-        self.retry_delay = 1  # seconds
-        self.timeout = 5  # seconds
+    def __init__(self, course_service_url: str, positive_ttl: float = 300, negative_ttl: float = 30,
+                 timeout: float = 2, fail_open: bool = True, max_entries: int = 10000, session=None):
+        self.course_service_url = course_service_url.rstrip("/")
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout  # seconds
+        # When Course Service cannot answer, let the request through rather than 404
+        self.fail_open = fail_open
+        self.max_entries = max_entries
+        self.breaker = CircuitBreaker()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+        self._cache = OrderedDict()  # course_id -> (expires_at, exists)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.short_circuits = 0
+        self.fetches = 0
+        self.fetch_time = 0.0
+        self.total_time = 0.0
+
+    def _store(self, course_id, exists):
+        ttl = self.positive_ttl if exists else self.negative_ttl
+        with self._lock:
+            self._cache[course_id] = (time.monotonic() + ttl, exists)
+            self._cache.move_to_end(course_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def mark_exists(self, course_id):
+        """Warm the cache from a course_created/course_updated event."""
+        if course_id:
+            self._store(course_id, True)
+
+    def mark_missing(self, course_id):
+        """Record a course_deleted event."""
+        if course_id:
+            self._store(course_id, False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def lookup(self, course_id):
+        """
+        Cached verdict for course_id
+
+        Returns:
+            bool or None: None if the cache cannot answer
+        """
+        with self._lock:
+            entry = self._cache.get(course_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def fetch(self, course_id):
+        """
+        Ask Course Service (one attempt, no sleeping) and cache the answer
+
+        Returns:
+            bool: True if course exists, False otherwise
+        """
+        if not self.breaker.allow():
+            with self._lock:
+                self.short_circuits += 1
+            return self.fail_open
+
+        url = f"{self.course_service_url}/courses/{course_id}"
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error calling Course Service for course {course_id}: {str(e)}")
+            self.breaker.record_failure()
+            return self.fail_open
+        finally:
+            with self._lock:
+                self.fetches += 1
+                self.fetch_time += time.perf_counter() - start
+
+        if response.status_code == 200:
+            self.breaker.record_success()
+            self._store(course_id, True)
+            return True
+        if response.status_code in (400, 404):
+            # 400 means the id is not even a valid course id
+            self.breaker.record_success()
+            logger.warning(f"Course {course_id} not found")
+            self._store(course_id, False)
+            return False
+
+        logger.warning(f"Course Service returned status {response.status_code}")
+        self.breaker.record_failure()
+        return self.fail_open
 
     def validate_course_exists(self, course_id: str):
         """
-        Validate that a course exists by calling the Course Service
-        Implements retry logic for resilience
+        Validate that a course exists, from cache when possible
 
         Args:
             course_id: The ID of the course to validate
@@ -28,36 +133,29 @@ class CourseValidator:
         Returns:
             bool: True if course exists, False otherwise
         """
-        url = f"{self.course_service_url}/{course_id}"
-
-        for attempt in range(self.max_retries):
-            try:
-                logger.info(f"Validating course {course_id} with Course Service (attempt {attempt + 1})")
-
-                response = requests.get(
-                    url,
-                    timeout=self.timeout,
-                    headers={'Content-Type': 'application/json'}
-                )
-
-                if response.status_code == 200:
-                    logger.info(f"Course {course_id} validation successful")
-                    return True
-                elif response.status_code == 404:
-                    logger.warning(f"Course {course_id} not found")
-                    return False
-                else:
-                    logger.warning(f"Course Service returned status {response.status_code}")
-
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error calling Course Service (attempt {attempt + 1}): {str(e)}")
-
-                if attempt < self.max_retries - 1:
-                    logger.info(f"Retrying in {self.retry_delay} seconds.")
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2  # Exponential backoff
-                else:
-                    logger.error(f"Failed to validate course {course_id} after {self.max_retries} attempts")
-                    return False
-
-        return False
\ No newline at end of file
+        start = time.perf_counter()
+        exists = self.lookup(course_id)
+        if exists is None:
+            exists = self.fetch(course_id)
+        with self._lock:
+            self.total_time += time.perf_counter() - start
+        return exists
+
+    def record_latency(self, seconds):
+        """Account validation time measured by a caller (async mode)."""
+        with self._lock:
+            self.total_time += seconds
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "short_circuits": self.short_circuits,
+                "breaker": self.breaker.state,
+                "avg_added_latency_ms": round(self.total_time / lookups * 1000, 3) if lookups else None,
+                "avg_fetch_latency_ms": round(self.fetch_time / self.fetches * 1000, 3) if self.fetches else None,
+            }
@@ -0,0 +1,123 @@
+import logging
+import json
+import threading
+import time
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+
+class EventListener:
+    """
+    Background RabbitMQ consumer for events published by other services
+    Each process gets its own exclusive queue, so every replica sees every event
+    """
+
+    def __init__(self, rabbitmq_url: str):
+        self.rabbitmq_url = rabbitmq_url
+        self.reconnect_delay = 5  # seconds
+        self._handlers = {}  # (exchange, routing_key) -> [callback]
+        self._connect_hooks = []
+        self._thread = None
+
+    def subscribe(self, exchange, routing_key, callback):
+        """
+        Register callback(routing_key, event) for events on a topic exchange
+        """
+        self._handlers.setdefault((exchange, routing_key), []).append(callback)
+
+    def on_connect(self, callback):
+        """
+        Register callback() to run after every (re)connect, e.g. to drop
+        state that may have missed events while disconnected
+        """
+        self._connect_hooks.append(callback)
+
+    def dispatch(self, exchange, routing_key, body):
+        """Decode one message and run the matching handlers."""
+        try:
+            event = json.loads(body)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring undecodable event on {routing_key}: {str(e)}")
+            return
+
+        for callback in self._handlers.get((exchange, routing_key), []):
+            try:
+                callback(routing_key, event)
+            except Exception as e:
+                logger.error(f"Event handler failed for {routing_key}: {str(e)}")
+
+    def start(self):
+        if not self._handlers or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="event-listener", daemon=True)
+        self._thread.start()
+
+    def _on_message(self, channel, method, properties, body):
+        self.dispatch(method.exchange, method.routing_key, body)
+
+    def _run(self):
+        while True:
+            try:
+                connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
+                channel = connection.channel()
+
+                result = channel.queue_declare(queue='', exclusive=True, auto_delete=True)
+                queue_name = result.method.queue
+
+                for exchange, routing_key in self._handlers:
+                    channel.exchange_declare(exchange=exchange, exchange_type='topic', durable=True)
+                    channel.queue_bind(queue=queue_name, exchange=exchange, routing_key=routing_key)
+
+                channel.basic_consume(queue=queue_name, on_message_callback=self._on_message, auto_ack=True)
+
+                for callback in self._connect_hooks:
+                    callback()
+
+                logger.info("Event listener waiting for events")
+                channel.start_consuming()
+
+            except Exception as e:
+                logger.error(f"Event listener disconnected, reconnecting in {self.reconnect_delay} sec: {str(e)}")
+                time.sleep(self.reconnect_delay)
+
+
+def subscribe_quiz_service_handlers(listener, course_exchange, quiz_cache, answer_keys, course_validator=None):
+    """
+    Wire the events quiz-service reacts to: quiz.updated from quiz_events
+    and course lifecycle events from Course Service
+    """
+
+    def on_quiz_updated(routing_key, event):
+        quiz_cache.invalidate(event.get("course_id"))
+        answer_keys.invalidate(event.get("quiz_id"))
+
+    def on_course_event(routing_key, event):
+        course_id = (event.get("payload") or {}).get("id")
+        if routing_key != "course.course_created":
+            quiz_cache.invalidate(course_id)
+        if course_validator is not None:
+            if routing_key == "course.course_deleted":
+                course_validator.mark_missing(course_id)
+            else:
+                course_validator.mark_exists(course_id)
+
+    def on_courses_imported(routing_key, event):
+        # New courses only, so nothing cached can be stale
+        for course in (event.get("payload") or {}).get("courses") or []:
+            course_validator.mark_exists(course.get("id"))
+
+    listener.subscribe("quiz_events", "quiz.updated", on_quiz_updated)
+    course_events = ["course.course_updated", "course.course_deleted"]
+    if course_validator is not None:
+        course_events.append("course.course_created")
+        listener.subscribe(course_exchange, "course.courses_imported", on_courses_imported)
+    for routing_key in course_events:
+        listener.subscribe(course_exchange, routing_key, on_course_event)
+
+    # Anything could have changed while we were disconnected
+    listener.on_connect(quiz_cache.invalidate)
+    listener.on_connect(answer_keys.invalidate)
+    if course_validator is not None:
+        listener.on_connect(course_validator.clear)
@@ -1,69 +1,226 @@
 import logging
 import json
+import os
+import threading
+import time
+from collections import deque
+
 import pika
+from pika.exceptions import AMQPError, NackError, UnroutableError
 
 logger = logging.getLogger(__name__)
 
 
+class PublishMetrics:
+    """
+    Thread-safe publish counters and latency samples
+    Keeps a bounded window of recent latencies for percentiles
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.published = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.published += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self._latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_reconnect(self):
+        with self._lock:
+            self.reconnects += 1
+
+    def snapshot(self):
+        """
+        Return a JSON-friendly view of the metrics (latencies in ms)
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+            published = self.published
+
+            def percentile(p):
+                if not samples:
+                    return None
+                index = min(len(samples) - 1, int(round(p * (len(samples) - 1))))
+                return round(samples[index] * 1000, 3)
+
+            return {
+                "published": published,
+                "failed": self.failed,
+                "reconnects": self.reconnects,
+                "avg_latency_ms": round(self.total_latency / published * 1000, 3) if published else None,
+                "p50_latency_ms": percentile(0.50),
+                "p99_latency_ms": percentile(0.99),
+                "max_latency_ms": round(self.max_latency * 1000, 3),
+            }
+
+
 class MessagePublisher:
     """
     Service to publish events to RabbitMQ message queue
-    Implements communication pattern for async events
+    Holds one long-lived connection/channel per process and reconnects on demand
     """
 
     def __init__(self, rabbitmq_url: str):
         self.rabbitmq_url = rabbitmq_url
         self.exchange_name = 'quiz_events'
         self.routing_key = 'quiz.submitted'
-
-    def publish_quiz_event(self, event_data):
+        self.metrics = PublishMetrics()
+
+        # pika's BlockingConnection is not thread-safe, so publishes are serialised
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel = None
+        self._pid = None
+
+    def _reset(self):
+        """Drop the current connection so the next publish reconnects."""
+        connection = self._connection
+        self._connection = None
+        self._channel = None
+
+        # Never close a socket inherited from a parent process (pre-fork servers)
+        if connection is not None and self._pid == os.getpid():
+            try:
+                if not connection.is_closed:
+                    connection.close()
+            except Exception:
+                pass
+
+    def _ensure_channel(self):
         """
-        Publish quiz submission event to message queue
-
-        Args:
-            event_data: Dictionary containing event information
-
-        Returns:
-            bool: True if published successfully, False otherwise
+        Return an open channel, connecting and declaring the exchange if needed.
+        Must be called with the lock held.
         """
-        connection = None
-        try:
-            # Establish connection to RabbitMQ
-            connection = pika.BlockingConnection(
+        if self._pid != os.getpid():
+            # Forked worker: the parent's connection is not usable here
+            self._connection = None
+            self._channel = None
+
+        if self._connection is not None and not self._connection.is_closed:
+            try:
+                # Service heartbeats and surface a dropped connection before publishing
+                self._connection.process_data_events(time_limit=0)
+            except AMQPError:
+                self._reset()
+
+        if self._channel is None or self._channel.is_closed:
+            self._reset()
+            if self._pid is not None:
+                self.metrics.record_reconnect()
+
+            self._connection = pika.BlockingConnection(
                 pika.URLParameters(self.rabbitmq_url)
             )
-            channel = connection.channel()
+            self._pid = os.getpid()
+            self._channel = self._connection.channel()
 
-            # Declare idempotent exchange
-            channel.exchange_declare(
+            # Publisher confirms: basic_publish returns once the broker has the message
+            self._channel.confirm_delivery()
+
+            # Declare idempotent exchange once per connection
+            self._channel.exchange_declare(
                 exchange=self.exchange_name,
                 exchange_type='topic',
                 durable=True
             )
+            logger.info("Connected publisher to RabbitMQ")
 
-            # Publish message
-            message = json.dumps(event_data)
-            channel.basic_publish(
-                exchange=self.exchange_name,
-                routing_key=self.routing_key,
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    content_type='application/json'
+        return self._channel
+
+    def _publish_locked(self, routing_key, body, message_id=None):
+        """
+        Publish one message and wait for the broker confirm, retrying once
+        on a fresh connection if the cached one turns out to be dead.
+        Must be called with the lock held.
+        """
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            content_type='application/json',
+            message_id=message_id
+        )
+
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                channel = self._ensure_channel()
+                channel.basic_publish(
+                    exchange=self.exchange_name,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties
                 )
-            )
+                break
+            except (NackError, UnroutableError):
+                # The broker answered, so the connection is fine; do not retry
+                raise
+            except AMQPError as e:
+                self._reset()
+                if attempt:
+                    raise
+                logger.warning(f"Publisher connection lost, reconnecting: {str(e)}")
+
+        self.metrics.record_success(time.perf_counter() - start)
+
+    def _publish(self, routing_key, event_data):
+        message = json.dumps(event_data)
+        with self._lock:
+            self._publish_locked(routing_key, message)
+
+    def publish_batch(self, messages):
+        """
+        Publish pre-serialised messages in order with publisher confirms
+
+        Args:
+            messages: Iterable of (routing_key, body, message_id) tuples
 
+        Returns:
+            int: How many leading messages were confirmed; publishing stops
+                 at the first failure so order is preserved on retry
+        """
+        confirmed = 0
+        with self._lock:
+            for routing_key, body, message_id in messages:
+                try:
+                    self._publish_locked(routing_key, body, message_id)
+                except Exception as e:
+                    self.metrics.record_failure()
+                    logger.error(f"Failed to publish batch message {message_id}: {str(e)}")
+                    break
+                confirmed += 1
+        return confirmed
+
+    def publish_quiz_event(self, event_data):
+        """
+        Publish quiz submission event to message queue
+
+        Args:
+            event_data: Dictionary containing event information
+
+        Returns:
+            bool: True if published successfully, False otherwise
+        """
+        try:
+            self._publish(self.routing_key, event_data)
             logger.info(f"Event published successfully: {self.routing_key}")
             return True
 
         except Exception as e:
+            self.metrics.record_failure()
             logger.error(f"Failed to publish event: {str(e)}")
             return False
 
-        finally:
-            if connection and not connection.is_closed:
-                connection.close()
-
     def publish_quiz_updated_event(self, event_data):
         """
         Publish quiz updated event to message queue
@@ -74,39 +231,17 @@ class MessagePublisher:
         Returns:
             bool: True if published successfully, False otherwise
         """
-        connection = None
         try:
-            connection = pika.BlockingConnection(
-                pika.URLParameters(self.rabbitmq_url)
-            )
-            channel = connection.channel()
-
-            # Declare exchange
-            channel.exchange_declare(
-                exchange=self.exchange_name,
-                exchange_type='topic',
-                durable=True
-            )
-
-            # Publish message
-            message = json.dumps(event_data)
-            channel.basic_publish(
-                exchange=self.exchange_name,
-                routing_key='quiz.updated',
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                    content_type='application/json'
-                )
-            )
-
+            self._publish('quiz.updated', event_data)
             logger.info("Quiz updated event published successfully")
             return True
 
         except Exception as e:
+            self.metrics.record_failure()
             logger.error(f"Failed to publish quiz updated event: {str(e)}")
             return False
 
-        finally:
-            if connection and not connection.is_closed:
-                connection.close()
\ No newline at end of file
+    def close(self):
+        """Close the underlying connection (e.g. on shutdown)."""
+        with self._lock:
+            self._reset()
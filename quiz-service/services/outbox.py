@@ -0,0 +1,173 @@
+import logging
+import json
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_statement(routing_key, event_data, if_inserted=False):
+    """
+    Build the INSERT for an outbox row so callers can add it to the
+    same batch (transaction) as the business write.
+
+    With if_inserted the row is only written when the statement just before
+    it changed a row: a batch that is sent again after an
+    INSERT ... ON CONFLICT DO NOTHING then does not queue the event twice.
+
+    Returns:
+        tuple: (sql, args) accepted by the libSQL client
+    """
+    args = [routing_key, json.dumps(event_data), time.time()]
+    if if_inserted:
+        return (
+            "INSERT INTO quiz_event_outbox (routing_key, payload_json, created_at) "
+            "SELECT ?, ?, ? WHERE changes() = 1",
+            args
+        )
+    return (
+        "INSERT INTO quiz_event_outbox (routing_key, payload_json, created_at) VALUES (?, ?, ?)",
+        args
+    )
+
+
+# Lease up to N unclaimed rows in one round trip; args: lease end, now, N
+CLAIM_SQL = """
+    UPDATE quiz_event_outbox
+    SET claimed_until = ?, attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM quiz_event_outbox
+        WHERE claimed_until < ?
+        ORDER BY id
+        LIMIT ?
+    )
+    RETURNING id, routing_key, payload_json
+"""
+
+OUTBOX_STATS_SQL = "SELECT COUNT(*) AS depth, MIN(created_at) AS oldest FROM quiz_event_outbox"
+
+
+def delete_statement(ids):
+    """Remove confirmed events."""
+    placeholders = ", ".join("?" for _ in ids)
+    return (f"DELETE FROM quiz_event_outbox WHERE id IN ({placeholders})", list(ids))
+
+
+def release_statement(ids):
+    """Give up the lease on unpublished events so they are retried in order."""
+    placeholders = ", ".join("?" for _ in ids)
+    return (f"UPDATE quiz_event_outbox SET claimed_until = 0 WHERE id IN ({placeholders})", list(ids))
+
+
+def message_id(row):
+    return f"quiz-outbox-{row['id']}"
+
+
+class OutboxFlusher:
+    """
+    Background worker that drains quiz_event_outbox to RabbitMQ in batches
+    Rows are leased before publishing so several processes can run a flusher,
+    and only deleted once the broker has confirmed them (at-least-once delivery)
+    """
+
+    def __init__(self, db, publisher, batch_size: int = 100,
+                 poll_interval: float = 0.5, lease_seconds: float = 30):
+        self.db = db
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.flushed = 0
+        self.failed_batches = 0
+        self.last_flush_at = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+        self._thread.start()
+        logger.info("Outbox flusher started")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Ask the flusher to run now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _claim_batch(self):
+        """Lease up to batch_size unclaimed rows in a single round trip."""
+        now = time.time()
+        result = self.db.execute(CLAIM_SQL, [now + self.lease_seconds, now, self.batch_size])
+        return sorted(result.rows, key=lambda row: row["id"])
+
+    def flush_once(self):
+        """
+        Publish one batch of pending events
+
+        Returns:
+            int: number of events confirmed by the broker
+        """
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+
+        messages = [
+            (row["routing_key"], row["payload_json"], message_id(row))
+            for row in rows
+        ]
+        confirmed = self.publisher.publish_batch(messages)
+
+        if confirmed:
+            self.db.execute(*delete_statement([row["id"] for row in rows[:confirmed]]))
+
+        if confirmed < len(rows):
+            self.db.execute(*release_statement([row["id"] for row in rows[confirmed:]]))
+
+        with self._stats_lock:
+            self.flushed += confirmed
+            if confirmed < len(rows):
+                self.failed_batches += 1
+            self.last_flush_at = time.time()
+
+        return confirmed
+
+    def _run(self):
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                flushed = self.flush_once()
+                backoff = self.poll_interval
+                if flushed < self.batch_size:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+            except Exception as e:
+                logger.error(f"Outbox flush failed: {str(e)}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def stats(self):
+        """
+        Backlog depth and age of the oldest pending event
+        """
+        result = self.db.execute(OUTBOX_STATS_SQL)
+        row = result.rows[0]
+        oldest = row["oldest"]
+
+        with self._stats_lock:
+            return {
+                "depth": row["depth"],
+                "oldest_age_seconds": round(time.time() - oldest, 3) if oldest is not None else 0,
+                "flushed": self.flushed,
+                "failed_batches": self.failed_batches,
+                "last_flush_at": self.last_flush_at,
+            }
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QuizCache:
+    """
+    In-process LRU + TTL cache of serialized GET /quiz responses keyed by course_id
+    Entries are dropped on quiz.updated / course.* events, see services.event_listener
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # course_id -> (expires_at, body)
+        self._lock = threading.Lock()
+        self._version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self):
+        """
+        Take before loading from the database and pass to put(), so a load
+        that raced with an invalidation is not cached.
+        """
+        with self._lock:
+            return self._version
+
+    def get(self, course_id):
+        """
+        Returns:
+            bytes or None: cached response body
+        """
+        with self._lock:
+            entry = self._entries.get(course_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, body = entry
+            if expires_at < time.monotonic():
+                del self._entries[course_id]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(course_id)
+            self.hits += 1
+            return body
+
+    def put(self, course_id, body: bytes, version=None):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+
+            self._entries[course_id] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(course_id)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, course_id=None):
+        """Drop one course, or everything when course_id is None."""
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            if course_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(course_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
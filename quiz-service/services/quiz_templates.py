@@ -0,0 +1,82 @@
+import json
+import os
+import re
+
+DEFAULT_TEMPLATES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "quiz_templates.json"
+)
+
+# Seeding never overwrites a quiz that already exists for a course
+SEED_QUIZ_SQL = (
+    "INSERT INTO quizzes (course_id, title, questions_json) VALUES (?, ?, ?) "
+    "ON CONFLICT (course_id) DO NOTHING"
+)
+
+
+class QuizTemplate:
+    """
+    A default quiz with its questions already serialized for storage
+    """
+
+    def __init__(self, name, questions, keywords=()):
+        self.name = name
+        self.questions_json = json.dumps(questions)
+        self.pattern = (
+            re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+            if keywords else None
+        )
+
+
+class TemplateRegistry:
+    """
+    Default quiz templates loaded once from quiz_templates.json
+    Templates are tried in file order; the first whose keyword occurs in the
+    course id wins, otherwise the generic fallback is used
+    """
+
+    def __init__(self, title_format, templates, fallback):
+        self.title_format = title_format
+        self.templates = templates
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, path=DEFAULT_TEMPLATES_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        templates = [
+            QuizTemplate(t["name"], t["questions"], t["keywords"])
+            for t in data["templates"]
+        ]
+        fallback = QuizTemplate(data["fallback"]["name"], data["fallback"]["questions"])
+        return cls(data["title"], templates, fallback)
+
+    def match(self, course_id):
+        for template in self.templates:
+            if template.pattern.search(course_id):
+                return template
+        return self.fallback
+
+    def build(self, course_id):
+        """
+        Returns:
+            dict: course_id, title and questions_json ready to insert
+        """
+        return {
+            "course_id": course_id,
+            "title": self.title_format.format(course_id=course_id),
+            "questions_json": self.match(course_id).questions_json
+        }
+
+    def seed_statements(self, course_ids):
+        """
+        Build one INSERT per course for a single db.batch() call
+        """
+        statements = []
+        for course_id in course_ids:
+            quiz = self.build(course_id)
+            statements.append(
+                (SEED_QUIZ_SQL, [quiz["course_id"], quiz["title"], quiz["questions_json"]])
+            )
+        return statements
@@ -0,0 +1,148 @@
+import json
+import operator
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - scoring falls back to pure Python
+    np = None
+
+# Stored for unanswered or out-of-range answers; never equals a correct index
+NO_ANSWER = 255
+
+
+def build_answer_key(questions):
+    """
+    Compact answer key: one byte per question holding the correct option index
+    """
+    return bytes(q["answer_index"] for q in questions)
+
+
+def encode_answers(answers, length):
+    """
+    Encode submitted answers as bytes aligned with the answer key.
+    Missing, null or invalid answers become NO_ANSWER.
+    """
+    try:
+        # Fast path: a list of small ints converts in C
+        encoded = bytes(answers[:length])
+    except (TypeError, ValueError):
+        encoded = bytearray([NO_ANSWER]) * min(len(answers), length)
+        for i, answer in enumerate(answers[:length]):
+            try:
+                value = int(answer)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= value < NO_ANSWER:
+                encoded[i] = value
+        encoded = bytes(encoded)
+
+    if len(encoded) < length:
+        encoded += bytes([NO_ANSWER]) * (length - len(encoded))
+    return encoded
+
+
+def score_answers(key, answers):
+    """
+    Count positions where the encoded answers match the key
+    """
+    return sum(map(operator.eq, key, answers))
+
+
+def score_bulk(key, answers_list):
+    """
+    Score many submissions for the same quiz in one vectorized comparison
+
+    Args:
+        key: answer key bytes
+        answers_list: list of raw answer lists
+
+    Returns:
+        list: one score per submission, in order
+    """
+    length = len(key)
+    if not length:
+        return [0] * len(answers_list)
+
+    encoded = b"".join(encode_answers(answers, length) for answers in answers_list)
+    if np is None:
+        return [score_answers(key, encoded[i:i + length]) for i in range(0, len(encoded), length)]
+
+    matrix = np.frombuffer(encoded, dtype=np.uint8).reshape(len(answers_list), length)
+    correct = np.frombuffer(key, dtype=np.uint8)
+    return (matrix == correct).sum(axis=1).tolist()
+
+
+class AnswerKey:
+    """
+    Server-side scoring data for one quiz
+    """
+
+    __slots__ = ("quiz_id", "course_id", "key")
+
+    def __init__(self, quiz_id, course_id, key):
+        self.quiz_id = quiz_id
+        self.course_id = course_id
+        self.key = key
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row["id"], row["course_id"], build_answer_key(json.loads(row["questions_json"])))
+
+    def __len__(self):
+        return len(self.key)
+
+    def score(self, answers):
+        return score_answers(self.key, encode_answers(answers, len(self.key)))
+
+    def score_many(self, answers_list):
+        return score_bulk(self.key, answers_list)
+
+
+class AnswerKeyCache:
+    """
+    LRU cache of AnswerKey objects keyed by quiz_id
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        with self._lock:
+            answer_key = self._entries.get(quiz_id)
+            if answer_key is not None:
+                self._entries.move_to_end(quiz_id)
+            return answer_key
+
+    def put(self, answer_key):
+        with self._lock:
+            self._entries[answer_key.quiz_id] = answer_key
+            self._entries.move_to_end(answer_key.quiz_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, quiz_id=None):
+        with self._lock:
+            if quiz_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(quiz_id, None)
+
+    def get_or_load(self, quiz_id, load_row):
+        """
+        Return the cached key, loading the quiz row with load_row(quiz_id) on a miss
+
+        Returns:
+            AnswerKey or None: None if the quiz does not exist
+        """
+        answer_key = self.get(quiz_id)
+        if answer_key is None:
+            row = load_row(quiz_id)
+            if row is None:
+                return None
+            answer_key = AnswerKey.from_row(row)
+            self.put(answer_key)
+        return answer_key
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionBatcher:
+    """
+    Write-behind batcher for Turso writes
+    Statements from concurrent requests arriving within max_latency seconds are
+    sent as one db.batch() call; each caller blocks until its batch commits.
+    Exposes the same batch() method as the libSQL client, so it can be passed
+    wherever a db is expected for writes.
+    """
+
+    def __init__(self, db, max_batch_size: int = 50, max_latency: float = 0.005):
+        self.db = db
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.fallbacks = 0
+        self.largest_batch = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="submission-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, statements):
+        """
+        Queue statements to be written atomically with the next batch
+
+        Returns:
+            Future: resolves to the list of results for these statements
+        """
+        future = Future()
+        if self.max_batch_size <= 1:
+            # Batching disabled: write directly from the caller's thread
+            try:
+                future.set_result(self.db.batch(statements))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_started()
+        self._queue.put((list(statements), future))
+        return future
+
+    def batch(self, statements, timeout=None):
+        """Write statements and wait for the commit (libSQL client compatible)."""
+        return self.submit(statements).result(timeout)
+
+    def _collect(self):
+        """Block for the first write, then gather more until full or the window closes."""
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _flush(self, pending):
+        statements = [stmt for stmts, _ in pending for stmt in stmts]
+        try:
+            results = self.db.batch(statements)
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][1].set_exception(e)
+                return
+
+            # One bad write must not fail its neighbours: retry them one by one.
+            # The batch may have committed before the error reached us, so
+            # this relies on the statements being idempotent (see
+            # submission_statements)
+            logger.warning(f"Batched write of {len(pending)} submissions failed, retrying individually: {str(e)}")
+            with self._stats_lock:
+                self.fallbacks += 1
+            for stmts, future in pending:
+                try:
+                    future.set_result(self.db.batch(stmts))
+                except Exception as single_error:
+                    future.set_exception(single_error)
+            return
+
+        offset = 0
+        for stmts, future in pending:
+            future.set_result(results[offset:offset + len(stmts)])
+            offset += len(stmts)
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            self._flush(pending)
+            with self._stats_lock:
+                self.batches += 1
+                self.writes += len(pending)
+                self.largest_batch = max(self.largest_batch, len(pending))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "writes": self.writes,
+                "avg_batch_size": round(self.writes / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "fallbacks": self.fallbacks,
+                "max_batch_size": self.max_batch_size,
+                "max_latency_ms": self.max_latency * 1000,
+            }
@@ -28,6 +28,27 @@ PROGRESS_SERVICE_URL = os.getenv(
     "http://localhost:5003/progress"  # fallback
 )
 
+# Last course listing per field set, revalidated with If-None-Match
+_course_listings = {}
+
+
+def fetch_courses(fields):
+    """
+    Course listing with only `fields` (plus id). Course Service answers 304
+    while the catalog is unchanged, so repeat calls reuse the cached list.
+    """
+    cached = _course_listings.get(fields)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    res = requests.get(COURSE_SERVICE_URL, params={"fields": fields}, headers=headers, timeout=10)
+    if res.status_code == 304 and cached:
+        return cached[1]
+    res.raise_for_status()
+
+    courses = res.json()
+    if res.headers.get("ETag"):
+        _course_listings[fields] = (res.headers["ETag"], courses)
+    return courses
+
 def redirect_if_authenticated(f):
     """
     Decorator that redirects the user to the account page if a valid, non-expired JWT is found.
@@ -254,9 +275,8 @@ def unsubscribe_course(course_id):
 @user_bp.route("/api/courses-data")
 def courses_data():
     try:
-        res = requests.get(f"{COURSE_SERVICE_URL}")
-        res.raise_for_status()
-        return jsonify(res.json())
+        # The account page only needs titles
+        return jsonify(fetch_courses("title"))
     except:
         return jsonify([]), 200
     
@@ -325,7 +345,54 @@ def get_quiz_progress(user_id, course_id, quiz_id):
             "quiz_id": quiz_id
         })
 
-    return jsonify({
+    return jsonify(progress_summary(user_id, course_id, quiz_id, data)), 200
+
+
+@user_bp.route("/api/progress/batch", methods=["POST"])
+@jwt_required()
+def get_progress_batch():
+    """
+    Progress of the current user for many courses in one call
+    Body: {"course_ids": [...]} or {"items": [{"course_id": ..., "quiz_id": ...}]}
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    items = data.get("items") or [{"course_id": c} for c in data.get("course_ids", [])]
+
+    headers = {"Cookie": f"access_token_cookie={request.cookies.get('access_token_cookie')}"}
+
+    try:
+        res = requests.post(f"{PROGRESS_SERVICE_URL}/batch", headers=headers,
+                            json={"user_id": user_id, "items": items}, timeout=10)
+    except requests.exceptions.RequestException as e:
+        print("Progress proxy error:", e)
+        return jsonify({"error": "Progress service unavailable"}), 502
+
+    if res.status_code != 200:
+        # e.g. 400 over the item limit, 422 for a malformed item
+        try:
+            return jsonify(res.json()), res.status_code
+        except ValueError:
+            return jsonify({"error": "Progress service error"}), res.status_code
+
+    results = []
+    for entry in res.json()["results"]:
+        if entry.get("message") == "No progress data yet":
+            results.append({
+                "message": "No progress data found",
+                "user_id": user_id,
+                "course_id": entry["course_id"],
+                "quiz_id": entry.get("quiz_id")
+            })
+        else:
+            results.append(progress_summary(user_id, entry["course_id"], entry["quiz_id"], entry))
+
+    return jsonify({"results": results}), 200
+
+
+def progress_summary(user_id, course_id, quiz_id, data):
+    """Shape a progress-api summary for the account page."""
+    return {
         "user_id": user_id,
         "course_id": course_id,
         "quiz_id": quiz_id,
@@ -335,7 +402,7 @@ def get_quiz_progress(user_id, course_id, quiz_id):
         "total_attempts": data.get("attempts"),
         "improvement_percentage": data.get("improvement"),
         "updated_at": data.get("updated_at")
-    }), 200
+    }
 
 # ========================================
 # Page Routes
@@ -344,8 +411,7 @@ def get_quiz_progress(user_id, course_id, quiz_id):
 @user_bp.route('/')
 def index():
     try:
-        res = requests.get(f"{COURSE_SERVICE_URL}")
-        courses = res.json()
+        courses = fetch_courses("title,description,duration_weeks")
         return render_template('index.html', courses=courses)
     except Exception as e:
         return jsonify({"error": f"Failed to reach course service: {str(e)}"}), 500
@@ -386,8 +452,7 @@ def quiz_page(course_id):
 def subscriptions():
     
     # get all Courses Service
-    res = requests.get(f"{COURSE_SERVICE_URL}")
-    courses = res.json()  # list of courses
+    courses = fetch_courses("title,description,duration_weeks,category")  # list of courses
 
     return render_template("subscriptions.html", courses=courses)
 
@@ -58,7 +58,6 @@ document.addEventListener("DOMContentLoaded", async () => {
 async function loadSubscriptions(user) {
   const subBox = document.getElementById("subscriptionContent")
   const subs = user.subscriptions || []
-  const QUIZ_API = "/api/quiz"
 
   if (subs.length === 0) {
     subBox.innerHTML = `<p>You have no active subscriptions.</p>`
@@ -69,42 +68,36 @@ async function loadSubscriptions(user) {
   const courseRes = await fetch("/api/courses-data", { credentials: "include" })
   const allCourses = await courseRes.json()
 
+  // 2. Fetch progress for every subscribed course in one request
+  let progressByCourse = {}
+  try {
+    const res = await fetch("/api/progress/batch", {
+      method: "POST",
+      credentials: "include",
+      headers: {
+        "Content-Type": "application/json",
+        "X-CSRF-TOKEN": csrf,
+      },
+      body: JSON.stringify({ course_ids: subs.map((sub) => sub.course_id) }),
+    })
+    if (res.ok) {
+      const data = await res.json()
+      for (const entry of data.results) {
+        progressByCourse[entry.course_id] = entry
+      }
+    }
+  } catch (e) {
+    console.warn("Failed to load progress", e)
+  }
+
   subBox.innerHTML = ""
 
-  // 2. Render each subscription card
+  // 3. Render each subscription card
   for (const sub of subs) {
     const course = allCourses.find((c) => c.id === sub.course_id)
     const courseName = course ? course.title : "Unknown Course"
     const date = new Date(sub.subscribed_at).toLocaleDateString()
-
-    let quiz = null
-    try {
-      const quizData = await fetch(`${QUIZ_API}/${sub.course_id}`, {
-        credentials: "include",
-      })
-
-      if (quizData.ok) {
-        quiz = await quizData.json()
-      }
-    } catch (e) {
-      console.warn("Failed to load quizData for", sub.course_id)
-    }
-
-    // 3. Fetch progress summary for this course
-    let progress = null
-    try {
-      const res = await fetch(
-        `/api/progress/${user.id}/${sub.course_id}/${quiz.quiz_id}`,
-        {
-          credentials: "include",
-        }
-      )
-      if (res.ok) {
-        progress = await res.json()
-      }
-    } catch (e) {
-      console.warn("Failed to load progress for", sub.course_id)
-    }
+    const progress = progressByCourse[sub.course_id]
 
     // fallback values
     const attempts = progress?.total_attempts ?? 0
@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+
+import requests
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, get_csrf_token
+
+import routes
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("No JSON object could be decoded")
+        return self.body
+
+
+class TestProgressBatchProxy(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config.update(
+            JWT_SECRET_KEY="user-service-test-secret-of-32-bytes",
+            JWT_TOKEN_LOCATION=["cookies"],
+            JWT_ACCESS_COOKIE_NAME="access_token_cookie",
+            JWT_COOKIE_CSRF_PROTECT=True
+        )
+        JWTManager(app)
+        app.register_blueprint(routes.user_bp)
+
+        self.client = app.test_client()
+        with app.app_context():
+            self.token = create_access_token(identity="user-1")
+            self.headers = {"X-CSRF-TOKEN": get_csrf_token(self.token)}
+        self.client.set_cookie("access_token_cookie", self.token)
+
+        self.calls = []
+        self.upstream = FakeResponse(200, {"results": []})
+
+        def post(url, **kwargs):
+            self.calls.append((url, kwargs))
+            if isinstance(self.upstream, Exception):
+                raise self.upstream
+            return self.upstream
+
+        patcher = mock.patch.object(routes.requests, "post", post)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body):
+        return self.client.post("/api/progress/batch", json=body, headers=self.headers)
+
+    def test_forwards_the_logged_in_user(self):
+        self.upstream = FakeResponse(200, {"results": [
+            {"course_id": "c1", "quiz_id": 1, "highest_score": 9, "recent_score": 7, "attempts": 2},
+            {"course_id": "c2", "quiz_id": None, "message": "No progress data yet"},
+        ]})
+        response = self.post({"user_id": "someone-else", "course_ids": ["c1", "c2"]})
+        self.assertEqual(response.status_code, 200)
+
+        (url, kwargs), = self.calls
+        self.assertEqual(url, f"{routes.PROGRESS_SERVICE_URL}/batch")
+        self.assertEqual(kwargs["json"], {"user_id": "user-1", "items": [{"course_id": "c1"}, {"course_id": "c2"}]})
+        self.assertEqual(kwargs["headers"], {"Cookie": f"access_token_cookie={self.token}"})
+
+        results = response.get_json()["results"]
+        self.assertEqual((results[0]["best_score"], results[0]["total_attempts"]), (9, 2))
+        self.assertEqual(results[1]["message"], "No progress data found")
+        self.assertEqual(results[1]["user_id"], "user-1")
+
+    def test_passes_upstream_errors_through(self):
+        self.upstream = FakeResponse(400, {"detail": "At most 200 items per batch"})
+        response = self.post({"course_ids": ["c1"] * 201})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"detail": "At most 200 items per batch"})
+
+        self.upstream = FakeResponse(503)
+        self.assertEqual(self.post({"course_ids": ["c1"]}).status_code, 503)
+
+        self.upstream = requests.exceptions.ConnectionError("refused")
+        self.assertEqual(self.post({"course_ids": ["c1"]}).status_code, 502)
+
+    def test_requires_login(self):
+        self.client.delete_cookie("access_token_cookie")
+        self.assertEqual(self.post({"course_ids": ["c1"]}).status_code, 401)
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()